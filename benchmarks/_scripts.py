@@ -0,0 +1,26 @@
+"""Lädt die Skripte des Repos als Module, obwohl ihre Dateinamen keine gültigen Modulnamen sind."""
+import importlib.util
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SINGLE_SKEETS = "blueskey_delete_all_single_skeets.py"
+V8 = "bsky_delete_v8_favs-reskeets-thread-ownfavs-date-allskeets.py"
+COMBINED = "combined.py"
+UNDO_REPOSTS = "undo reposts.py"
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+def load_script(filename):
+    """Importiert ein Skript aus dem Repo-Verzeichnis und gibt das Modul zurück."""
+    name = "bench_" + "".join(c if c.isalnum() else "_" for c in os.path.splitext(filename)[0])
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
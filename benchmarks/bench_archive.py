@@ -0,0 +1,88 @@
+"""Misst, was das Archiv auf dem Löschpfad kostet und wie schnell es sich wieder lesen lässt.
+
+Aufruf: python benchmarks/bench_archive.py [--records 100000] [--batch 200] [--lookups 10000] [--ohne-fsync]
+
+Geschrieben wird wie beim Löschen: ein Block pro Batch, die Inhalte kommen aus einem Dict statt aus
+dem lokalen Index, damit nur das Archiv selbst gemessen wird. Danach: Öffnen per mmap, zufällige
+Abfragen per rkey und ein Zeitraum per Datum. Die Dateien landen in einem temporären Verzeichnis.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from _scripts import REPO_DIR  # noqa: F401  (setzt den Suchpfad für die Module)
+
+from bsky_archive import ArchiveReader, ArchiveWriter
+from bsky_records import POST_COLLECTION, timestamp_to_tid
+
+DID = "did:plc:benchmarkarchive00000000"
+
+
+def make_entries(count, rng):
+    """URI -> (URI, CID, Record als JSON-Text, Likes, Reposts), ein Skeet pro Stunde ab 2022."""
+    entries = {}
+    start = 1640995200
+    for i in range(count):
+        seconds = start + i * 3600
+        uri = f"at://{DID}/{POST_COLLECTION}/{timestamp_to_tid(seconds + rng.random())}"
+        value = {
+            "$type": POST_COLLECTION,
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(seconds)),
+            "langs": ["de"],
+            "text": "Ein Skeet mit etwas Text, wie er typischerweise im Feed steht. " * rng.randint(1, 4),
+        }
+        entries[uri] = (uri, f"bafyreib{i:052d}", json.dumps(value, separators=(",", ":")), rng.randint(0, 50), rng.randint(0, 10))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--ohne-fsync", action="store_true", help="Blöcke nicht einzeln auf die Platte schreiben")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    entries = make_entries(args.records, rng)
+    uris = list(entries)
+    raw_size = sum(len(entry[2]) for entry in entries.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "archiv")
+        writer = ArchiveWriter(path, lambda batch: [entries[uri] for uri in batch], sync=not args.ohne_fsync)
+        start = time.perf_counter()
+        for offset in range(0, len(uris), args.batch):
+            writer(uris[offset:offset + args.batch])
+        write_time = time.perf_counter() - start
+        writer.close()
+        batches = -(-len(uris) // args.batch)
+        size = os.path.getsize(path + ".dat") + os.path.getsize(path + ".idx")
+        print(f"Schreiben  {args.records} Records in {batches} Batches: {write_time:.2f}s, "
+              f"{write_time / batches * 1000:.2f} ms pro Batch, {size / 1e6:.1f} MB (Records roh {raw_size / 1e6:.1f} MB)")
+
+        start = time.perf_counter()
+        reader = ArchiveReader(path)
+        print(f"Öffnen     {len(reader)} Einträge: {time.perf_counter() - start:.3f}s")
+
+        sample = [uri.rsplit("/", 1)[1] for uri in rng.sample(uris, min(args.lookups, len(uris)))]
+        start = time.perf_counter()
+        found = sum(1 for rkey in sample if reader.get(rkey) is not None)
+        lookup_time = time.perf_counter() - start
+        print(f"rkey       {len(sample)} zufällige Abfragen: {lookup_time:.3f}s, "
+              f"{len(sample) / lookup_time:.0f}/s, gefunden {found}")
+
+        month = 1640995200 + 365 * 86400
+        start = time.perf_counter()
+        count = sum(1 for _ in reader.iter_between(month, month + 30 * 86400))
+        print(f"Zeitraum   30 Tage: {count} Records in {time.perf_counter() - start:.3f}s")
+        reader.close()
+        if found != len(sample):
+            raise SystemExit("Nicht alle Records wiedergefunden")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Misst das Dekodieren einzelner Seiten von getAuthorFeed und listRecords.
+
+Aufruf: python benchmarks/bench_decode.py [--repeat 200] [--feed seite.json] [--records seite.json]
+
+Ohne Dateien werden Seiten mit je 100 Einträgen erzeugt, die wie echte Antworten aufgebaut sind.
+Mitgeschnittene Antworten lassen sich per --feed/--records übergeben. Verglichen wird das
+bisherige response.json() (Text dekodieren, alles in Dicts, bei Feed-Seiten danach in Skeets
+umwandeln) mit der Dekodierschicht aus bsky_decode, mit json und, falls installiert, mit orjson.
+"""
+import argparse
+import json
+import random
+import time
+
+from bench_memory import DID, make_item
+
+import bsky_decode
+from bsky_records import decode_feed_page, feed_page_to_skeets
+
+
+def make_record_page(rng, size=100):
+    records = []
+    for i in range(size):
+        value = {
+            "$type": "app.bsky.feed.post",
+            "createdAt": f"2024-01-{1 + i % 28:02d}T10:00:00.000Z",
+            "langs": ["de"],
+            "text": "Ein Skeet mit etwas Text, wie er typischerweise im Feed steht. " * rng.randint(1, 3),
+        }
+        records.append({"uri": f"at://{DID}/app.bsky.feed.post/3k{i:011d}", "cid": f"bafyreib{i:052d}", "value": value})
+    return json.dumps({"records": records, "cursor": "3k00000000099"}).encode()
+
+
+def make_feed_page(rng, size=100):
+    return json.dumps({"feed": [make_item(i, rng) for i in range(size)], "cursor": "2024-01-01T00:00:00.000Z"}).encode()
+
+
+def response_json(content):
+    """Was response.json() macht: Bytes in Text umwandeln, dann alles dekodieren."""
+    return json.loads(content.decode("utf-8"))
+
+
+def response_json_skeets(content):
+    """Bisheriger Weg für Feed-Seiten: response.json(), danach in Skeets umwandeln."""
+    return feed_page_to_skeets(response_json(content)["feed"])
+
+
+def per_page(func, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(content)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def load(path, fallback):
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    return fallback
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--feed")
+    parser.add_argument("--records")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    pages = {
+        "getAuthorFeed": (load(args.feed, make_feed_page(rng)), response_json_skeets, decode_feed_page),
+        "listRecords": (load(args.records, make_record_page(rng)), response_json, bsky_decode.decode_record_page),
+    }
+
+    decoders = [("json", None)]
+    if bsky_decode.orjson is not None:
+        decoders.append(("orjson", bsky_decode.orjson))
+
+    for name, (content, old, decode) in pages.items():
+        baseline = per_page(old, content, args.repeat)
+        print(f"{name:<14} {len(content) / 1024:7.1f} KiB  response.json(): {baseline:7.3f} ms/Seite")
+        for decoder_name, decoder in decoders:
+            bsky_decode.orjson = decoder
+            took = per_page(decode, content, args.repeat)
+            print(f"{'':<14} {'':>11}  bsky_decode ({decoder_name}): {took:7.3f} ms/Seite  ({baseline / took:4.1f}x)")
+        bsky_decode.orjson = decoders[-1][1]
+
+
+if __name__ == "__main__":
+    main()
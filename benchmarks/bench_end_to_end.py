@@ -0,0 +1,169 @@
+"""Misst Abruf, Analyse und Löschen der Skripte von Anfang bis Ende gegen den lokalen Mock-Server.
+
+Aufruf: python benchmarks/bench_end_to_end.py [--posts 5000] [--reposts 2000] [--latency-ms 20] [--rate-limit 3000] [--hosts]
+
+Für jedes Szenario wird ein frisches synthetisches Konto angelegt (siehe mock_xrpc.py), damit die Läufe
+reproduzierbar und unabhängig voneinander sind. Ausgegeben werden Dauer, Durchsatz und Requests pro
+Phase. Journal-, Index- und Archivdateien landen in einem temporären Verzeichnis. Mit --hosts liegen die Konten
+auf einem eigenen PDS-Server und Feeds kommen von einem eigenen AppView-Server, am Ende werden die
+Requests pro Host ausgegeben.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from _scripts import COMBINED, UNDO_REPOSTS, V8, load_script
+from mock_xrpc import MockXrpcServer, account_from_args, add_account_arguments
+
+from bsky_archive import ArchiveWriter, default_archive_path
+from bsky_async import own_liked_posts, run_parallel
+from bsky_client import XrpcClient
+from bsky_store import RecordStore, default_store_path
+
+
+class ConsoleChannel:
+    """Ersatz für den ProgressChannel der Oberfläche: Dialoge werden nur ausgegeben."""
+
+    def phase(self, name, total=None):
+        pass
+
+    def progress(self, done, total=None):
+        pass
+
+    def add_errors(self, count=1):
+        pass
+
+    def detail(self, text):
+        pass
+
+    def call(self, func, *args):
+        print("   ", " - ".join(str(arg) for arg in args[:2]))
+
+
+class Scenario:
+    """Ein Skript auf einem eigenen Konto, Phasen werden einzeln gemessen."""
+
+    def __init__(self, name, hosts, args, handle):
+        self.name = name
+        self.hosts = hosts
+        server, pds, appview = hosts["Einstieg"], hosts.get("PDS"), hosts.get("AppView")
+        self.account = server.add_account(account_from_args(args, handle), pds)
+        if appview is not None:
+            appview.add_account(self.account)
+        self.client = XrpcClient(server.url, appview=appview.url if appview else None)
+        self.client.login(handle, "egal")
+
+    def request_count(self):
+        return sum(sum(server.requests.values()) for server in self.hosts.values())
+
+    @contextlib.contextmanager
+    def phase(self, label, count=None):
+        """Misst eine Phase. count ist eine Funktion, die nach der Phase die Anzahl der Einträge liefert."""
+        before = self.request_count()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+        took = time.perf_counter() - start
+        requests = self.request_count() - before
+        items = count() if count else None
+        rate = f"{items / took:10.0f}/s" if items else f"{'':>12}"
+        shown = f"{items:>8}" if items is not None else f"{'':>8}"
+        print(f"  {self.name:<14} {label:<24} {shown} {took:8.2f}s {rate} {requests:>7} Requests")
+
+
+def run_v8(hosts, args):
+    """Dieselbe Abfolge wie die Oberfläche: Index abgleichen, Filter als Abfrage, archivieren und löschen."""
+    v8 = load_script(V8)
+    scenario = Scenario("v8", hosts, args, "v8.mock.social")
+    client, did = scenario.client, scenario.account.did
+    store = RecordStore(default_store_path(did))
+    result = {}
+
+    def sync():
+        result["liked"] = run_parallel(client, lambda engine: store.sync_async(engine, did),
+                                       lambda engine: own_liked_posts(engine, did))[1]
+
+    with scenario.phase("Abgleich Index+Likes", lambda: store.count(did)):
+        sync()
+    with scenario.phase("Abgleich erneut", lambda: store.count(did)):
+        sync()
+    with scenario.phase("Analyse (Index)", lambda: store.count(did)):
+        filter_date = datetime.utcnow() - timedelta(days=args.days // 2)
+        result["delete"] = list(store.select_posts_to_delete(did, 5, 2, True, True, result["liked"], filter_date, True,
+                                                             client=client))
+    with scenario.phase("Archiv-Inhalte", lambda: len(result["delete"])):
+        store.fill_values(client, did, result["delete"])
+    archive = ArchiveWriter(default_archive_path(did), store.archive_entries)
+    try:
+        with scenario.phase("Archiv+Löschen", lambda: len(result["delete"])):
+            results = v8.delete_single_skeets(client, result["delete"], None, lambda done, total: None, archive=archive)
+            store.remove([uri for uri, error in results.items() if error is None])
+    finally:
+        archive.close()
+        store.close()
+
+
+def run_combined(hosts, args):
+    """combined.py: ein Sweep über Skeets, Reposts und Likes (bsky_retention)."""
+    combined = load_script(COMBINED)
+    combined.Tage_behalten = args.days // 2
+    combined.Likes_loeschen = True
+    combined.Repo_Export = False
+    scenario = Scenario("combined", hosts, args, "combined.mock.social")
+    before = sum(len(records) for records in scenario.account.records.values())
+
+    with scenario.phase("Alles (Abruf+Löschen)", lambda: before - sum(len(records) for records in scenario.account.records.values())):
+        combined.sweep_old_records(scenario.client)
+
+
+def run_undo_reposts(hosts, args):
+    undo = load_script(UNDO_REPOSTS)
+    scenario = Scenario("undo reposts", hosts, args, "undo.mock.social")
+    reposts_before = len(scenario.account.records["app.bsky.feed.repost"])
+    keep_date = datetime.utcnow() - timedelta(days=args.days // 2)
+
+    with scenario.phase("Reposts (Abruf+Löschen)", lambda: reposts_before - len(scenario.account.records["app.bsky.feed.repost"])):
+        undo.delete_reposts_before(scenario.client, keep_date, ConsoleChannel(), False)
+
+
+SCENARIOS = {"v8": run_v8, "combined": run_combined, "undo": run_undo_reposts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_account_arguments(parser)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--hosts", action="store_true", help="Einstiegsdienst, PDS und AppView als getrennte Server")
+    args = parser.parse_args()
+
+    def new_server():
+        return MockXrpcServer(latency=args.latency_ms / 1000, rate_limit=args.rate_limit, rate_window=args.rate_window).start()
+
+    server = new_server()
+    hosts = {"Einstieg": server}
+    if args.hosts:
+        hosts.update(PDS=new_server(), AppView=new_server())
+    print(f"Mock-Server {server.url}: {args.posts} Posts, {args.reposts} Reposts, {args.likes} Likes, "
+          f"Latenz {args.latency_ms:.0f} ms, Rate-Limit {args.rate_limit or 'keins'}")
+
+    workdir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for name in args.scenarios:
+                SCENARIOS[name](hosts, args)
+        finally:
+            os.chdir(workdir)
+            for host in hosts.values():
+                host.shutdown()
+
+    for name, host in hosts.items():
+        print(f"Requests an {name}:", ", ".join(f"{nsid} {count}" for nsid, count in host.requests.most_common()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Speicherbedarf der Skeets vor und nach der Umwandlung in kompakte Skeet-Objekte.
+
+Aufruf: python benchmarks/bench_memory.py [--size 100000]
+
+Die Feed-Einträge werden wie von getAuthorFeed mit Profil, Text, Embed, Labels und Viewer-Status
+erzeugt und per json.loads dekodiert, damit jeder String ein eigenes Objekt ist wie bei einer echten
+Antwort. Gemessen wird mit tracemalloc, angegeben pro 100k Skeets.
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from _scripts import REPO_DIR  # noqa: F401  (setzt den Suchpfad für die Module)
+
+from bsky_records import feed_page_to_skeets
+
+DID = "did:plc:benchmarkbenchmarkbench"
+PAGE_SIZE = 100
+
+
+def make_item(i, rng):
+    uri = f"at://{DID}/app.bsky.feed.post/3k{i:011d}"
+    item = {
+        "post": {
+            "uri": uri,
+            "cid": f"bafyreib{i:052d}",
+            "author": {
+                "did": DID,
+                "handle": "benchmark.bsky.social",
+                "displayName": "Benchmark Konto",
+                "avatar": f"https://cdn.bsky.app/img/avatar/plain/{DID}/bafkreiavatar@jpeg",
+                "viewer": {"muted": False, "blockedBy": False},
+                "labels": [],
+                "createdAt": "2023-04-01T12:00:00.000Z",
+            },
+            "record": {
+                "$type": "app.bsky.feed.post",
+                "createdAt": f"2024-01-{1 + i % 28:02d}T10:00:00.000Z",
+                "langs": ["de"],
+                "text": "Ein Skeet mit etwas Text, wie er typischerweise im Feed steht. " * rng.randint(1, 3),
+            },
+            "replyCount": rng.randint(0, 5),
+            "repostCount": rng.randint(0, 5),
+            "likeCount": rng.randint(0, 20),
+            "quoteCount": 0,
+            "indexedAt": f"2024-01-{1 + i % 28:02d}T10:00:01.000Z",
+            "viewer": {"threadMuted": False, "embeddingDisabled": False},
+            "labels": [],
+        }
+    }
+    if rng.random() < 0.3:
+        item["post"]["embed"] = {
+            "$type": "app.bsky.embed.external#view",
+            "external": {"uri": "https://example.org/artikel", "title": "Ein Artikel", "description": "Beschreibung"},
+        }
+    if i and rng.random() < 0.3:
+        parent = f"at://{DID}/app.bsky.feed.post/3k{i - 1:011d}"
+        item["reply"] = {"parent": {"uri": parent, "cid": "bafyparent"}, "root": {"uri": parent, "cid": "bafyroot"}}
+    return item
+
+
+def make_pages(size, seed=1):
+    """Seiten als JSON-Text, wie sie über die Leitung kommen."""
+    rng = random.Random(seed)
+    return [json.dumps({"feed": [make_item(i, rng) for i in range(start, min(size, start + PAGE_SIZE))]})
+            for start in range(0, size, PAGE_SIZE)]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000)
+    args = parser.parse_args()
+
+    pages = make_pages(args.size)
+    per_100k = 100000 / args.size
+
+    def raw():
+        items = []
+        for page in pages:
+            items.extend(json.loads(page)["feed"])
+        return items
+
+    def compact():
+        skeets = []
+        for page in pages:
+            skeets.extend(feed_page_to_skeets(json.loads(page)["feed"]))
+        return skeets
+
+    items, raw_current, raw_peak = measure(raw)
+    del items
+    skeets, compact_current, compact_peak = measure(compact)
+
+    mb = 1024 * 1024
+    print(f"{args.size} Skeets, Angaben pro 100k Skeets:")
+    print(f"  Feed-Einträge (Dicts):  {raw_current * per_100k / mb:8.1f} MB  (Spitze {raw_peak * per_100k / mb:8.1f} MB)")
+    print(f"  Skeet-Objekte:          {compact_current * per_100k / mb:8.1f} MB  (Spitze {compact_peak * per_100k / mb:8.1f} MB)")
+    print(f"  Faktor:                 {raw_current / compact_current:8.1f}x")
+    assert len(skeets) == args.size
+
+
+if __name__ == "__main__":
+    main()
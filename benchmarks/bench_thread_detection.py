@@ -0,0 +1,115 @@
+"""Vergleicht die alte O(n²)-Threaderkennung mit der indexbasierten auf synthetischen Feeds.
+
+Aufruf: python benchmarks/bench_thread_detection.py [--sizes 1000 100000 1000000] [--legacy-max 20000]
+
+Die alte Variante braucht bei 100k Skeets Stunden, deshalb läuft sie nur bis --legacy-max.
+Darüber wird nur die neue Variante gemessen.
+"""
+import argparse
+import random
+import time
+
+from _scripts import SINGLE_SKEETS, V8, load_script
+
+from bsky_records import feed_page_to_skeets
+
+DID = "did:plc:benchmark"
+
+
+def make_feed(size, reply_ratio=0.3, seed=1):
+    """Erzeugt einen Feed wie getAuthorFeed ihn liefert: neueste Skeets zuerst."""
+    rng = random.Random(seed)
+    posts = []
+    for i in range(size):
+        uri = f"at://{DID}/app.bsky.feed.post/{i:012d}"
+        skeet = {
+            "post": {
+                "uri": uri,
+                "author": {"did": DID},
+                "likeCount": rng.randint(0, 20),
+                "repostCount": rng.randint(0, 5),
+                "indexedAt": f"20{20 + i * 5 // size:02d}-01-01T00:00:00.000Z",
+            }
+        }
+        if i and rng.random() < reply_ratio:
+            parent = posts[rng.randint(max(0, i - 50), i - 1)]["post"]["uri"]
+            skeet["reply"] = {"parent": {"uri": parent}, "root": {"uri": parent}}
+        posts.append(skeet)
+    posts.reverse()
+    return posts
+
+
+def legacy_single_threads(skeets):
+    """Alte Threaderkennung aus blueskey_delete_all_single_skeets.py."""
+    skeet_dict = {skeet['post']['uri']: skeet for skeet in skeets}
+    thread_uris = set()
+    for skeet in skeets:
+        if skeet['post']['uri'] in thread_uris:
+            continue
+        if 'reply' in skeet:
+            parent_uri = skeet['reply']['parent']['uri']
+            if parent_uri in skeet_dict and skeet_dict[parent_uri]['post']['author']['did'] == skeet['post']['author']['did']:
+                thread_uris.add(skeet['post']['uri'])
+                thread_uris.add(parent_uri)
+        for reply in skeets:
+            if 'reply' in reply and reply['reply']['parent']['uri'] == skeet['post']['uri']:
+                thread_uris.add(skeet['post']['uri'])
+                thread_uris.add(reply['post']['uri'])
+    return thread_uris
+
+
+def legacy_v8_threads(skeets):
+    """Alte Threaderkennung aus analyze_skeets in v8."""
+    thread_uris = set()
+    for skeet in skeets:
+        if skeet['post']['uri'] in thread_uris:
+            continue
+        if 'reply' in skeet:
+            parent_uri = skeet['reply']['parent']['uri']
+            if parent_uri in thread_uris:
+                thread_uris.add(skeet['post']['uri'])
+                continue
+        for reply in skeets:
+            if 'reply' in reply and reply['reply']['parent']['uri'] == skeet['post']['uri']:
+                thread_uris.add(skeet['post']['uri'])
+                thread_uris.add(reply['post']['uri'])
+    return thread_uris
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    args = parser.parse_args()
+
+    single = load_script(SINGLE_SKEETS)
+    v8 = load_script(V8)
+
+    for size in args.sizes:
+        feed = make_feed(size)
+        skeets = feed_page_to_skeets(feed)
+        (threads, _), new_single = timed(single.analyze_skeets, skeets)
+        new_single_uris = {skeet.uri for skeet in threads}
+        new_v8_uris, new_v8 = timed(v8.find_thread_uris, skeets)
+        print(f"{size:>9} Skeets  neu: single {new_single:8.3f}s  v8 {new_v8:8.3f}s  Threadskeets {len(new_v8_uris)}")
+
+        if size > args.legacy_max:
+            print(f"{'':>9}         alt: übersprungen (größer als --legacy-max {args.legacy_max})")
+            continue
+
+        old_single_uris, old_single = timed(legacy_single_threads, feed)
+        old_v8_uris, old_v8 = timed(legacy_v8_threads, feed)
+        print(f"{'':>9}         alt: single {old_single:8.3f}s  v8 {old_v8:8.3f}s")
+        if old_single_uris != new_single_uris or old_v8_uris != new_v8_uris:
+            raise SystemExit(f"Abweichende Ergebnisse bei {size} Skeets")
+        print(f"{'':>9}         Ergebnisse identisch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Prüft den Repo-Export (bsky_car) offline: gegen eine CAR-Datei im Repo und gegen getRepo des Mock-Servers.
+
+Aufruf: python benchmarks/check_export.py [--posts 300] [--fixture-neu]
+
+fixtures/repo.car ist ein kleines Repo mit Posts (auch Antworten), Reposts, Likes und einem Profil,
+das nicht geliefert werden darf. Die Blöcke liegen in gemischter Reihenfolge: ein Teil der Records vor,
+der Rest nach den MST-Knoten, ein Record-Block kommt doppelt vor, und zwei Likes haben denselben Inhalt
+und damit dieselbe CID. fixtures/repo.json enthält die erwarteten Records (URI -> Inhalt).
+--fixture-neu erzeugt beide Dateien neu aus einem festen synthetischen Konto.
+
+Danach läuft alles, was den Export nutzt, gegen getRepo des Mock-Servers und wird mit listRecords
+verglichen: iter_repo_records, RecordStore.fill_values, RecordValues.fill und plan_retention mit
+use_export=True.
+"""
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from mock_xrpc import REPOST_COLLECTION, MockAccount, MockXrpcServer, write_car
+
+from bsky_archive import RecordValues
+from bsky_car import decode_dag_cbor, iter_car_blocks, iter_car_records, iter_repo_records
+from bsky_client import XrpcClient
+from bsky_records import LIKE_COLLECTION, POST_COLLECTION
+from bsky_retention import Rule, plan_retention
+from bsky_store import RecordStore
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_CAR = os.path.join(FIXTURES, "repo.car")
+FIXTURE_JSON = os.path.join(FIXTURES, "repo.json")
+
+PROFILE_COLLECTION = "app.bsky.actor.profile"
+COLLECTIONS = (POST_COLLECTION, REPOST_COLLECTION, LIKE_COLLECTION)
+
+
+def fixture_account():
+    """Festes kleines Konto für die Fixture, mit Profil und zwei Likes gleichen Inhalts."""
+    account = MockAccount("fixture.bsky.social", posts=12, reposts=5, likes=6, reply_ratio=0.4, days=30,
+                          end=1700000000, seed=7)
+    likes = account.records[LIKE_COLLECTION]
+    first, second = account.keys[LIKE_COLLECTION][:2]
+    likes[second] = dict(likes[first])
+    account.records[PROFILE_COLLECTION] = {"self": {"$type": PROFILE_COLLECTION, "displayName": "Fixture"}}
+    return account
+
+
+def write_fixture():
+    account = fixture_account()
+    commit, blocks = account.repo_blocks()
+    nodes = [(cid, data) for cid, data in blocks[1:] if "e" in decode_dag_cbor(data)]
+    records = [(cid, data) for cid, data in blocks[1:] if "e" not in decode_dag_cbor(data)]
+    half = len(records) // 2
+    # Gemischte Reihenfolge: Records vor und nach ihren MST-Einträgen, ein Block doppelt
+    ordered = [blocks[0]] + records[:half] + nodes + records[half:] + [records[0]]
+    os.makedirs(FIXTURES, exist_ok=True)
+    with open(FIXTURE_CAR, "wb") as f:
+        f.write(write_car([commit], ordered))
+    expected = {account.uri(collection, rkey): value
+                for collection in COLLECTIONS for rkey, value in account.records[collection].items()}
+    with open(FIXTURE_JSON, "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=1, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    print(f"{FIXTURE_CAR}: {len(ordered)} Blöcke, {len(expected)} Records")
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"Fehler: {message}")
+
+
+def check_fixture():
+    """Parst die Fixture und vergleicht mit den erwarteten Records, prüft dabei, was die Datei abdecken soll."""
+    with open(FIXTURE_JSON, encoding="utf-8") as f:
+        expected = json.load(f)
+    did = next(iter(expected))[5:].split("/")[0]
+
+    with open(FIXTURE_CAR, "rb") as f:
+        blocks = list(iter_car_blocks(f))
+    cids = [cid for cid, _ in blocks]
+    positions = [i for i, (_, data) in enumerate(blocks) if "e" in decode_dag_cbor(data)]
+    nodes = [decode_dag_cbor(blocks[i][1]) for i in positions]
+    check(len(cids) != len(set(cids)), "Fixture enthält keinen doppelten Block")
+    check(any(entry["p"] > 0 for node in nodes for entry in node["e"]), "Fixture enthält keine präfixkomprimierten Schlüssel")
+    check(len(nodes) > 1, "Fixture hat nur einen MST-Knoten")
+    check(positions[0] > 1 and positions[-1] < len(blocks) - 1, "Fixture hat nicht Records vor und nach den MST-Knoten")
+
+    with open(FIXTURE_CAR, "rb") as f:
+        records = list(iter_car_records(f, did))
+    found = {record["uri"]: record["value"] for record in records}
+    check(len(records) == len(found), "Records doppelt geliefert")
+    check(found == expected, f"{len(found)} Records gelesen, {len(expected)} erwartet oder abweichender Inhalt")
+    for record in records:
+        check(record["uri"] == f"at://{did}/{record['collection']}/{record['rkey']}", f"URI passt nicht: {record['uri']}")
+
+    with open(FIXTURE_CAR, "rb") as f:
+        reposts = {record["uri"] for record in iter_car_records(f, did, (REPOST_COLLECTION,))}
+    check(reposts == {uri for uri in expected if f"/{REPOST_COLLECTION}/" in uri}, "Auswahl der Collections stimmt nicht")
+
+    counts = {collection: sum(f"/{collection}/" in uri for uri in expected) for collection in COLLECTIONS}
+    print(f"Fixture:        {len(blocks)} Blöcke, {len(nodes)} MST-Knoten, "
+          + ", ".join(f"{count} {collection.rsplit('.', 1)[1]}" for collection, count in counts.items()) + "  OK")
+
+
+def list_all(client, did, collection):
+    records, cursor = {}, None
+    while True:
+        params = {"repo": did, "collection": collection, "limit": 100}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("com.atproto.repo.listRecords", params=params).json()
+        records.update((record["uri"], record["value"]) for record in data["records"])
+        cursor = data.get("cursor")
+        if not cursor:
+            return records
+
+
+def check_mock(posts):
+    """Alle Wege über den Export gegen getRepo des Mock-Servers, verglichen mit listRecords."""
+    account = MockAccount(posts=posts, reposts=posts // 2, likes=posts // 2, days=365)
+    server = MockXrpcServer().start()
+    server.add_account(account)
+    client = XrpcClient(server.url)
+    client.login(account.handle, "egal")
+    did = account.did
+    try:
+        expected = {}
+        for collection in COLLECTIONS:
+            expected.update(list_all(client, did, collection))
+        exported = {record["uri"]: record["value"] for record in iter_repo_records(client, did)}
+        check(exported == expected, f"getRepo lieferte {len(exported)} Records, listRecords {len(expected)}")
+        print(f"iter_repo_records: {len(exported)} Records wie listRecords  OK")
+
+        sample = sorted(expected)[::7]
+        values = RecordValues()
+        check(values.fill(client, did, sample) == len(sample), "RecordValues.fill hat nicht alle Records ergänzt")
+        entries = {uri: json.loads(value) for uri, _, value, _, _ in values(sample)}
+        check(entries == {uri: expected[uri] for uri in sample}, "RecordValues.fill: abweichender Inhalt")
+        print(f"RecordValues.fill: {len(sample)} Records  OK")
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = RecordStore(os.path.join(directory, "index.sqlite"))
+            store.sync(client, did)
+            posts_uris = [uri for uri in sample if f"/{POST_COLLECTION}/" in uri]
+            with store.db:
+                store.db.executemany("UPDATE records SET value = NULL WHERE uri = ?", [(uri,) for uri in posts_uris])
+            check(store.fill_values(client, did, posts_uris) == len(posts_uris), "fill_values hat nicht alle Posts ergänzt")
+            rows = {uri: json.loads(value) for uri, _, value, _, _ in store.archive_entries(posts_uris)}
+            check(rows == {uri: expected[uri] for uri in posts_uris}, "fill_values: abweichender Inhalt")
+            store.close()
+        print(f"RecordStore.fill_values: {len(posts_uris)} Posts  OK")
+
+        rules = {POST_COLLECTION: Rule(keep_days=90, min_likes=3, keep_threads=True, keep_self_liked=True),
+                 REPOST_COLLECTION: Rule(keep_days=30), LIKE_COLLECTION: Rule(keep_days=120)}
+        now = datetime.now(timezone.utc)
+        by_pages = plan_retention(client, did, rules, now=now)
+        by_export = plan_retention(client, did, rules, use_export=True, now=now)
+        check(by_export == by_pages, f"plan_retention: Export {len(by_export)} Einträge, listRecords {len(by_pages)}")
+        print(f"plan_retention mit Export: {len(by_export)} Einträge wie mit listRecords  OK")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--fixture-neu", action="store_true", help="fixtures/repo.car und repo.json neu erzeugen")
+    args = parser.parse_args()
+
+    if args.fixture_neu:
+        write_fixture()
+    check_fixture()
+    check_mock(args.posts)
+
+
+if __name__ == "__main__":
+    main()
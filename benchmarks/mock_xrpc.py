@@ -0,0 +1,577 @@
+"""Lokaler XRPC-Server als Ersatz für bsky.social, damit sich die Skripte ohne echtes Konto messen lassen.
+
+Unterstützt createSession, refreshSession, getAuthorFeed, listRecords (auch mit reverse), getActorLikes,
+getPosts, getRepo (CAR-Datei mit MST wie bei einem PDS), deleteRecord und applyWrites. Die Konten werden synthetisch erzeugt: Anzahl Posts, Reposts
+und Likes, Anteil Antworten (Threads), Verteilung der Likes und Reposts, Zeitraum. Latenz pro Request
+und ein Rate-Limit mit RateLimit-Headern und 429 lassen sich einstellen.
+
+Eigenständig starten und die Skripte darauf zeigen lassen:
+
+    python benchmarks/mock_xrpc.py --posts 5000 --port 8765
+    BSKY_SERVICE=http://127.0.0.1:8765 python bsky_delete_v8_favs-reskeets-thread-ownfavs-date-allskeets.py
+
+Benutzername ist der Handle (Standard: mock.bsky.social), das Passwort ist beliebig.
+
+Mehrere Hosts lassen sich mit mehreren Servern nachstellen: add_account(konto, pds=anderer_server)
+legt das Konto zusätzlich auf dem PDS-Server an. createSession liefert ein DID-Dokument, das auf
+diesen PDS zeigt, und GET /<did> beantwortet jeder Server wie das PLC-Verzeichnis. Jeder Server
+zählt seine Requests selbst, so lässt sich prüfen, welcher Host was abbekommt. Mit --hosts startet
+main() Einstiegsdienst, PDS und AppView auf drei aufeinanderfolgenden Ports.
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from _scripts import REPO_DIR  # noqa: F401  (setzt den Suchpfad für die Module)
+
+from bsky_car import CID
+from bsky_records import LIKE_COLLECTION, POST_COLLECTION, timestamp_to_tid
+
+REPOST_COLLECTION = "app.bsky.feed.repost"
+OTHER_DID = "did:plc:mockotheraccount0000000"
+FEED_LIMIT = 50
+MAX_LIMIT = 100
+MAX_WRITES = 200
+
+
+def iso(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def encode_dag_cbor(value):
+    """Kodiert einen Wert als DAG-CBOR: Map-Schlüssel nach Länge, dann bytewise sortiert, CIDs als Tag 42."""
+    def head(major, argument):
+        if argument < 24:
+            return bytes([major << 5 | argument])
+        for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+            if argument < 1 << (8 * size):
+                return bytes([major << 5 | info]) + argument.to_bytes(size, "big")
+        raise ValueError(f"Zahl zu groß für CBOR: {argument}")
+
+    if value is None:
+        return b"\xf6"
+    if value is True or value is False:
+        return b"\xf5" if value else b"\xf4"
+    if isinstance(value, int):
+        return head(0, value) if value >= 0 else head(1, -1 - value)
+    if isinstance(value, CID):
+        return b"\xd8\x2a" + head(2, len(value) + 1) + b"\x00" + value
+    if isinstance(value, bytes):
+        return head(2, len(value)) + value
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return head(3, len(data)) + data
+    if isinstance(value, list):
+        return head(4, len(value)) + b"".join(encode_dag_cbor(item) for item in value)
+    if isinstance(value, dict):
+        keys = sorted((key.encode("utf-8"), key) for key in value)
+        keys.sort(key=lambda item: len(item[0]))
+        return head(5, len(value)) + b"".join(encode_dag_cbor(key) + encode_dag_cbor(value[key]) for _, key in keys)
+    raise TypeError(f"Nicht als DAG-CBOR darstellbar: {type(value).__name__}")
+
+
+def block(value):
+    """(CIDv1 dag-cbor/sha2-256, Blockdaten) für einen Wert."""
+    data = encode_dag_cbor(value)
+    return CID(b"\x01\x71\x12\x20" + hashlib.sha256(data).digest()), data
+
+
+def mst_layer(key):
+    """Ebene eines Schlüssels im MST: führende Null-Bits des SHA-256 in Zweiergruppen (Verzweigung 4)."""
+    digest = int.from_bytes(hashlib.sha256(key).digest(), "big")
+    return (256 - digest.bit_length()) // 2
+
+
+def build_mst(items):
+    """Baut den MST zu sortierten (Schlüssel, Record-CID). Rückgabe: (Wurzel-CID, Knotenblöcke, Wurzel zuerst).
+
+    Schlüssel sind wie im Repo "<Collection>/<rkey>" und innerhalb eines Knotens präfixkomprimiert.
+    """
+    nodes = []
+
+    def node(entries, layer):
+        result = {"l": None, "e": []}
+        below = []
+        previous = b""
+
+        def subtree():
+            if not below:
+                return None
+            cid = node(below[:], layer - 1)
+            below.clear()
+            return cid
+
+        for key, cid, key_layer in entries:
+            if key_layer < layer:
+                below.append((key, cid, key_layer))
+                continue
+            link = subtree()
+            if result["e"]:
+                result["e"][-1]["t"] = link
+            else:
+                result["l"] = link
+            prefix = 0
+            while prefix < min(len(key), len(previous)) and key[prefix] == previous[prefix]:
+                prefix += 1
+            result["e"].append({"p": prefix, "k": key[prefix:], "v": cid, "t": None})
+            previous = key
+        link = subtree()
+        if result["e"]:
+            result["e"][-1]["t"] = link
+        else:
+            result["l"] = link
+        cid, data = block(result)
+        nodes.append((cid, data))
+        return cid
+
+    entries = [(key, cid, mst_layer(key)) for key, cid in items]
+    root = node(entries, max((layer for _, _, layer in entries), default=0))
+    nodes.reverse()
+    return root, nodes
+
+
+def write_car(roots, blocks):
+    """CAR-Datei (Version 1) aus den Wurzel-CIDs und (CID, Blockdaten) in der gegebenen Reihenfolge."""
+    def varint(value):
+        out = bytearray()
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+        return bytes(out)
+
+    header = encode_dag_cbor({"version": 1, "roots": roots})
+    parts = [varint(len(header)), header]
+    for cid, data in blocks:
+        parts += [varint(len(cid) + len(data)), cid, data]
+    return b"".join(parts)
+
+
+class MockAccount:
+    """Synthetisches Konto mit Posts, Reposts und Likes, rkeys sind TIDs passend zum Erstellungsdatum."""
+
+    def __init__(self, handle="mock.bsky.social", posts=1000, reposts=500, likes=500, reply_ratio=0.3,
+                 engagement_skew=1.5, self_like_ratio=0.1, days=3 * 365, end=None, seed=1):
+        rng = random.Random(seed)
+        self.handle = handle
+        self.did = "did:plc:" + hashlib.sha256(f"{handle}/{seed}".encode()).hexdigest()[:24]
+        self.lock = threading.Lock()
+        self.records = {POST_COLLECTION: {}, REPOST_COLLECTION: {}, LIKE_COLLECTION: {}}
+        self.keys = {collection: [] for collection in self.records}
+        self.counts = {}
+        end = end or time.time()
+        start = end - days * 86400
+        used = set()
+
+        def new_rkey(seconds):
+            micros = int(seconds * 1000000)
+            while micros in used:
+                micros += 1
+            used.add(micros)
+            return timestamp_to_tid(micros / 1000000)
+
+        def times(count):
+            return sorted(rng.uniform(start, end) for _ in range(count))
+
+        post_uris = []
+        for seconds in times(posts):
+            rkey = new_rkey(seconds)
+            uri = f"at://{self.did}/{POST_COLLECTION}/{rkey}"
+            value = {"$type": POST_COLLECTION, "text": "Synthetischer Skeet " * rng.randint(1, 4),
+                     "createdAt": iso(seconds), "langs": ["de"]}
+            if post_uris and rng.random() < reply_ratio:
+                parent = post_uris[rng.randint(max(0, len(post_uris) - 20), len(post_uris) - 1)]
+                value["reply"] = {"parent": {"uri": parent, "cid": "bafymockparent"},
+                                  "root": {"uri": parent, "cid": "bafymockroot"}}
+            self.add(POST_COLLECTION, rkey, value)
+            # Wenige Skeets mit viel Resonanz, die meisten mit kaum welcher
+            self.counts[uri] = (int(rng.paretovariate(engagement_skew)) - 1, int(rng.paretovariate(engagement_skew * 2)) - 1)
+            post_uris.append(uri)
+
+        for seconds in times(reposts):
+            subject = f"at://{OTHER_DID}/{POST_COLLECTION}/{timestamp_to_tid(seconds - 3600)}"
+            self.add(REPOST_COLLECTION, new_rkey(seconds), {
+                "$type": REPOST_COLLECTION, "createdAt": iso(seconds),
+                "subject": {"uri": subject, "cid": "bafymocksubject"}})
+
+        for seconds in times(likes):
+            if post_uris and rng.random() < self_like_ratio:
+                subject = rng.choice(post_uris)
+            else:
+                subject = f"at://{OTHER_DID}/{POST_COLLECTION}/{timestamp_to_tid(seconds - 60)}"
+            self.add(LIKE_COLLECTION, new_rkey(seconds), {
+                "$type": LIKE_COLLECTION, "createdAt": iso(seconds),
+                "subject": {"uri": subject, "cid": "bafymocksubject"}})
+
+    def add(self, collection, rkey, value):
+        self.records[collection][rkey] = value
+        bisect.insort(self.keys[collection], rkey)
+
+    def delete(self, collection, rkey):
+        """Entfernt einen Record. Der Schlüssel bleibt in der sortierten Liste und wird beim Lesen übersprungen."""
+        with self.lock:
+            return self.records.get(collection, {}).pop(rkey, None) is not None
+
+    def page(self, collection, cursor=None, limit=MAX_LIMIT, reverse=False):
+        """Seite von (rkey, value) wie bei listRecords: neueste zuerst, mit reverse älteste zuerst."""
+        keys = self.keys.get(collection, [])
+        records = self.records.get(collection, {})
+        result = []
+        with self.lock:
+            if reverse:
+                i = bisect.bisect_right(keys, cursor) if cursor else 0
+                while i < len(keys) and len(result) < limit:
+                    if keys[i] in records:
+                        result.append((keys[i], records[keys[i]]))
+                    i += 1
+            else:
+                i = (bisect.bisect_left(keys, cursor) if cursor else len(keys)) - 1
+                while i >= 0 and len(result) < limit:
+                    if keys[i] in records:
+                        result.append((keys[i], records[keys[i]]))
+                    i -= 1
+        return result
+
+    def uri(self, collection, rkey):
+        return f"at://{self.did}/{collection}/{rkey}"
+
+    def repo_blocks(self):
+        """Commit-, MST- und Record-Blöcke des Repos wie bei getRepo: (Commit-CID, [(CID, Blockdaten)])."""
+        with self.lock:
+            records = [(f"{collection}/{rkey}".encode(), value)
+                       for collection, values in self.records.items() for rkey, value in values.items()]
+        records.sort(key=lambda item: item[0])
+        record_blocks = {}
+        items = []
+        for key, value in records:
+            cid, data = block(value)
+            record_blocks[cid] = data  # Gleicher Inhalt ergibt gleiche CID und einen Block
+            items.append((key, cid))
+        root, nodes = build_mst(items)
+        rev = max((key.rsplit(b"/", 1)[1].decode() for key, _ in items), default=timestamp_to_tid(0))
+        commit, commit_data = block({"did": self.did, "version": 3, "data": root, "rev": rev, "prev": None, "sig": bytes(64)})
+        return commit, [(commit, commit_data)] + nodes + list(record_blocks.items())
+
+    def repo_car(self):
+        commit, blocks = self.repo_blocks()
+        return write_car([commit], blocks)
+
+    def post_view(self, rkey, value):
+        uri = self.uri(POST_COLLECTION, rkey)
+        likes, reposts = self.counts.get(uri, (0, 0))
+        return {
+            "uri": uri,
+            "cid": "bafymockpost",
+            "author": {"did": self.did, "handle": self.handle, "displayName": "Mock", "labels": [],
+                       "viewer": {"muted": False, "blockedBy": False}},
+            "record": value,
+            "replyCount": 0,
+            "repostCount": reposts,
+            "likeCount": likes,
+            "quoteCount": 0,
+            "indexedAt": value["createdAt"],
+            "viewer": {},
+            "labels": [],
+        }
+
+    def feed_item(self, rkey, value):
+        item = {"post": self.post_view(rkey, value)}
+        if "reply" in value:
+            parent = {"$type": "app.bsky.feed.defs#postView", "uri": value["reply"]["parent"]["uri"]}
+            item["reply"] = {"parent": parent, "root": parent}
+        return item
+
+
+class RateLimit:
+    """Festes Zeitfenster wie bei bsky.social: höchstens limit Requests pro window Sekunden."""
+
+    def __init__(self, limit=None, window=300):
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.used = 0
+
+    def take(self):
+        """(erlaubt, Header)"""
+        if self.limit is None:
+            return True, {}
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= self.window:
+                self.window_start = now
+                self.used = 0
+            allowed = self.used < self.limit
+            if allowed:
+                self.used += 1
+            reset = self.window_start + self.window
+            headers = {
+                "RateLimit-Limit": str(self.limit),
+                "RateLimit-Remaining": str(self.limit - self.used),
+                "RateLimit-Reset": str(int(reset)),
+                "RateLimit-Policy": f"{self.limit};w={self.window}",
+            }
+            if not allowed:
+                headers["Retry-After"] = str(max(1, int(reset - now)))
+            return allowed, headers
+
+
+class MockXrpcServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, rate_limit=None, rate_window=300):
+        super().__init__(address, MockHandler)
+        self.accounts = {}
+        self.latency = latency
+        self.rate = RateLimit(rate_limit, rate_window)
+        self.requests = Counter()
+        self.stats_lock = threading.Lock()
+        self.pds_urls = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_account(self, account, pds=None):
+        """Legt das Konto an. Mit pds (ein anderer MockXrpcServer) liegt das Repo dort."""
+        self.accounts[account.did] = account
+        self.accounts[account.handle] = account
+        if pds is not None and pds is not self:
+            pds.add_account(account)
+        self.pds_urls[account.did] = (pds or self).url
+        return account
+
+    def did_document(self, did):
+        account = self.accounts.get(did)
+        if account is None or account.did != did:
+            return None
+        return {
+            "@context": ["https://www.w3.org/ns/did/v1"],
+            "id": did,
+            "alsoKnownAs": [f"at://{account.handle}"],
+            "service": [{"id": "#atproto_pds", "type": "AtprotoPersonalDataServer", "serviceEndpoint": self.pds_urls[did]}],
+        }
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def count(self, nsid):
+        with self.stats_lock:
+            self.requests[nsid] += 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Header und Inhalt gehen getrennt raus, mit Nagle würde jede Antwort auf das verzögerte ACK warten
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/did:"):
+            return self.handle_plc(self.path[1:])
+        self.handle_xrpc(None)
+
+    def handle_plc(self, did):
+        """GET /<did> wie beim PLC-Verzeichnis."""
+        self.server.count("plc")
+        document = self.server.did_document(did)
+        if document is None:
+            return self.send_json(404, {"message": f"DID not registered: {did}"})
+        self.send_json(200, document)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.handle_xrpc(json.loads(body) if body else {})
+
+    def send_json(self, status, data, headers=None):
+        content = json.dumps(data).encode()
+        self.send_content(status, content, "application/json; charset=utf-8", headers)
+
+    def send_content(self, status, content, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def error(self, status, error, message, headers=None):
+        self.send_json(status, {"error": error, "message": message}, headers)
+
+    def handle_xrpc(self, body):
+        server = self.server
+        parsed = urlparse(self.path)
+        nsid = parsed.path.rsplit("/", 1)[-1]
+        params = {key: values if key == "uris" else values[0] for key, values in parse_qs(parsed.query).items()}
+        server.count(nsid)
+
+        if server.latency:
+            time.sleep(server.latency)
+        allowed, headers = server.rate.take()
+        if not allowed:
+            return self.error(429, "RateLimitExceeded", "Rate Limit Exceeded", headers)
+
+        handler = getattr(self, "xrpc_" + nsid.replace(".", "_"), None)
+        if handler is None:
+            return self.error(501, "MethodNotImplemented", f"{nsid} wird vom Mock nicht unterstützt", headers)
+        try:
+            status, data = handler(params, body)
+        except KeyError as e:
+            status, data = 400, {"error": "InvalidRequest", "message": f"Fehlender Parameter {e}"}
+        if isinstance(data, bytes):
+            return self.send_content(status, data, "application/vnd.ipld.car", headers)
+        self.send_json(status, data, headers)
+
+    def account(self, name):
+        account = self.server.accounts.get(name)
+        if account is None:
+            raise KeyError(name)
+        return account
+
+    def authorized_account(self):
+        token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+        if not token.startswith("access:"):
+            return None
+        return self.server.accounts.get(token.split(":", 1)[1])
+
+    def session(self, account):
+        return 200, {"accessJwt": f"access:{account.did}", "refreshJwt": f"refresh:{account.did}",
+                     "did": account.did, "handle": account.handle, "didDoc": self.server.did_document(account.did)}
+
+    def xrpc_com_atproto_server_createSession(self, params, body):
+        account = self.server.accounts.get(body.get("identifier"))
+        if account is None:
+            return 401, {"error": "AuthenticationRequired", "message": "Invalid identifier or password"}
+        return self.session(account)
+
+    def xrpc_com_atproto_server_refreshSession(self, params, body):
+        token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+        account = self.server.accounts.get(token.split(":", 1)[-1]) if token.startswith("refresh:") else None
+        if account is None:
+            return 400, {"error": "InvalidToken", "message": "Token could not be verified"}
+        return self.session(account)
+
+    def xrpc_com_atproto_repo_listRecords(self, params, body):
+        account = self.account(params["repo"])
+        limit = min(int(params.get("limit", 50)), MAX_LIMIT)
+        page = account.page(params["collection"], params.get("cursor"), limit, params.get("reverse") == "true")
+        data = {"records": [{"uri": account.uri(params["collection"], rkey), "cid": "bafymockrecord", "value": value}
+                            for rkey, value in page]}
+        if len(page) == limit:
+            data["cursor"] = page[-1][0]
+        return 200, data
+
+    def xrpc_com_atproto_sync_getRepo(self, params, body):
+        return 200, self.account(params["did"]).repo_car()
+
+    def xrpc_app_bsky_feed_getAuthorFeed(self, params, body):
+        account = self.account(params["actor"])
+        limit = min(int(params.get("limit", FEED_LIMIT)), MAX_LIMIT)
+        page = account.page(POST_COLLECTION, params.get("cursor"), limit)
+        data = {"feed": [account.feed_item(rkey, value) for rkey, value in page]}
+        if len(page) == limit:
+            data["cursor"] = page[-1][0]
+        return 200, data
+
+    def xrpc_app_bsky_feed_getActorLikes(self, params, body):
+        account = self.account(params["actor"])
+        limit = min(int(params.get("limit", FEED_LIMIT)), MAX_LIMIT)
+        page = account.page(LIKE_COLLECTION, params.get("cursor"), limit)
+        feed = [{"post": {"uri": value["subject"]["uri"], "cid": "bafymocksubject", "likeCount": 0,
+                          "repostCount": 0, "indexedAt": value["createdAt"]}} for _, value in page]
+        data = {"feed": feed}
+        if len(page) == limit:
+            data["cursor"] = page[-1][0]
+        return 200, data
+
+    def xrpc_app_bsky_feed_getPosts(self, params, body):
+        posts = []
+        for uri in params.get("uris", [])[:25]:
+            did, collection, rkey = uri[5:].split("/")
+            account = self.server.accounts.get(did)
+            value = account.records[POST_COLLECTION].get(rkey) if account and collection == POST_COLLECTION else None
+            if value is not None:
+                posts.append(account.post_view(rkey, value))
+        return 200, {"posts": posts}
+
+    def xrpc_com_atproto_repo_deleteRecord(self, params, body):
+        account = self.authorized_account()
+        if account is None or body["repo"] not in (account.did, account.handle):
+            return 401, {"error": "AuthenticationRequired", "message": "Authentication Required"}
+        account.delete(body["collection"], body["rkey"])
+        return 200, {}
+
+    def xrpc_com_atproto_repo_applyWrites(self, params, body):
+        account = self.authorized_account()
+        if account is None or body["repo"] not in (account.did, account.handle):
+            return 401, {"error": "AuthenticationRequired", "message": "Authentication Required"}
+        writes = body["writes"]
+        if len(writes) > MAX_WRITES:
+            return 400, {"error": "InvalidRequest", "message": f"Too many writes. Max: {MAX_WRITES}"}
+        for write in writes:
+            if write.get("$type") != "com.atproto.repo.applyWrites#delete":
+                return 400, {"error": "InvalidRequest", "message": "Nur Löschungen werden unterstützt"}
+            account.delete(write["collection"], write["rkey"])
+        return 200, {}
+
+
+def add_account_arguments(parser):
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--reposts", type=int, default=2000)
+    parser.add_argument("--likes", type=int, default=2000)
+    parser.add_argument("--reply-ratio", type=float, default=0.3, help="Anteil der Posts, die Antworten sind")
+    parser.add_argument("--engagement-skew", type=float, default=1.5, help="Pareto-Parameter, kleiner = mehr Likes")
+    parser.add_argument("--days", type=int, default=3 * 365, help="Zeitraum, über den das Konto verteilt ist")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requests pro Fenster, ohne Angabe unbegrenzt")
+    parser.add_argument("--rate-window", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def account_from_args(args, handle="mock.bsky.social"):
+    return MockAccount(handle, args.posts, args.reposts, args.likes, args.reply_ratio, args.engagement_skew,
+                       days=args.days, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--handle", default="mock.bsky.social")
+    parser.add_argument("--hosts", action="store_true", help="Einstiegsdienst, PDS und AppView getrennt starten")
+    add_account_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockXrpcServer(("127.0.0.1", args.port), args.latency_ms / 1000, args.rate_limit, args.rate_window)
+    account = account_from_args(args, args.handle)
+    if args.hosts:
+        pds = MockXrpcServer(("127.0.0.1", args.port + 1), args.latency_ms / 1000, args.rate_limit, args.rate_window).start()
+        appview = MockXrpcServer(("127.0.0.1", args.port + 2), args.latency_ms / 1000).start()
+        server.add_account(account, pds)
+        appview.add_account(account)
+        print(f"PDS auf {pds.url}, AppView auf {appview.url} (BSKY_APPVIEW), PLC-Verzeichnis auf {server.url} (BSKY_PLC)")
+    else:
+        server.add_account(account)
+    print(f"Mock-Server auf {server.url}, Konto {account.handle} ({account.did})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
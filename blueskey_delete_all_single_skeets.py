@@ -1,32 +1,15 @@
-import requests
 import json
 from getpass import getpass
-from urllib.parse import urlparse
-
-# token holen
-def get_auth_token(username, password):
-    url = "https://bsky.social/xrpc/com.atproto.server.createSession"
-    payload = {
-        "identifier": username,
-        "password": password
-    }
-
-    response = requests.post(url, json=payload)
-    if response.status_code == 200:
-        return response.json()["accessJwt"], response.json()["did"]
-    else:
-        raise Exception("Authentication failed: " + response.text)
+from bsky_writes import delete_records_concurrent
+from bsky_client import XrpcClient
+from bsky_records import decode_feed_page
+from bsky_metrics import METRICS
 
 # alle skeets holen
-def get_all_skeets(auth_token, did):
-    url = f"https://bsky.social/xrpc/app.bsky.feed.getAuthorFeed?actor={did}"
-    headers = {
-        "Authorization": f"Bearer {auth_token}"
-    }
-
-    response = requests.get(url, headers=headers)
+def get_all_skeets(client, did):
+    response = client.get("app.bsky.feed.getAuthorFeed", params={"actor": did})
     if response.status_code == 200:
-        return response.json()["feed"]
+        return decode_feed_page(response.content)[0]
     else:
         raise Exception("Failed to fetch skeets: " + response.text)
 
@@ -34,61 +17,51 @@ def get_all_skeets(auth_token, did):
 def analyze_skeets(skeets):
     threads = []
     single_skeets = []
-    skeet_dict = {skeet['post']['uri']: skeet for skeet in skeets}
+    skeet_dict = {skeet.uri: skeet for skeet in skeets}
 
-    
+    # jede antwort, deren eltern-skeet auch im feed ist, verbindet beide zu einem thread.
+    # ein durchlauf über den index statt verschachtelter schleife, reihenfolge egal
     thread_uris = set()
 
     for skeet in skeets:
-        if skeet['post']['uri'] in thread_uris:
-            continue
-
-
-        if 'reply' in skeet:
-            parent_uri = skeet['reply']['parent']['uri']
-            if parent_uri in skeet_dict and skeet_dict[parent_uri]['post']['author']['did'] == skeet['post']['author']['did']:
-                thread_uris.add(skeet['post']['uri'])
-                thread_uris.add(parent_uri)
-
-
-        for reply in skeets:
-            if 'reply' in reply and reply['reply']['parent']['uri'] == skeet['post']['uri']:
-                thread_uris.add(skeet['post']['uri'])
-                thread_uris.add(reply['post']['uri'])
+        if skeet.parent_uri in skeet_dict:
+            thread_uris.add(skeet.uri)
+            thread_uris.add(skeet.parent_uri)
 
 
     for skeet in skeets:
-        if skeet['post']['uri'] in thread_uris:
+        if skeet.uri in thread_uris:
             threads.append(skeet)
         else:
             single_skeets.append(skeet)
 
     return threads, single_skeets
 
-# einzelskeets löschen
-def delete_single_skeets(auth_token, single_skeets):
-    url = "https://bsky.social/xrpc/com.atproto.repo.deleteRecord"
-    headers = {
-        "Authorization": f"Bearer {auth_token}",
-        "Content-Type": "application/json"
-    }
+# einzelskeets löschen, gebündelt per applyWrites mit mehreren workern statt ein request pro skeet
+def delete_single_skeets(client, single_skeets, batched=True):
+    if batched:
+        def batch_progress(done, total):
+            print(f"Deleted {done} of {total} Skeets")
 
-    for skeet in single_skeets:
+        results = delete_records_concurrent(client, [skeet.uri for skeet in single_skeets], batch_progress)
+        for uri, error in results.items():
+            if error is not None:
+                print(f"Failed to delete Skeet: {uri} - {error}")
+        return results
 
-        uri_parts = urlparse(skeet['post']['uri'])
-        rkey = uri_parts.path.split('/')[-1]
+    for skeet in single_skeets:
 
         payload = {
             "collection": "app.bsky.feed.post",
-            "repo": skeet['post']['author']['did'],
-            "rkey": rkey
+            "repo": skeet.did,
+            "rkey": skeet.rkey
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = client.post("com.atproto.repo.deleteRecord", json=payload)
         if response.status_code == 200:
-            print(f"Deleted Skeet: {skeet['post']['uri']}")
+            print(f"Deleted Skeet: {skeet.uri}")
         else:
-            print(f"Failed to delete Skeet: {skeet['post']['uri']} - {response.text}")
+            print(f"Failed to delete Skeet: {skeet.uri} - {response.text}")
 
 
 def main():
@@ -96,18 +69,22 @@ def main():
     password = getpass("Enter your Bluesky password: ")
 
     try:
-        auth_token, did = get_auth_token(username, password)
+        client = XrpcClient()
+        _, did = client.login(username, password)
         print("Authentication successful.")
 
-        skeets = get_all_skeets(auth_token, did)
+        with METRICS.phase("abruf", profile=True):
+            skeets = get_all_skeets(client, did)
         print(f"Fetched {len(skeets)} skeets.")
 
-        threads, single_skeets = analyze_skeets(skeets)
+        with METRICS.phase("analyse", profile=True):
+            threads, single_skeets = analyze_skeets(skeets)
         print(f"Threads found: {len(threads)}")
         print(f"Single Skeets to delete: {len(single_skeets)}")
 
         if single_skeets:
-            delete_single_skeets(auth_token, single_skeets)
+            with METRICS.phase("loeschen"):
+                delete_single_skeets(client, single_skeets)
             print("Cleanup completed.")
         else:
             print("No single skeets to delete.")
@@ -0,0 +1,289 @@
+"""Komprimiertes Archiv aller gelöschten Records, nur angehängt, geschrieben vor jedem Lösch-Batch.
+
+Pro Konto gibt es zwei Dateien:
+
+    <pfad>.dat  zlib-Blöcke, einer pro Lösch-Batch, darin eine JSON-Zeile pro Record mit URI, CID,
+                vollständigem Record, Like- und Repost-Zahl
+    <pfad>.idx  ein Eintrag fester Größe (INDEX_ENTRY) pro Record: rkey, Collection, Zeitstempel,
+                Lage des Blocks und Zeile im Block
+
+Der Inhalt kommt aus Daten, die ohnehin schon abgerufen wurden (lokaler Index aus bsky_store, beim
+Abruf gemerkte Records in RecordValues oder ein Repo-Export), nie per getRecord. Auf dem Löschpfad kostet ein Batch damit eine Kompression und zwei
+Schreibzugriffe. Ein abgebrochener Schreibvorgang hinterlässt höchstens einen Block ohne
+Index-Einträge, der nie gelesen wird, oder einen angefangenen Index-Eintrag, der beim Lesen wegfällt.
+
+ArchiveReader bildet beide Dateien per mmap ein und sortiert die Index-Einträge einmal nach rkey.
+Da rkeys TIDs sind, findet dieselbe Binärsuche auch einen Zeitraum (timestamp_to_tid). Entpackt wird
+nur der Block eines Treffers.
+
+Ansehen oder für eine Wiederherstellung exportieren:
+
+    python bsky_archive.py bsky_archive_did_plc_xyz --von 2023-01-01 --bis 2023-06-30
+"""
+import base64
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from bsky_car import CID, LIKE_COLLECTION, POST_COLLECTION, REPOST_COLLECTION, iter_repo_records
+from bsky_records import parse_timestamp, tid_to_timestamp, timestamp_to_tid
+
+# rkey (TIDs haben 13 Zeichen, längere werden abgeschnitten), Collection, Zeitstempel, Block-Offset,
+# Block-Länge, Zeile im Block
+INDEX_ENTRY = struct.Struct("<16sBqQII")
+
+COLLECTION_CODES = {POST_COLLECTION: 0, REPOST_COLLECTION: 1, LIKE_COLLECTION: 2}
+OTHER_COLLECTION = 255
+
+COMPRESSION_LEVEL = 6
+
+
+def default_archive_path(did):
+    """Dateiname des Archivs (ohne .dat/.idx) für ein Konto im aktuellen Verzeichnis."""
+    return f"bsky_archive_{did.replace(':', '_')}"
+
+
+def _json_default(value):
+    """CIDs und Bytes aus einem Repo-Export in der JSON-Form von atproto ($link/$bytes)."""
+    if isinstance(value, CID):
+        return {"$link": "b" + base64.b32encode(value).decode("ascii").lower().rstrip("=")}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode("ascii").rstrip("=")}
+    raise TypeError(f"Nicht als JSON darstellbar: {type(value).__name__}")
+
+
+def record_json(value):
+    """Record-Inhalt als kompakter JSON-Text, auch für Records aus einem Repo-Export."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+def _rkey_key(rkey):
+    return rkey.encode("ascii", "replace")[:16].ljust(16, b"\0")
+
+
+def _split(uri):
+    _, _, rest = uri.partition("at://")
+    _, collection, rkey = rest.split("/", 2)
+    return collection, rkey
+
+
+class RecordValues:
+    """Archivquelle für Läufe ohne lokalen Index (Streaming, Aufräumlauf, Reposts rückgängig machen).
+
+    add(records) merkt sich CID und Inhalt (als JSON-Text) von Records, die der Lauf ohnehin aus
+    listRecords oder einem Repo-Export hat. retain(uris) gibt alles andere frei, sobald feststeht, was
+    gelöscht wird. fill() ergänzt fehlende Inhalte, etwa eines fortgesetzten Auftrags, mit einem
+    einzigen Repo-Export. Aufruf mit URIs wie RecordStore.archive_entries, Zählwerte sind 0. Gelieferte
+    Einträge werden freigegeben, ArchiveWriter fragt jeden Record nur einmal ab.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def add(self, records):
+        entries = {record["uri"]: (record.get("cid"), record_json(record["value"])) for record in records}
+        with self.lock:
+            self.entries.update(entries)
+
+    def retain(self, uris):
+        uris = set(uris)
+        with self.lock:
+            self.entries = {uri: entry for uri, entry in self.entries.items() if uri in uris}
+
+    def fill(self, client, did, uris):
+        """Holt fehlende Inhalte der URIs aus einem einzigen Repo-Export. Rückgabe: Anzahl ergänzt."""
+        with self.lock:
+            missing = {uri for uri in uris if uri not in self.entries}
+        if not missing:
+            return 0
+        collections = tuple({uri.split("/")[3] for uri in missing})
+        found = [record for record in iter_repo_records(client, did, collections) if record["uri"] in missing]
+        self.add(found)
+        return len(found)
+
+    def __call__(self, uris):
+        with self.lock:
+            return [(uri, *self.entries.pop(uri), 0, 0) for uri in uris if uri in self.entries]
+
+
+class ArchiveWriter:
+    """Hängt Records vor dem Löschen ans Archiv an. Aufruf mit einer Liste von URIs, thread-sicher.
+
+    source(uris) liefert für die URIs Tupel (URI, CID, Record als JSON-Text, Likes, Reposts), etwa
+    RecordStore.archive_entries. URIs ohne Eintrag werden mit "record": null archiviert, damit das
+    Archiv trotzdem jede Löschung enthält. Bereits archivierte Records (Wiederholungen, halbierte
+    Batches, fortgesetzte Aufträge) werden nicht noch einmal geschrieben. Mit sync=True wird jeder
+    Block auf die Platte geschrieben, bevor der Batch gelöscht wird.
+    """
+
+    def __init__(self, path, source, sync=True):
+        self.path = path
+        self.source = source
+        self.sync = sync
+        self.lock = threading.Lock()
+        self.archived = set()
+        if os.path.exists(path + ".idx"):
+            with open(path + ".idx", "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            self.archived = {(code, rkey) for rkey, code, *_ in INDEX_ENTRY.iter_unpack(data[:usable])}
+            if usable != len(data):
+                # Angefangenen Eintrag eines abgebrochenen Laufs abschneiden
+                with open(path + ".idx", "r+b") as f:
+                    f.truncate(usable)
+        self.data = open(path + ".dat", "ab")
+        self.index = open(path + ".idx", "ab")
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+    def __call__(self, uris):
+        # Prüfen und Schreiben unter einer Sperre: gleichzeitige Batches mit denselben URIs (Wiederholungen,
+        # halbierte Batches) dürfen weder doppelt schreiben noch vor dem Schreiben schon löschen
+        with self.lock:
+            self._archive(uris)
+
+    def _archive(self, uris):
+        keys = {}
+        for uri in uris:
+            collection, rkey = _split(uri)
+            key = (COLLECTION_CODES.get(collection, OTHER_COLLECTION), _rkey_key(rkey))
+            if key not in self.archived:
+                keys[uri] = (key, rkey)
+        if not keys:
+            return
+
+        found = {entry[0]: entry for entry in self.source(list(keys))}
+        archived_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        lines = []
+        rows = []
+        for line_number, uri in enumerate(sorted(keys, key=lambda uri: keys[uri][1])):
+            _, cid, value, likes, reposts = found.get(uri, (uri, None, None, 0, 0))
+            head = json.dumps({"uri": uri, "cid": cid, "likeCount": likes, "repostCount": reposts, "archivedAt": archived_at},
+                              separators=(",", ":"))
+            lines.append(f'{head[:-1]},"record":{value or "null"}}}')
+            timestamp = tid_to_timestamp(keys[uri][1])
+            if timestamp is None and value:
+                timestamp = parse_timestamp(json.loads(value).get("createdAt"))
+            rows.append((keys[uri][0], timestamp, line_number))
+        block = zlib.compress("\n".join(lines).encode("utf-8"), COMPRESSION_LEVEL)
+
+        offset = self.data.seek(0, os.SEEK_END)
+        self.data.write(block)
+        self.data.flush()
+        if self.sync:
+            os.fsync(self.data.fileno())
+        self.index.write(b"".join(
+            INDEX_ENTRY.pack(key[1], key[0], timestamp or 0, offset, len(block), line_number)
+            for key, timestamp, line_number in rows
+        ))
+        self.index.flush()
+        if self.sync:
+            os.fsync(self.index.fileno())
+        self.archived.update(key for key, _, _ in rows)
+
+
+class ArchiveReader:
+    """Liest ein Archiv per mmap. Einträge sind nach rkey sortiert, Records kommen als Dicts."""
+
+    def __init__(self, path):
+        self.path = path
+        self.maps = []
+        self.entries = []
+        index = self._map(path + ".idx")
+        self.data = self._map(path + ".dat")
+        if index is not None:
+            usable = len(index) - len(index) % INDEX_ENTRY.size
+            self.entries = sorted(INDEX_ENTRY.iter_unpack(index[:usable]))
+        self.keys = [entry[0] for entry in self.entries]
+        self._block = (None, None)
+
+    def _map(self, path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps.append(mapped)
+        return mapped
+
+    def close(self):
+        for mapped in self.maps:
+            mapped.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _lines(self, offset, length):
+        # Der zuletzt entpackte Block bleibt liegen, aufeinanderfolgende rkeys stehen meist im selben
+        if self._block[0] != offset:
+            self._block = (offset, zlib.decompress(self.data[offset:offset + length]).split(b"\n"))
+        return self._block[1]
+
+    def _read(self, entry):
+        _, _, _, offset, length, line_number = entry
+        return json.loads(self._lines(offset, length)[line_number])
+
+    def get(self, rkey, collection=POST_COLLECTION):
+        """Der zuletzt archivierte Record mit diesem rkey oder None."""
+        key = _rkey_key(rkey)
+        code = COLLECTION_CODES.get(collection, OTHER_COLLECTION)
+        position = bisect.bisect_right(self.keys, key)
+        while position > 0 and self.keys[position - 1] == key:
+            position -= 1
+            entry = self.entries[position]
+            if entry[1] == code:
+                record = self._read(entry)
+                if record["uri"].endswith("/" + rkey):
+                    return record
+        return None
+
+    def iter_range(self, start=None, end=None, collection=None):
+        """Records mit start <= rkey < end (TIDs oder None für offen), nach rkey sortiert."""
+        low = bisect.bisect_left(self.keys, _rkey_key(start)) if start else 0
+        high = bisect.bisect_left(self.keys, _rkey_key(end)) if end else len(self.keys)
+        code = COLLECTION_CODES.get(collection, OTHER_COLLECTION) if collection else None
+        for entry in self.entries[low:high]:
+            if code is None or entry[1] == code:
+                yield self._read(entry)
+
+    def iter_between(self, start_seconds=None, end_seconds=None, collection=None):
+        """Records, die zwischen zwei Zeitpunkten (Sekunden seit 1970) erstellt wurden."""
+        start = timestamp_to_tid(start_seconds) if start_seconds is not None else None
+        end = timestamp_to_tid(end_seconds) if end_seconds is not None else None
+        return self.iter_range(start, end, collection)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from datetime import datetime
+    from bsky_records import date_to_timestamp
+
+    parser = argparse.ArgumentParser(description="Gibt archivierte Records als JSON-Zeilen aus.")
+    parser.add_argument("pfad", help="Archiv ohne .dat/.idx, bspw. bsky_archive_did_plc_xyz")
+    parser.add_argument("--rkey", help="Nur diesen Record")
+    parser.add_argument("--collection", default=None, help="Nur diese Collection, bspw. app.bsky.feed.post")
+    parser.add_argument("--von", help="Erstellt ab diesem Datum (JJJJ-MM-TT)")
+    parser.add_argument("--bis", help="Erstellt vor diesem Datum (JJJJ-MM-TT)")
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.pfad)
+    try:
+        if args.rkey:
+            records = [reader.get(args.rkey, args.collection or POST_COLLECTION)]
+        else:
+            start = date_to_timestamp(datetime.strptime(args.von, "%Y-%m-%d")) if args.von else None
+            end = date_to_timestamp(datetime.strptime(args.bis, "%Y-%m-%d")) if args.bis else None
+            records = reader.iter_between(start, end, args.collection)
+        for record in records:
+            if record is not None:
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        reader.close()
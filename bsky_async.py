@@ -0,0 +1,102 @@
+"""Asyncio-Engine, die mehrere Collections gleichzeitig paginiert.
+
+Posts, Reposts und Likes haben jeweils einen eigenen Cursor und hängen nicht voneinander ab. Die
+Engine läuft ihre Seiten parallel ab, begrenzt durch ein Semaphore. Die Requests gehen über die
+gepoolte Session des gemeinsamen XrpcClient (per asyncio.to_thread), damit Login, Verbindungspool
+und Timeouts für alle Wege dieselben bleiben und keine zusätzliche HTTP-Bibliothek nötig ist.
+"""
+import asyncio
+
+from bsky_decode import decode_record_page
+from bsky_records import LIKE_COLLECTION, LIST_RECORDS, LIST_RECORDS_LIMIT, LikedPosts, decode_feed_page, split_before
+
+AUTHOR_FEED = "app.bsky.feed.getAuthorFeed"
+
+# Höchstzahl gleichzeitig laufender Requests
+CONCURRENCY = 4
+
+
+class AsyncEngine:
+    """Paginiert XRPC-Listen nebenläufig über einen XrpcClient."""
+
+    def __init__(self, client, concurrency=CONCURRENCY):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def get(self, nsid, params):
+        async with self.semaphore:
+            return await asyncio.to_thread(self.client.get, nsid, dict(params))
+
+    async def paginate(self, nsid, params, decode, on_page=None, error_text="Fehler beim Abrufen"):
+        """Folgt dem Cursor bis zum Ende. Ohne on_page wird alles gesammelt und zurückgegeben.
+
+        decode(rohinhalt) -> (seite, cursor) ist einer der Dekodierer aus bsky_decode bzw. bsky_records,
+        etwa decode_feed_page, der Feed-Seiten gleich zu Skeets macht. Mit on_page(seite) wird jede Seite
+        sofort übergeben, gibt on_page False zurück, endet die Paginierung.
+        """
+        params = dict(params)
+        items = []
+
+        while True:
+            response = await self.get(nsid, params)
+            if response.status_code != 200:
+                raise Exception(f"{error_text}: {response.text}")
+
+            page, cursor = decode(response.content)
+            if on_page is None:
+                items.extend(page)
+            elif on_page(page) is False:
+                break
+
+            if cursor and page:
+                params["cursor"] = cursor
+            else:
+                break
+
+        return items
+
+    def list_records(self, repo, collection, on_page=None, before=None, cursor=None):
+        """Wie paginate für listRecords. Mit before (TID) vom ältesten an bis zur Grenze, siehe iter_record_pages.
+
+        cursor setzt eine frühere Paginierung fort, der Cursor von listRecords ist der rkey des letzten Records.
+        """
+        params = {"repo": repo, "collection": collection, "limit": LIST_RECORDS_LIMIT}
+        if cursor is not None:
+            params["cursor"] = cursor
+        if before is not None:
+            params["reverse"] = "true"
+            page_callback = on_page
+
+            def on_page(records):
+                records, reached = split_before(records, before)
+                if page_callback(records) is False or reached:
+                    return False
+
+        return self.paginate(LIST_RECORDS, params, decode_record_page, on_page, "Fehler beim Abrufen der Records")
+
+    def author_feed(self, did, on_page=None):
+        """Wie paginate für getAuthorFeed, die Seiten kommen schon als Skeets (bsky_records.decode_feed_page)."""
+        return self.paginate(AUTHOR_FEED, {"actor": did}, decode_feed_page, on_page, "Fehler beim Abrufen der Skeets")
+
+
+async def own_liked_posts(engine, did):
+    """Sammelt die eigenen Likes auf eigene Skeets über alle Seiten der Like-Collection (siehe LikedPosts)."""
+    liked = LikedPosts(did)
+
+    def on_page(records):
+        for record in records:
+            subject = record["value"].get("subject")
+            if isinstance(subject, dict) and "uri" in subject:
+                liked.add_subject(subject["uri"])
+
+    await engine.list_records(did, LIKE_COLLECTION, on_page)
+    return liked
+
+
+def run_parallel(client, *jobs, concurrency=CONCURRENCY):
+    """Führt Jobs (engine -> Coroutine) gleichzeitig auf einer Engine aus und gibt ihre Ergebnisse zurück."""
+    async def main():
+        engine = AsyncEngine(client, concurrency)
+        return await asyncio.gather(*(job(engine) for job in jobs))
+
+    return asyncio.run(main())
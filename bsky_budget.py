@@ -0,0 +1,184 @@
+"""Punktebudget für Repo-Writes, damit große Löschungen nicht mitten drin am Rate-Limit scheitern.
+
+Der PDS rechnet Writes in Punkten ab (Erstellen 3, Ändern 2, Löschen 1), höchstens 5000 pro Stunde
+und 35000 pro Tag und Konto. Eine Löschung von 100000 Records braucht also mehrere Tage. Der
+BudgetScheduler schätzt vorab, wie lange ein Plan dauert, und verteilt die applyWrites-Batches über
+die Stunden- und Tagesfenster. Ein Teil des Budgets (reserve) bleibt für normales Posten frei.
+Verbrauchte Punkte werden minutengenau in einer JSON-Datei gespeichert, nach einem Neustart geht es
+mit dem richtigen Stand weiter. Meldet der Server per RateLimit-Policy ein Stunden- oder Tagesfenster
+mit höherem Verbrauch, gilt dessen Stand.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from bsky_progress import format_duration
+
+CREATE_POINTS = 3
+UPDATE_POINTS = 2
+DELETE_POINTS = 1
+
+HOURLY_POINTS = 5000
+DAILY_POINTS = 35000
+
+# Anteil des Budgets, der für normales Posten frei bleibt
+RESERVE = 0.1
+
+HOUR = 3600
+DAY = 86400
+
+# Grobe Schätzung, wie viele Löschungen pro Sekunde ohne Budgetgrenze schaffbar sind
+# (applyWrites mit 200er-Batches, TokenBucket mit 5 Requests/s, Antwortzeiten eingerechnet)
+DELETES_PER_SECOND = 500
+
+# Längste Wartezeit am Stück, danach wird neu geprüft (etwa nach einem Update aus den Headern)
+MAX_SLEEP = 60
+
+
+def default_budget_path(did):
+    """Dateiname des Budgetstands für ein Konto im aktuellen Verzeichnis."""
+    return f"bsky_budget_{did.replace(':', '_')}.json"
+
+
+def delete_cost(count):
+    return count * DELETE_POINTS
+
+
+def format_eta(end, now=None):
+    """Dauer und Endzeitpunkt, etwa "ca. 2 Tage 3:10:00, fertig am 20.10. gegen 14:05"."""
+    now = now or time.time()
+    days, rest = divmod(max(0, end - now), 86400)
+    duration = f"{int(days)} Tag{'e' if days > 1 else ''} {format_duration(rest)}" if days else format_duration(rest)
+    return f"ca. {duration}, fertig am {datetime.fromtimestamp(end):%d.%m. gegen %H:%M}"
+
+
+class BudgetScheduler:
+    """Thread-sicheres gleitendes Stunden- und Tagesbudget mit gespeichertem Verbrauch.
+
+    acquire(punkte) blockiert, bis die Punkte in beide Fenster passen, und verbucht sie. refund()
+    bucht abgelehnte Punkte in derselben Minute zurück, in der acquire() sie verbucht hat.
+    on_wait(bis_zeitstempel) wird vor jeder Pause aufgerufen, etwa für eine Statusanzeige.
+    """
+
+    def __init__(self, path=None, hourly=HOURLY_POINTS, daily=DAILY_POINTS, reserve=RESERVE, on_wait=None):
+        self.path = path
+        self.hourly = int(hourly * (1 - reserve))
+        self.daily = int(daily * (1 - reserve))
+        self.on_wait = on_wait
+        self.lock = threading.Lock()
+        self.spent = {}  # Ende der Minute (Unix-Zeit) -> Punkte, verfällt also eher etwas zu spät als zu früh
+        self.waiting_until = None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.spent = {int(minute): points for minute, points in json.load(f)["spent"]}
+
+    def _prune(self, now):
+        for minute in [minute for minute in self.spent if minute <= now - DAY]:
+            del self.spent[minute]
+
+    def _used(self, now, window, spent=None):
+        spent = self.spent if spent is None else spent
+        return sum(points for minute, points in spent.items() if minute > now - window)
+
+    def _available(self, now, spent=None):
+        return min(self.hourly - self._used(now, HOUR, spent), self.daily - self._used(now, DAY, spent))
+
+    def _next_release(self, now, spent=None):
+        """Nächster Zeitpunkt, an dem verbuchte Punkte aus einem der Fenster fallen."""
+        spent = self.spent if spent is None else spent
+        releases = [minute + window for minute in spent for window in (HOUR, DAY) if minute + window > now]
+        return min(releases) if releases else now + 1
+
+    def _save(self):
+        if not self.path:
+            return
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"spent": sorted(self.spent.items())}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _book(self, now, points, minute=None):
+        if minute is None:
+            minute = int(now) // 60 * 60 + 60
+        points = self.spent.get(minute, 0) + points
+        if points > 0:
+            self.spent[minute] = points
+        else:
+            self.spent.pop(minute, None)
+        self._prune(now)
+        self._save()
+        return minute
+
+    def acquire(self, points):
+        """Wartet, bis points in Stunden- und Tagesbudget passen, und verbucht sie. Rückgabe: Minute für refund()."""
+        points = min(points, self.hourly, self.daily)
+        while True:
+            with self.lock:
+                now = time.time()
+                if self._available(now) >= points:
+                    minute = self._book(now, points)
+                    self.waiting_until = None
+                    return minute
+                until = self._next_release(now)
+                self.waiting_until = until
+            if self.on_wait:
+                self.on_wait(until)
+            time.sleep(min(max(until - now, 0.1), MAX_SLEEP))
+
+    def refund(self, points, minute):
+        """Gibt Punkte eines abgelehnten Batches zurück, minute ist die Rückgabe von acquire()."""
+        with self.lock:
+            self._book(time.time(), -points, minute)
+
+    def update_from_headers(self, headers):
+        """Übernimmt den Verbrauch laut RateLimit-Policy/-Remaining, wenn der Server mehr gezählt hat."""
+        policy = headers.get("RateLimit-Policy")
+        remaining = headers.get("RateLimit-Remaining")
+        if not policy or remaining is None:
+            return
+        try:
+            limit, _, window = policy.split(",")[0].partition(";w=")
+            limit, window, remaining = int(limit), int(window), int(remaining)
+        except ValueError:
+            return
+        if window not in (HOUR, DAY):
+            return
+        with self.lock:
+            now = time.time()
+            missing = (limit - remaining) - self._used(now, window)
+            if missing > 0:
+                self._book(now, missing)
+
+    def estimate(self, points, now=None, points_per_second=DELETES_PER_SECOND):
+        """Voraussichtliches Ende (Unix-Zeit), wenn points ab jetzt so schnell wie erlaubt verbraucht werden.
+
+        Simuliert die Fenster mit dem bisherigen Verbrauch; points_per_second begrenzt zusätzlich den
+        Durchsatz, wenn das Budget nicht bremst.
+        """
+        start = now = now or time.time()
+        with self.lock:
+            spent = dict(self.spent)
+        left = points
+        while left > 0:
+            available = self._available(now, spent)
+            if available > 0:
+                take = min(available, left)
+                minute = int(now) // 60 * 60 + 60
+                spent[minute] = spent.get(minute, 0) + take
+                left -= take
+                if left <= 0:
+                    break
+            now = self._next_release(now, spent)
+        return max(now, start + points / points_per_second)
+
+    def snapshot(self):
+        with self.lock:
+            now = time.time()
+            return {
+                "hour_used": self._used(now, HOUR),
+                "day_used": self._used(now, DAY),
+                "hourly": self.hourly,
+                "daily": self.daily,
+                "waiting_until": self.waiting_until,
+            }
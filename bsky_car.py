@@ -0,0 +1,221 @@
+"""Repo-Export über com.atproto.sync.getRepo: ein Download statt tausender paginierter Requests.
+
+Die CAR-Datei wird im Fluss gelesen, Block für Block. Gehalten werden nur die Schlüssel aus den
+MST-Knoten (Collection/rkey je Record-CID), bis der zugehörige Record-Block gelesen ist. Kommt ein
+Record vor seinem MST-Eintrag, wird nur er bis zum Ende zwischengespeichert.
+Enthält einen minimalen DAG-CBOR-Decoder, damit keine zusätzliche Abhängigkeit nötig ist.
+"""
+import struct
+
+GET_REPO = "com.atproto.sync.getRepo"
+
+POST_COLLECTION = "app.bsky.feed.post"
+REPOST_COLLECTION = "app.bsky.feed.repost"
+LIKE_COLLECTION = "app.bsky.feed.like"
+DEFAULT_COLLECTIONS = (POST_COLLECTION, REPOST_COLLECTION, LIKE_COLLECTION)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class CID(bytes):
+    """Binäre CID, wie sie in CAR-Abschnitten und als CBOR-Tag 42 vorkommt."""
+
+
+class _Reader:
+    """Liest exakt n Bytes aus einem Dateiobjekt, auch wenn read() weniger liefert."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def read(self, n):
+        data = self.fileobj.read(n)
+        while len(data) < n:
+            more = self.fileobj.read(n - len(data))
+            if not more:
+                raise ValueError("CAR-Datei unerwartet zu Ende")
+            data += more
+        return data
+
+    def read_varint(self, allow_eof=False):
+        value = shift = 0
+        while True:
+            byte = self.fileobj.read(1)
+            if not byte:
+                if allow_eof and shift == 0:
+                    return None
+                raise ValueError("CAR-Datei unerwartet zu Ende")
+            value |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                return value
+            shift += 7
+
+
+def _varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def cid_length(data):
+    """Länge der CID am Anfang eines CAR-Abschnitts."""
+    if data[0] == 0x12 and data[1] == 0x20:
+        return 34  # CIDv0: reiner sha2-256-Multihash
+    _, pos = _varint(data, 0)    # Version
+    _, pos = _varint(data, pos)  # Codec
+    _, pos = _varint(data, pos)  # Hash-Funktion
+    digest_length, pos = _varint(data, pos)
+    return pos + digest_length
+
+
+def decode_dag_cbor(data):
+    """Dekodiert einen DAG-CBOR-Block. CID-Links (Tag 42) werden zu CID-Objekten."""
+    value, _ = _decode(data, 0)
+    return value
+
+
+def _decode(data, pos):
+    initial = data[pos]
+    pos += 1
+    major, info = initial >> 5, initial & 0x1F
+
+    if major == 7:
+        if info == 20:
+            return False, pos
+        if info == 21:
+            return True, pos
+        if info in (22, 23):
+            return None, pos
+        if info == 25:
+            return _half_float(data[pos:pos + 2]), pos + 2
+        if info == 26:
+            return struct.unpack(">f", data[pos:pos + 4])[0], pos + 4
+        if info == 27:
+            return struct.unpack(">d", data[pos:pos + 8])[0], pos + 8
+        raise ValueError(f"Nicht unterstützter CBOR-Wert: {info}")
+
+    if info < 24:
+        argument = info
+    elif info == 24:
+        argument, pos = data[pos], pos + 1
+    elif info == 25:
+        argument, pos = int.from_bytes(data[pos:pos + 2], "big"), pos + 2
+    elif info == 26:
+        argument, pos = int.from_bytes(data[pos:pos + 4], "big"), pos + 4
+    elif info == 27:
+        argument, pos = int.from_bytes(data[pos:pos + 8], "big"), pos + 8
+    else:
+        raise ValueError("Unbestimmte Längen sind in DAG-CBOR nicht erlaubt")
+
+    if major == 0:
+        return argument, pos
+    if major == 1:
+        return -1 - argument, pos
+    if major == 2:
+        return bytes(data[pos:pos + argument]), pos + argument
+    if major == 3:
+        return bytes(data[pos:pos + argument]).decode("utf-8"), pos + argument
+    if major == 4:
+        items = []
+        for _ in range(argument):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos
+    if major == 5:
+        result = {}
+        for _ in range(argument):
+            key, pos = _decode(data, pos)
+            result[key], pos = _decode(data, pos)
+        return result, pos
+    # major == 6: Tag, in DAG-CBOR nur 42 (CID mit führendem 0x00)
+    value, pos = _decode(data, pos)
+    if argument == 42:
+        return CID(value[1:]), pos
+    return value, pos
+
+
+def _half_float(raw):
+    half = int.from_bytes(raw, "big")
+    exponent, fraction = (half >> 10) & 0x1F, half & 0x3FF
+    sign = -1.0 if half & 0x8000 else 1.0
+    if exponent == 0:
+        return sign * fraction * 2.0 ** -24
+    if exponent == 31:
+        return sign * float("inf") if fraction == 0 else float("nan")
+    return sign * (1 + fraction / 1024) * 2.0 ** (exponent - 15)
+
+
+def iter_car_blocks(fileobj):
+    """Liefert (CID, Blockdaten) für alle Blöcke einer CAR-Datei, ohne sie ganz einzulesen."""
+    reader = _Reader(fileobj)
+    header_length = reader.read_varint()
+    header = decode_dag_cbor(reader.read(header_length))
+    if header.get("version") != 1:
+        raise ValueError(f"Nicht unterstützte CAR-Version: {header.get('version')}")
+
+    while True:
+        section_length = reader.read_varint(allow_eof=True)
+        if section_length is None:
+            return
+        section = reader.read(section_length)
+        length = cid_length(section)
+        yield CID(section[:length]), section[length:]
+
+
+def _is_mst_node(block):
+    return isinstance(block, dict) and "e" in block and "l" in block and "$type" not in block
+
+
+def iter_car_records(fileobj, did, collections=DEFAULT_COLLECTIONS):
+    """Liefert Records der gewünschten Collections aus einer Repo-CAR-Datei.
+
+    Jeder Record ist ein Dict mit uri, collection, rkey und value (wie bei listRecords).
+    """
+    wanted = set(collections)
+    keys = {}     # Record-CID -> [(Collection, rkey)] aus den MST-Knoten, gleicher Inhalt ergibt gleiche CID
+    waiting = {}  # Record-CID -> Record, falls der Block vor seinem MST-Eintrag kam
+
+    def make(collection, rkey, value):
+        return {"uri": f"at://{did}/{collection}/{rkey}", "collection": collection, "rkey": rkey, "value": value}
+
+    for cid, data in iter_car_blocks(fileobj):
+        block = decode_dag_cbor(data)
+
+        if _is_mst_node(block):
+            key = b""
+            for entry in block["e"]:
+                key = key[:entry["p"]] + entry["k"]
+                collection, _, rkey = key.decode("utf-8").partition("/")
+                if collection not in wanted:
+                    continue
+                if entry["v"] in waiting:
+                    yield make(collection, rkey, waiting[entry["v"]])
+                else:
+                    keys.setdefault(entry["v"], []).append((collection, rkey))
+            continue
+
+        if not isinstance(block, dict) or block.get("$type") not in wanted:
+            continue
+
+        if cid in keys:
+            for collection, rkey in keys.pop(cid):
+                yield make(collection, rkey, block)
+        else:
+            waiting[cid] = block
+
+
+def iter_repo_records(client, did, collections=DEFAULT_COLLECTIONS):
+    """Lädt das Repo per getRepo im Fluss herunter und liefert die Records wie iter_car_records."""
+    response = client.get(GET_REPO, params={"did": did}, stream=True)
+    if response.status_code != 200:
+        raise Exception(f"Fehler beim Abrufen des Repos: {response.text}")
+
+    try:
+        response.raw.decode_content = True
+        yield from iter_car_records(response.raw, did, collections)
+    finally:
+        response.close()
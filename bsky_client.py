@@ -0,0 +1,174 @@
+"""Gemeinsamer XRPC-Client für alle Skripte.
+
+Ein requests.Session mit Verbindungspool hält die Verbindungen offen, statt für jeden Request neu
+TCP und TLS aufzubauen. Pro Lauf wird einmal eingeloggt, alle Funktionen bekommen den Client statt
+eines Tokens. Läuft das Access-Token ab, wird es per refreshSession erneuert und der Request wiederholt.
+Jeder Request wird in bsky_metrics.METRICS gezählt (Latenz, Bytes, Rate-Limit-Spielraum). Mit
+limiter_for teilen sich mehrere Clients ein Request-Limit pro Host.
+
+Angemeldet wird beim Dienst (bsky.social). Danach gehen Repo-Requests direkt an den PDS des Kontos
+(siehe bsky_identity), öffentliche AppView-Abfragen wie Feeds und Posts an die AppView, alles
+andere (etwa getActorLikes, das eine Anmeldung braucht) über den PDS, der es weiterleitet.
+"""
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+from bsky_identity import resolve_pds
+from bsky_metrics import METRICS
+
+# Mit BSKY_SERVICE lässt sich ein anderer Dienst verwenden, etwa der Mock-Server aus benchmarks/mock_xrpc.py
+DEFAULT_SERVICE = os.environ.get("BSKY_SERVICE", "https://bsky.social")
+
+ENTRYWAY = "https://bsky.social"
+PUBLIC_APPVIEW = "https://public.api.bsky.app"
+
+# AppView-Methoden, die ohne Anmeldung funktionieren und daher direkt an die AppView gehen
+APPVIEW_METHODS = frozenset({"app.bsky.feed.getAuthorFeed", "app.bsky.feed.getPosts"})
+
+# Größe des Verbindungspools, sollte mindestens der Zahl der Lösch-Worker entsprechen
+POOL_SIZE = 10
+
+# (Verbindungsaufbau, Lesen) in Sekunden
+TIMEOUT = (10, 60)
+
+
+def default_appview(service):
+    """AppView zum Dienst: BSKY_APPVIEW, bei bsky.social die öffentliche AppView, sonst der Dienst selbst."""
+    if os.environ.get("BSKY_APPVIEW"):
+        return os.environ["BSKY_APPVIEW"]
+    return PUBLIC_APPVIEW if service.rstrip("/") == ENTRYWAY else service
+
+
+class XrpcClient:
+    """Gepoolte Session gegen einen XRPC-Dienst mit gespeicherter Anmeldung.
+
+    limiter_for(basis_url) liefert optional einen Bucket, dessen acquire() vor jedem Request an
+    diesen Host aufgerufen wird.
+    """
+
+    def __init__(self, service=DEFAULT_SERVICE, pool_size=POOL_SIZE, timeout=TIMEOUT, metrics=METRICS,
+                 limiter_for=None, appview=None):
+        self.service = service.rstrip("/")
+        self.appview = (appview or default_appview(service)).rstrip("/")
+        self.pds = None
+        self.timeout = timeout
+        self.metrics = metrics
+        self.limiter_for = limiter_for
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.refresh_lock = threading.Lock()
+        self.access_jwt = None
+        self.refresh_jwt = None
+        self.did = None
+        self.handle = None
+
+    def base_url(self, nsid):
+        """Host für eine Methode: AppView für öffentliche Abfragen, sonst der PDS (vor dem Login der Dienst)."""
+        if nsid in APPVIEW_METHODS:
+            return self.appview
+        return self.pds or self.service
+
+    def url(self, nsid):
+        return f"{self.base_url(nsid)}/xrpc/{nsid}"
+
+    def auth_headers(self):
+        return {"Authorization": f"Bearer {self.access_jwt}"} if self.access_jwt else {}
+
+    def headers_for(self, nsid):
+        """Das Access-Token gilt nur beim PDS, eine eigenständige AppView bekommt keins."""
+        if nsid in APPVIEW_METHODS and self.appview != (self.pds or self.service):
+            return {}
+        return self.auth_headers()
+
+    def send(self, method, nsid, **kwargs):
+        """Ein einzelner Request ohne Token-Erneuerung, gemessen für die Metriken."""
+        kwargs.setdefault("timeout", self.timeout)
+        base_url = self.base_url(nsid)
+        if self.limiter_for is not None:
+            self.limiter_for(base_url).acquire()
+        start = time.perf_counter()
+        response = self.session.request(method, f"{base_url}/xrpc/{nsid}", **kwargs)
+        took = time.perf_counter() - start
+
+        if self.metrics is not None:
+            body = response.request.body
+            sent = len(body) if body else 0
+            if kwargs.get("stream"):
+                # Gestreamte Antworten nicht lesen, nur die angekündigte Länge zählen
+                received = int(response.headers.get("Content-Length", 0))
+            else:
+                received = len(response.content)
+            self.metrics.record_request(nsid, response.status_code, took, sent, received, response.headers)
+        return response
+
+    def login(self, identifier, password):
+        """Meldet sich per createSession an, ermittelt den PDS und gibt Token und DID zurück."""
+        payload = {"identifier": identifier, "password": password}
+        self.pds = None
+        response = self.send("POST", "com.atproto.server.createSession", json=payload)
+
+        if response.status_code == 200:
+            data = response.json()
+            self.access_jwt = data["accessJwt"]
+            self.refresh_jwt = data["refreshJwt"]
+            self.did = data["did"]
+            self.handle = data.get("handle")
+            try:
+                self.pds = resolve_pds(self.did, self.session, data.get("didDoc"))
+            except Exception:
+                # Ohne aufgelösten PDS geht alles weiter über den Dienst, der die Requests weiterleitet
+                self.pds = None
+            return self.access_jwt, self.did
+        else:
+            raise Exception("Authentifizierung fehlgeschlagen: " + response.text)
+
+    def refresh(self):
+        """Erneuert die Sitzung mit dem Refresh-Token."""
+        response = self.send(
+            "POST", "com.atproto.server.refreshSession", headers={"Authorization": f"Bearer {self.refresh_jwt}"}
+        )
+        if response.status_code == 200:
+            data = response.json()
+            self.access_jwt = data["accessJwt"]
+            self.refresh_jwt = data["refreshJwt"]
+        else:
+            raise Exception("Sitzung konnte nicht erneuert werden: " + response.text)
+
+    @staticmethod
+    def is_token_expired(response):
+        if response.status_code not in (400, 401):
+            return False
+        try:
+            return response.json().get("error") == "ExpiredToken"
+        except ValueError:
+            return False
+
+    def request(self, method, nsid, **kwargs):
+        """Schickt einen Request und erneuert bei abgelaufenem Token einmal die Sitzung."""
+        token = self.access_jwt
+        response = self.send(method, nsid, headers=self.headers_for(nsid), **kwargs)
+
+        if self.refresh_jwt and self.is_token_expired(response):
+            with self.refresh_lock:
+                # Nur einmal erneuern, auch wenn mehrere Worker gleichzeitig auf das Ablaufen stoßen
+                if self.access_jwt == token:
+                    self.refresh()
+            response = self.send(method, nsid, headers=self.headers_for(nsid), **kwargs)
+        return response
+
+    def get(self, nsid, params=None, **kwargs):
+        """GET auf eine XRPC-Methode, gibt die Response zurück."""
+        return self.request("GET", nsid, params=params, **kwargs)
+
+    def post(self, nsid, json=None, **kwargs):
+        """POST auf eine XRPC-Methode, gibt die Response zurück."""
+        return self.request("POST", nsid, json=json, **kwargs)
+
+    def close(self):
+        self.session.close()
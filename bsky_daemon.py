@@ -0,0 +1,390 @@
+"""Löschen ohne Oberfläche und ohne Zugangsdaten im Quelltext, einmalig (für cron) oder in festen Abständen.
+
+Aufruf:
+
+    python bsky_daemon.py konten.ini            # läuft, bis SIGTERM/Strg+C kommt
+    python bsky_daemon.py konten.ini --einmal   # ein Durchlauf, z.B. per cron oder systemd-Timer
+
+Die Konfiguration ist eine INI-Datei mit einem Abschnitt [daemon] und einem Abschnitt pro Konto:
+
+    [daemon]
+    intervall_minuten = 60
+    verzeichnis = /var/lib/bsky             ; Index und Journal pro Konto
+    workers = 2                             ; Lösch-Worker pro Konto
+    parallel_konten = 4                     ; so viele Konten gleichzeitig
+    anfragen_pro_sekunde = 8                ; gemeinsames Limit aller Konten pro Host
+    fortschritt_sekunden = 10               ; Abstand der Fortschrittszeile auf stderr
+    zusammenfassung = /var/lib/bsky/letzter_lauf.json
+    metriken = /var/lib/node_exporter/bsky  ; optional, siehe bsky_metrics
+
+    [konto:name.bsky.social]
+    passwort_env = BSKY_PASSWORD_NAME       ; oder passwort = ... (App-Passwort empfohlen)
+    tage_behalten = 30                      ; leer = kein Datumsfilter
+    min_likes = 5                           ; leer = Filter aus
+    min_reskeets = 2
+    threads_behalten = ja                   ; fehlt die Zeile, werden Threads nicht geschützt
+    eigene_likes_behalten = ja
+    reposts_loeschen = ja                   ; Reposts vor dem Stichtag ebenfalls löschen
+
+Es gelten dieselben Filter wie in v8, auch mit denselben Standardwerten: Fehlt ein Schlüssel, ist der
+Filter aus, wie ein nicht angehakter Filter in der Oberfläche. Pro Konto wird der lokale Index
+(bsky_store) nur um neue Posts, Reposts und Likes ergänzt, Zählwerte werden nur für verbleibende
+Löschkandidaten aufgefrischt. Gelöscht wird über das Journal, ein abgebrochener Lauf macht beim nächsten
+Mal weiter.
+
+Bis zu parallel_konten Konten laufen gleichzeitig, jedes mit eigenem Client und eigenem TokenBucket
+für die Löschungen, der den RateLimit-Headern dieses Kontos folgt. Alle Requests an denselben Host
+gehen zusätzlich durch einen gemeinsamen FairTokenBucket, der in Ankunftsreihenfolge bedient: Das
+Host-Limit wird nie überschritten, und kein Konto verdrängt die anderen. Speicher, Threads und
+Verbindungen sind durch parallel_konten und workers begrenzt. Den Fortschritt aller Konten fasst eine
+Zeile auf stderr zusammen.
+
+Löschungen laufen über das Punktebudget für Writes (bsky_budget), pro Konto im Verzeichnis gespeichert.
+Ist das Stunden- oder Tagesbudget aufgebraucht, wartet der Lauf, statt am Rate-Limit zu scheitern, und
+ein Teil des Budgets bleibt für normales Posten frei. Vor jedem Lösch-Batch werden die Records mit
+Inhalt und Zählwerten ins Archiv des Kontos im Verzeichnis geschrieben (bsky_archive).
+
+Nach jedem Durchlauf wird eine Zusammenfassung als JSON-Zeile ausgegeben. Exit-Status: 0 = alles
+gelöscht, 1 = ein Konto fehlgeschlagen oder einzelne Löschungen fehlgeschlagen, 2 = Konfigurationsfehler.
+"""
+import argparse
+import configparser
+import json
+import os
+import signal
+import sys
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from bsky_archive import ArchiveWriter, default_archive_path
+from bsky_budget import BudgetScheduler, default_budget_path
+from bsky_client import DEFAULT_SERVICE, XrpcClient
+from bsky_journal import DeleteJournal, default_journal_path, run_job
+from bsky_metrics import METRICS
+from bsky_progress import format_duration
+from bsky_records import LIKE_COLLECTION, POST_COLLECTION
+from bsky_store import REPOST_COLLECTION, RecordStore, default_store_path
+from bsky_writes import DEFAULT_WORKERS, FairTokenBucket, TokenBucket
+
+EXIT_OK = 0
+EXIT_FEHLER = 1
+EXIT_KONFIG = 2
+
+ACCOUNT_PREFIX = "konto:"
+
+# Gemeinsames Request-Limit pro Host; bsky.social erlaubt 3000 Requests in 5 Minuten pro IP
+HOST_RATE = 8.0
+
+# Phasen, in denen die Lösch-Zähler eines Kontos in der Fortschrittszeile mitzählen
+DELETE_PHASES = {"löschen", "budget"}
+
+
+class ConfigError(Exception):
+    pass
+
+
+def read_config(path):
+    """Liest die INI-Datei und gibt (Daemon-Einstellungen, Liste der Konten) zurück."""
+    parser = configparser.ConfigParser(inline_comment_prefixes=(";", "#"))
+    parser.BOOLEAN_STATES = dict(parser.BOOLEAN_STATES, ja=True, nein=False)
+    if not parser.read(path, encoding="utf-8"):
+        raise ConfigError(f"Konfiguration nicht gefunden: {path}")
+
+    try:
+        daemon = parser["daemon"] if parser.has_section("daemon") else parser[parser.default_section]
+        settings = {
+            "interval": daemon.getfloat("intervall_minuten", 60) * 60,
+            "directory": daemon.get("verzeichnis", "."),
+            "workers": daemon.getint("workers", DEFAULT_WORKERS),
+            "parallel": max(1, daemon.getint("parallel_konten", 1)),
+            "host_rate": daemon.getfloat("anfragen_pro_sekunde", HOST_RATE),
+            "progress_interval": daemon.getfloat("fortschritt_sekunden", 10),
+            "service": daemon.get("service", DEFAULT_SERVICE),
+            "summary": daemon.get("zusammenfassung") or None,
+            "metrics": daemon.get("metriken") or None,
+        }
+
+        accounts = []
+        for section in parser.sections():
+            if not section.startswith(ACCOUNT_PREFIX):
+                continue
+            account = parser[section]
+            password = account.get("passwort")
+            if account.get("passwort_env"):
+                password = os.environ.get(account["passwort_env"])
+            if not password:
+                raise ConfigError(f"Kein Passwort für {section}")
+            accounts.append({
+                "handle": section[len(ACCOUNT_PREFIX):],
+                "password": password,
+                "keep_days": optional_int(account, "tage_behalten"),
+                "min_likes": optional_int(account, "min_likes"),
+                "min_reskeets": optional_int(account, "min_reskeets"),
+                "filter_threads": account.getboolean("threads_behalten", False),
+                "filter_self_liked": account.getboolean("eigene_likes_behalten", False),
+                "delete_reposts": account.getboolean("reposts_loeschen", False),
+            })
+    except ValueError as e:
+        raise ConfigError(f"Ungültiger Wert in {path}: {e}")
+
+    if not accounts:
+        raise ConfigError(f"Keine Abschnitte [{ACCOUNT_PREFIX}...] in {path}")
+    return settings, accounts
+
+
+def optional_int(section, key):
+    value = section.get(key, "").strip()
+    return int(value) if value else None
+
+
+class HostLimiters:
+    """Ein FairTokenBucket pro Host, geteilt von allen Konten, die dort liegen."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def for_service(self, service):
+        host = urlparse(service).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = FairTokenBucket(self.rate, capacity=max(1, int(self.rate)))
+            return self.buckets[host]
+
+
+class RunProgress:
+    """Fortschritt aller Konten eines Durchlaufs, zusammengefasst in einer Zeile."""
+
+    def __init__(self, accounts):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.accounts = {account["handle"]: {"phase": "wartet", "done": 0, "total": 0} for account in accounts}
+        self.deleted = 0
+
+    def update(self, handle, phase=None, done=None, total=None):
+        """Neue Phase setzt die Zähler zurück, außer beim Wechsel zwischen Löschen und Warten aufs Budget."""
+        with self.lock:
+            state = self.accounts[handle]
+            if phase is not None and phase != state["phase"] and {phase, state["phase"]} <= DELETE_PHASES:
+                state["phase"] = phase
+            elif phase is not None:
+                state.update(phase=phase, done=0, total=0)
+            if done is not None:
+                state["done"] = done
+            if total is not None:
+                state["total"] = total
+
+    def add_deleted(self, count):
+        with self.lock:
+            self.deleted += count
+
+    def line(self):
+        """Zeile wie "12 Konten: 3 ok, 4 löschen, 5 wartet · 1200 gelöscht · 300 offen · 25.0/s · 2:10"."""
+        with self.lock:
+            phases = {}
+            pending = 0
+            deleted = self.deleted
+            for state in self.accounts.values():
+                phases[state["phase"]] = phases.get(state["phase"], 0) + 1
+                if state["phase"] in DELETE_PHASES:
+                    pending += state["total"] - state["done"]
+                    deleted += state["done"]
+            elapsed = time.monotonic() - self.started
+        text = f"{len(self.accounts)} Konten: " + ", ".join(f"{count} {phase}" for phase, count in sorted(phases.items()))
+        text += f" · {deleted} gelöscht · {pending} offen"
+        if elapsed > 0:
+            text += f" · {deleted / elapsed:.1f}/s"
+        return text + f" · {format_duration(elapsed)}"
+
+
+def delete_job(client, journal, did, kind, uris, workers, bucket=None, progress_callback=None, budget=None, archive=None):
+    """Löscht die URIs über einen Journal-Auftrag.
+
+    Ein offener Auftrag aus einem abgebrochenen Lauf wird weitergeführt. Von seinen offenen URIs werden
+    nur die gelöscht, die auch die neue Auswertung ausgewählt hat, der Rest wird übersprungen (etwa
+    inzwischen geliket oder Teil eines Threads). Neu ausgewählte URIs kommen hinzu.
+    Rückgabe: (gelöscht, fehlgeschlagen, erfolgreich gelöschte URIs)
+    """
+    job_id = journal.open_job(kind, did)
+    if job_id is None:
+        job_id = journal.create_job(kind, did, uris)
+    else:
+        journal.skip_pending(job_id, uris)
+        journal.add_planned(job_id, uris)
+        journal.set_planned(job_id)
+    results = run_job(client, journal, job_id, progress_callback, workers=workers, bucket=bucket, budget=budget,
+                      archive=archive)
+    deleted = [uri for uri, error in results.items() if error is None]
+    return len(deleted), len(results) - len(deleted), deleted
+
+
+def run_account(account, settings, limiters, progress):
+    """Ein Durchlauf für ein Konto: Index abgleichen, Filter auswerten, löschen. Rückgabe: Zusammenfassung."""
+    handle = account["handle"]
+    summary = {"account": handle, "did": None, "status": "ok", "error": None, "new_records": 0,
+               "posts_deleted": 0, "posts_failed": 0, "reposts_deleted": 0, "reposts_failed": 0}
+    start = time.perf_counter()
+    client = XrpcClient(settings["service"], limiter_for=limiters.for_service)
+    # cProfile und tracemalloc messen nicht pro Konto, daher nur bei einem Konto zur Zeit
+    profile = settings["parallel"] == 1
+    # Ein Bucket für alle Löschungen dieses Kontos, er folgt den RateLimit-Headern des Kontos
+    bucket = TokenBucket()
+    store = journal = archive = None
+    try:
+        _, did = client.login(account["handle"], account["password"])
+        summary["did"] = did
+        store = RecordStore(os.path.join(settings["directory"], default_store_path(did)))
+        journal = DeleteJournal(os.path.join(settings["directory"], default_journal_path(did)))
+        budget = BudgetScheduler(os.path.join(settings["directory"], default_budget_path(did)),
+                                 on_wait=lambda until: progress.update(handle, phase="budget"))
+        archive = ArchiveWriter(os.path.join(settings["directory"], default_archive_path(did)), store.archive_entries)
+
+        # Nur neue Records holen, Likes nur, wenn der Eigene-Likes-Filter sie braucht
+        collections = [POST_COLLECTION]
+        if account["delete_reposts"]:
+            collections.append(REPOST_COLLECTION)
+        if account["filter_self_liked"]:
+            collections.append(LIKE_COLLECTION)
+        progress.update(handle, phase="abruf")
+        with METRICS.phase("abruf", profile=profile):
+            summary["new_records"] = store.sync(
+                client, did, collections, progress_callback=lambda added: progress.update(handle, done=added))
+
+        filter_by_date = account["keep_days"] is not None
+        filter_date = datetime.now(timezone.utc) - timedelta(days=account["keep_days"] or 0)
+        progress.update(handle, phase="analyse")
+        with METRICS.phase("analyse", profile=profile):
+            liked = store.liked_subjects(did) if account["filter_self_liked"] else set()
+            posts = store.select_posts_to_delete(
+                did, account["min_likes"], account["min_reskeets"], account["filter_threads"],
+                account["filter_self_liked"], liked, filter_date, filter_by_date, client=client
+            )
+            reposts = set()
+            if account["delete_reposts"] and filter_by_date:
+                reposts = store.select_records_before(did, REPOST_COLLECTION, filter_date)
+
+        def update_delete_progress(done, total):
+            # Nach einer Budgetpause wieder als löschend zählen
+            progress.update(handle, phase="löschen", done=done, total=total)
+
+        with METRICS.phase("loeschen"):
+            for kind, uris, key in (("daemon-posts", posts, "posts"), ("daemon-reposts", reposts, "reposts")):
+                if not uris:
+                    continue
+                progress.update(handle, phase="löschen")
+                store.fill_values(client, did, uris)
+                summary[key + "_deleted"], summary[key + "_failed"], deleted = delete_job(
+                    client, journal, did, kind, uris, settings["workers"], bucket, update_delete_progress, budget, archive)
+                store.remove(deleted)
+                progress.add_deleted(len(deleted))
+
+        if summary["posts_failed"] or summary["reposts_failed"]:
+            summary["status"] = "teilweise"
+    except Exception as e:
+        summary["status"] = "fehler"
+        summary["error"] = str(e)
+    finally:
+        for resource in (archive, store, journal, client):
+            if resource is not None:
+                resource.close()
+        progress.update(handle, phase=summary["status"])
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def report_progress(progress, interval, done):
+    """Schreibt bis zum Ende des Durchlaufs regelmäßig die Fortschrittszeile auf stderr."""
+    while not done.wait(interval):
+        print(progress.line(), file=sys.stderr, flush=True)
+
+
+def run_once(settings, accounts, stop=None, limiters=None):
+    """Ein Durchlauf über alle Konten, bis zu parallel_konten gleichzeitig. Rückgabe: (Exit-Status, Zusammenfassung)."""
+    started = datetime.now(timezone.utc)
+    limiters = limiters or HostLimiters(settings["host_rate"])
+    progress = RunProgress(accounts)
+    results = {}
+
+    todo = queue.Queue()
+    for account in accounts:
+        todo.put(account)
+
+    def worker():
+        while not (stop is not None and stop.is_set()):
+            try:
+                account = todo.get_nowait()
+            except queue.Empty:
+                return
+            results[account["handle"]] = run_account(account, settings, limiters, progress)
+
+    done = threading.Event()
+    if settings["progress_interval"] > 0:
+        threading.Thread(target=report_progress, args=(progress, settings["progress_interval"], done), daemon=True).start()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(settings["parallel"], len(accounts)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+
+    # Reihenfolge wie in der Konfiguration, nach SIGTERM übersprungene Konten fehlen
+    results = [results[account["handle"]] for account in accounts if account["handle"] in results]
+    exit_code = EXIT_OK if all(result["status"] == "ok" for result in results) else EXIT_FEHLER
+    totals = {key: sum(result[key] for result in results)
+              for key in ("new_records", "posts_deleted", "posts_failed", "reposts_deleted", "reposts_failed")}
+    totals["accounts_failed"] = sum(1 for result in results if result["status"] == "fehler")
+    summary = {
+        "started": started.isoformat(timespec="seconds"),
+        "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "exit_code": exit_code,
+        "totals": totals,
+        "accounts": results,
+    }
+    if settings["summary"]:
+        write_atomic(settings["summary"], json.dumps(summary, indent=2))
+    if settings["metrics"]:
+        METRICS.write_reports(settings["metrics"])
+    return exit_code, summary
+
+
+def write_atomic(path, text):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Löscht Skeets und Reposts nach v8-Filtern ohne Oberfläche.")
+    parser.add_argument("konfiguration")
+    parser.add_argument("--einmal", action="store_true", help="Nur ein Durchlauf, dann beenden.")
+    args = parser.parse_args(argv)
+
+    try:
+        settings, accounts = read_config(args.konfiguration)
+        os.makedirs(settings["directory"], exist_ok=True)
+    except (ConfigError, OSError) as e:
+        print(f"Konfigurationsfehler: {e}", file=sys.stderr)
+        return EXIT_KONFIG
+
+    # SIGTERM beendet nach den laufenden Konten, nicht mitten in einem Löschbatch
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    # Das Host-Limit gilt über alle Durchläufe hinweg
+    limiters = HostLimiters(settings["host_rate"])
+
+    try:
+        while True:
+            exit_code, summary = run_once(settings, accounts, stop, limiters)
+            print(json.dumps(summary), flush=True)
+            if args.einmal or stop.wait(settings["interval"]):
+                return exit_code
+    except KeyboardInterrupt:
+        return EXIT_FEHLER
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""Dekodieren der großen Listenantworten (getAuthorFeed, listRecords).
+
+Der Rohinhalt der Antwort wird direkt dekodiert, ohne den Umweg über response.text, und zwar mit
+orjson, falls es installiert ist. orjson ist optional, ohne orjson bleibt alles beim json-Modul der
+Standardbibliothek und der Gewinn ist gering. Geparst wird immer die ganze Seite.
+
+Feed-Seiten werden gleich danach zu Skeets (bsky_records.decode_feed_page), Profile, Embeds und
+Viewer-Status werden damit sofort freigegeben. listRecords-Seiten bleiben vollständige Records mit
+uri, cid und value, weil Index und Archiv (bsky_store, bsky_archive) den ganzen Record-Inhalt
+speichern. Beide Dekodierer laufen überall, wo paginiert wird, auch in bsky_async.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(content):
+    """Dekodiert JSON aus bytes oder str, mit orjson falls vorhanden."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_record_page(content):
+    """listRecords-Seite -> (Records, Cursor), die Records unverändert."""
+    data = loads(content)
+    return data["records"], data.get("cursor")
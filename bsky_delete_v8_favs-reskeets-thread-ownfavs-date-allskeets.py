@@ -1,122 +1,155 @@
-import requests
 from urllib.parse import urlparse
 import tkinter as tk
-from tkinter import simpledialog, messagebox, ttk
+from tkinter import simpledialog, messagebox, ttk, filedialog
 from datetime import datetime
 import threading
+from bsky_writes import DEFAULT_WORKERS, delete_records_concurrent
+from bsky_pipeline import run_pipeline
+from bsky_records import POST_COLLECTION, date_to_timestamp, hydrate_counts, iter_record_pages, record_to_skeet, timestamp_to_tid
+from bsky_async import own_liked_posts, run_parallel
+from bsky_store import RecordStore, default_store_path
+from bsky_journal import DeleteJournal, default_journal_path
+from bsky_client import XrpcClient
+from bsky_plan import write_plan
+from bsky_progress import ProgressChannel, format_status
+from bsky_metrics import METRICS
+from bsky_budget import DELETE_POINTS, BudgetScheduler, default_budget_path, delete_cost, format_eta
+from bsky_archive import ArchiveWriter, RecordValues, default_archive_path
+
+def get_user_likes(client, did):
+    """Ruft alle eigenen Skeets ab, die vom Benutzer geliket wurden.
+
+    Geht über alle Seiten der eigenen Like-Records (nicht nur die letzte Seite von getActorLikes)
+    und behält nur Likes auf eigene Skeets, kompakt als rkeys.
+    """
+    return run_parallel(client, lambda engine: own_liked_posts(engine, did))[0]
+
+def find_thread_uris(skeets):
+    """Ermittelt alle Skeets, die Teil eines Threads sind, in einem Durchlauf.
+
+    Ein Skeet gehört zu einem Thread, wenn sein Elternskeet oder eine Antwort
+    darauf ebenfalls im Feed ist. Die Reihenfolge des Feeds spielt keine Rolle,
+    auch Ketten, die mitten in einer Seite beginnen, werden vollständig erkannt.
+    """
+    uris = {skeet.uri for skeet in skeets}
+    thread_uris = set()
 
-def get_auth_token(username, password):
-    """Authentifiziert den Benutzer und gibt das Token sowie die DID zurück."""
-    url = "https://bsky.social/xrpc/com.atproto.server.createSession"
-    payload = {"identifier": username, "password": password}
-    response = requests.post(url, json=payload)
-    
-    if response.status_code == 200:
-        return response.json()["accessJwt"], response.json()["did"]
-    else:
-        raise Exception("Authentifizierung fehlgeschlagen: " + response.text)
-
-def get_all_skeets(auth_token, did, progress_callback):
-    """Ruft alle Skeets des Benutzers ab, inklusive Paginierung und Fortschrittsmeldung."""
-    url = "https://bsky.social/xrpc/app.bsky.feed.getAuthorFeed"
-    headers = {"Authorization": f"Bearer {auth_token}"}
-    all_skeets = []
-    cursor = None
-    total_skeets = 0  # Zähler für die gesamte Anzahl der Skeets
-
-    while True:
-        params = {"actor": did}
-        if cursor:
-            params["cursor"] = cursor  # Füge den Cursor hinzu, falls vorhanden
-
-        response = requests.get(url, headers=headers, params=params)
-        
-        if response.status_code == 200:
-            data = response.json()
-            all_skeets.extend(data["feed"])  # Füge die neuen Skeets zur Liste hinzu
-            total_skeets = len(all_skeets)
-            progress_callback(total_skeets)  # Aktualisiere den Fortschritt
-
-            # Überprüfe, ob ein Cursor für die nächste Seite vorhanden ist
-            if "cursor" in data:
-                cursor = data["cursor"]
-            else:
-                break  # Wenn kein Cursor vorhanden ist, gibt es keine weiteren Skeets
-        else:
-            raise Exception(f"Fehler beim Abrufen der Skeets: {response.text}")
-
-    return all_skeets
-
-def get_user_likes(auth_token, did):
-    """Ruft alle Skeets ab, die vom Benutzer geliket wurden."""
-    url = f"https://bsky.social/xrpc/app.bsky.feed.getActorLikes?actor={did}"
-    headers = {"Authorization": f"Bearer {auth_token}"}
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        data = response.json()
-        if "feed" in data:
-            return set(skeet['post']['uri'] for skeet in data["feed"])
-        else:
-            raise Exception("Unerwartete Antwortstruktur: 'feed' nicht gefunden")
-    else:
-        raise Exception("Fehler beim Abrufen der Likes: " + response.text)
+    for skeet in skeets:
+        if skeet.parent_uri in uris:
+            thread_uris.add(skeet.uri)
+            thread_uris.add(skeet.parent_uri)
+
+    return thread_uris
 
-def analyze_skeets(skeets, min_likes, min_reskeets, filter_threads, filter_self_liked, user_liked_uris, filter_date, filter_by_date):
-    """Analysiert die Skeets nach den angegebenen Filterkriterien."""
+def make_keep_filter(min_likes, min_reskeets, filter_self_liked, user_liked_uris, filter_date, filter_by_date):
+    """Erzeugt die Prüfung aller Filter außer dem Threadfilter: True, wenn der Skeet behalten wird."""
     max_value = 999999999999999999999999999999
     min_likes = min_likes if min_likes is not None else max_value
     min_reskeets = min_reskeets if min_reskeets is not None else max_value
 
-    # Initialisiere Zähler
-    skeets_to_delete = set()
-    thread_uris = set()
-
     # Wenn der Datumsfilter deaktiviert ist, setzen wir ein Datum weit in der Zukunft
     if not filter_by_date:
         filter_date = datetime(2500, 1, 1)
+    cutoff = date_to_timestamp(filter_date)
 
-    # Identifizieren der Threads, wenn der Filter für Threads aktiviert ist
-    if filter_threads:
-        for skeet in skeets:
-            if skeet['post']['uri'] in thread_uris:
-                continue
-
-            if 'reply' in skeet:
-                parent_uri = skeet['reply']['parent']['uri']
-                if parent_uri in thread_uris:
-                    thread_uris.add(skeet['post']['uri'])
-                    continue
-
-            for reply in skeets:
-                if 'reply' in reply and reply['reply']['parent']['uri'] == skeet['post']['uri']:
-                    thread_uris.add(skeet['post']['uri'])
-                    thread_uris.add(reply['post']['uri'])
-
-    # Analysiere die Skeets basierend auf den Filtern
-    for skeet in skeets:
-        is_thread = skeet['post']['uri'] in thread_uris
-        has_min_likes = skeet['post']['likeCount'] >= min_likes
-        has_min_reskeets = skeet['post']['repostCount'] >= min_reskeets
-        is_self_liked = skeet['post']['uri'] in user_liked_uris if filter_self_liked else False
+    def keep(skeet):
+        has_min_likes = skeet.like_count >= min_likes
+        has_min_reskeets = skeet.repost_count >= min_reskeets
+        is_self_liked = skeet.uri in user_liked_uris if filter_self_liked else False
 
         # Überprüfe das Erstellungsdatum des Skeets
-        skeet_date = datetime.strptime(skeet['post']['indexedAt'][:10], "%Y-%m-%d") if 'indexedAt' in skeet['post'] else None
-        is_before_date = skeet_date < filter_date if skeet_date else False
+        is_before_date = skeet.timestamp < cutoff if skeet.timestamp is not None else False
 
-        # Skeet wird gelöscht, wenn KEINER der aktiven Filter zutrifft
-        if not (is_thread or has_min_likes or has_min_reskeets or is_self_liked or not is_before_date):
-            skeets_to_delete.add(skeet['post']['uri'])
+        return has_min_likes or has_min_reskeets or is_self_liked or not is_before_date
 
-    return skeets_to_delete  # Rückgabe der Liste der Skeet-URIs, die gelöscht werden sollen
+    return keep
 
-def delete_single_skeets(auth_token, skeet_uris, progress_callback, status_callback):
-    """Löscht die Skeets, die keine der Filterbedingungen erfüllen."""
-    url = "https://bsky.social/xrpc/com.atproto.repo.deleteRecord"
-    headers = {
-        "Authorization": f"Bearer {auth_token}",
-        "Content-Type": "application/json"
-    }
+def plan_reason(min_likes, min_reskeets, filter_threads, filter_self_liked, filter_date, filter_by_date):
+    """Kurzer Löschgrund für die Plan-Datei: welche Filter der Skeet alle nicht erfüllt."""
+    reasons = []
+    if min_likes is not None:
+        reasons.append(f"likes<{min_likes}")
+    if min_reskeets is not None:
+        reasons.append(f"reskeets<{min_reskeets}")
+    if filter_threads:
+        reasons.append("kein-thread")
+    if filter_self_liked:
+        reasons.append("nicht-geliket")
+    if filter_by_date:
+        reasons.append(f"vor-{filter_date:%Y-%m-%d}")
+    return ",".join(reasons) or "alle"
+
+def iter_hydrated_pages(client, did, min_likes, min_reskeets, filter_self_liked, user_liked_uris, filter_date, filter_by_date,
+                        before=None, values=None):
+    """Seiten der eigenen Skeets für den Streaming-Modus, Zählwerte pro Seite nur für unentschiedene Skeets.
+
+    values (bsky_archive.RecordValues) merkt sich die Records der Skeets, die kein Filter außer dem
+    Threadfilter behält, fürs Archiv. Alle anderen werden nie gelöscht und bleiben nicht im Speicher.
+    """
+    keep_without_counts = make_keep_filter(None, None, filter_self_liked, user_liked_uris, filter_date, filter_by_date)
+    keep = make_keep_filter(min_likes, min_reskeets, filter_self_liked, user_liked_uris, filter_date, filter_by_date)
+    for records in iter_record_pages(client, did, POST_COLLECTION, before=before):
+        page = [record_to_skeet(record) for record in records]
+        if min_likes is not None or min_reskeets is not None:
+            hydrate_counts(client, [skeet for skeet in page if not keep_without_counts(skeet)])
+        if values is not None:
+            values.add([record for record, skeet in zip(records, page) if not keep(skeet)])
+        yield page
+
+def stream_delete_skeets(client, did, min_likes, min_reskeets, filter_threads, filter_self_liked, user_liked_uris,
+                         filter_date, filter_by_date, fetch_callback, status_callback, budget=None, archive_path=None):
+    """Streaming-Modus: löscht schon während des Abrufs, ohne den ganzen Feed im Speicher zu halten.
+
+    Es gibt keine Rückfrage vor dem Löschen, die Anzahl steht erst am Ende fest. Mit archive_path wird
+    jeder Batch vorher archiviert (bsky_archive), die Inhalte stammen aus dem Abruf selbst.
+    """
+    keep = make_keep_filter(min_likes, min_reskeets, filter_self_liked, user_liked_uris, filter_date, filter_by_date)
+
+    # Skeets ab dem Stichtag behält der Datumsfilter immer. Ohne Threadfilter, der auch neuere Antworten
+    # kennen muss, werden sie gar nicht erst abgerufen: vom ältesten Skeet an bis zum Stichtag-TID
+    before = timestamp_to_tid(date_to_timestamp(filter_date)) if filter_by_date and not filter_threads else None
+    values = RecordValues() if archive_path else None
+    archive = ArchiveWriter(archive_path, values) if archive_path else None
+    pages = iter_hydrated_pages(client, did, min_likes, min_reskeets, filter_self_liked, user_liked_uris, filter_date, filter_by_date,
+                                before, values)
+    try:
+        results = run_pipeline(client, did, keep, filter_threads, fetch_callback=fetch_callback, delete_callback=status_callback,
+                               pages=pages, budget=budget, archive=archive)
+    finally:
+        if archive is not None:
+            archive.close()
+    print_delete_results(results)
+    return results
+
+def print_delete_results(results):
+    """Gibt das Löschergebnis pro Skeet aus."""
+    for uri, error in results.items():
+        if error is None:
+            print(f"Deleted Skeet: {uri}")
+        else:
+            print(f"Failed to delete Skeet: {uri} - {error}")
+
+def delete_single_skeets(client, skeet_uris, progress_callback, status_callback, batched=True,
+                         workers=DEFAULT_WORKERS, state_callback=None, batch_callback=None, budget=None, archive=None):
+    """Löscht die Skeets, die keine der Filterbedingungen erfüllen.
+
+    Standardmäßig gebündelt per applyWrites mit mehreren Workern, die sich an die Rate-Limits
+    des Servers halten (Fortschritt pro Batch). Mit batched=False einzeln per deleteRecord.
+    batch_callback(uris, fehler) bekommt das Ergebnis jedes Batches, etwa für das Journal.
+    budget (bsky_budget.BudgetScheduler) hält die Löschungen im Stunden- und Tagesbudget für Writes.
+    archive (bsky_archive.ArchiveWriter) sichert jeden Skeet samt Zählwerten, bevor er gelöscht wird.
+    """
+    if batched:
+        def batch_progress(done, total):
+            if progress_callback:
+                progress_callback(done / total * 100)
+            status_callback(done, total)
+
+        results = delete_records_concurrent(client, skeet_uris, batch_progress, workers=workers,
+                                            state_callback=state_callback, batch_callback=batch_callback, budget=budget,
+                                            archive=archive)
+        print_delete_results(results)
+        return results
 
     total = len(skeet_uris)
     for idx, uri in enumerate(skeet_uris):
@@ -128,15 +161,27 @@ def delete_single_skeets(auth_token, skeet_uris, progress_callback, status_callb
             "repo": uri_parts.netloc,
             "rkey": rkey
         }
-        
-        response = requests.post(url, headers=headers, json=payload)
+
+        if archive is not None:
+            archive([uri])
+        if budget is not None:
+            booked = budget.acquire(DELETE_POINTS)
+        try:
+            response = client.post("com.atproto.repo.deleteRecord", json=payload)
+        except Exception:
+            if budget is not None:
+                budget.refund(DELETE_POINTS, booked)
+            raise
         
         if response.status_code == 200:
             print(f"Deleted Skeet: {uri}")
         else:
+            if budget is not None:
+                budget.refund(DELETE_POINTS, booked)
             print(f"Failed to delete Skeet: {uri} - {response.text}")
 
-        progress_callback((idx + 1) / total * 100)
+        if progress_callback:
+            progress_callback((idx + 1) / total * 100)
         status_callback(idx + 1, total)
 
 class App:
@@ -152,9 +197,15 @@ class App:
         self.filter_self_liked = False
         self.filter_by_date = False
         self.filter_date = None
+        self.streaming = False
+        self.plan_only = False
         self.auth_token = None
+        self.client = XrpcClient()
         self.did = None
         self.skeets = []
+        self.store = None
+        self.journal = None
+        self.budget = None
         self.user_liked_uris = set()
 
         self.init_gui()
@@ -171,7 +222,7 @@ class App:
 
         if self.username and self.password:
             try:
-                self.auth_token, self.did = get_auth_token(self.username, self.password)
+                self.auth_token, self.did = self.client.login(self.username, self.password)
                 messagebox.showinfo("Erfolg", "Erfolgreich eingeloggt.")
             except Exception as e:
                 messagebox.showerror("Fehler", f"Fehler beim Einloggen: {e}")
@@ -215,6 +266,16 @@ class App:
         self.filter_date_entry.pack(pady=5)
         self.filter_date_entry.config(state='disabled')
 
+        tk.Label(self.filter_window, text="Streaming-Modus (löscht schon während des Abrufs, ohne Einzelbestätigung):").pack(pady=5)
+        self.streaming_var = tk.BooleanVar(value=self.streaming)
+        self.streaming_checkbox = tk.Checkbutton(self.filter_window, text="Aktivieren", variable=self.streaming_var)
+        self.streaming_checkbox.pack(pady=5)
+
+        tk.Label(self.filter_window, text="Nur Plan-Datei schreiben (Löschen später mit bsky_plan.py):").pack(pady=5)
+        self.plan_only_var = tk.BooleanVar(value=self.plan_only)
+        self.plan_only_checkbox = tk.Checkbutton(self.filter_window, text="Aktivieren", variable=self.plan_only_var)
+        self.plan_only_checkbox.pack(pady=5)
+
         tk.Button(self.filter_window, text="Filter anwenden", command=self.apply_filters).pack(pady=10)
 
     def update_likes_entry_state(self):
@@ -256,6 +317,8 @@ class App:
             self.min_reskeets = int(min_reskeets) if min_reskeets else None
             self.filter_threads = self.filter_threads_var.get()
             self.filter_self_liked = self.filter_self_liked_var.get()
+            self.streaming = self.streaming_var.get()
+            self.plan_only = self.plan_only_var.get()
 
             # Datumseingabe verarbeiten
             if self.filter_date_var.get():
@@ -286,111 +349,233 @@ class App:
             messagebox.showerror("Fehler", "Bitte loggen Sie sich zuerst ein.")
             return
 
-        # Fortschrittsfenster erstellen
-        self.progress_window = tk.Toplevel(self.root)
-        self.progress_window.title("Fortschritt beim Abrufen der Skeets")
-        self.progress_label = tk.Label(self.progress_window, text="Abrufen der Skeets: 0")
-        self.progress_label.pack(pady=10)
-        self.progress_bar = ttk.Progressbar(self.progress_window, orient="horizontal", length=300, mode="indeterminate")
-        self.progress_bar.pack(pady=10)
-        self.progress_bar.start(10)  # Starte die Fortschrittsanimation
+        # Unterbrochenen Löschauftrag fortsetzen, ohne neu abzurufen oder zu analysieren
+        if self.journal is None:
+            self.journal = DeleteJournal(default_journal_path(self.did))
+        if self.budget is None:
+            self.budget = BudgetScheduler(default_budget_path(self.did))
+        job_id = self.journal.open_job("posts", self.did)
+        if job_id is not None:
+            open_count = len(self.journal.pending(job_id))
+            if open_count and messagebox.askyesno("Fortsetzen", f"Ein unterbrochener Löschvorgang mit {open_count} offenen Skeets wurde gefunden.\n\nUnterbrochenen Löschvorgang fortsetzen?"):
+                self.delete_skeets(job_id)
+                return
+            self.journal.finish(job_id)
 
-        # Blockiere das Hauptfenster während des Abrufs
-        self.progress_window.grab_set()
+        if self.streaming and self.plan_only:
+            messagebox.showerror("Fehler", "Streaming-Modus und Plan-Datei lassen sich nicht kombinieren.")
+            return
 
-        # Funktion, um den Fortschritt zu aktualisieren
-        def update_progress(total_skeets):
-            self.progress_label['text'] = f"Abrufen der Skeets: {total_skeets}"
-            self.progress_window.update_idletasks()
+        if self.streaming and not messagebox.askyesno("Bestätigung", "Im Streaming-Modus werden passende Skeets schon während des Abrufs ohne weitere Rückfrage gelöscht.\n\nFortfahren?"):
+            return
+
+        window, channel = self.open_progress_window("Fortschritt beim Abrufen der Skeets")
+        channel.phase("Abrufen der Skeets")
+
+        def finish(title, text, error=False):
+            """Im Tk-Thread: Fortschrittsfenster schließen und das Ergebnis anzeigen."""
+            self.close_progress_window(window, channel)
+            (messagebox.showerror if error else messagebox.showinfo)(title, text)
+
+        # Thread für den Streaming-Modus: Abrufen, Filtern und Löschen gleichzeitig
+        def run_streaming():
+            try:
+                if self.filter_self_liked:
+                    self.user_liked_uris = get_user_likes(self.client, self.did)
+                channel.phase("Gelöscht")
+                fetched = [0]
+
+                def update_fetch_progress(total_skeets):
+                    fetched[0] = total_skeets
+                    channel.detail(f"Abgerufen: {total_skeets}")
+
+                def update_delete_progress(done, planned):
+                    channel.progress(done)
+                    channel.detail(f"Abgerufen: {fetched[0]}, zum Löschen bisher: {planned}")
+
+                with METRICS.phase("streaming", profile=True):
+                    results = stream_delete_skeets(
+                        self.client, self.did, self.min_likes, self.min_reskeets, self.filter_threads, self.filter_self_liked,
+                        self.user_liked_uris, self.filter_date, self.filter_by_date, update_fetch_progress, update_delete_progress,
+                        self.budget, default_archive_path(self.did)
+                    )
+                failed = sum(1 for error in results.values() if error is not None)
+                channel.call(finish, "Fertig", f"{len(results) - failed} Skeets gelöscht, {failed} fehlgeschlagen.")
+            except Exception as e:
+                channel.call(finish, "Fehler", f"Fehler beim Löschen der Skeets: {e}", True)
 
         # Thread zum Abrufen und Analysieren der Skeets
         def run_analysis():
             try:
-                self.skeets = get_all_skeets(self.auth_token, self.did, update_progress)
+                # Lokalen Index nur um neue Skeets ergänzen statt alles neu abzurufen. Posts, Reposts
+                # und Likes werden dabei gleichzeitig abgerufen.
+                if self.store is None:
+                    self.store = RecordStore(default_store_path(self.did))
+                jobs = [lambda engine: self.store.sync_async(engine, self.did, progress_callback=channel.progress)]
+                if self.filter_self_liked:
+                    jobs.append(lambda engine: own_liked_posts(engine, self.did))
+                with METRICS.phase("abruf", profile=True):
+                    results = run_parallel(self.client, *jobs)
+                if self.filter_self_liked:
+                    self.user_liked_uris = results[1]
+                skeet_count = self.store.count(self.did)
+
+                # Filter als Abfrage auf dem Index, Zählwerte nur für verbleibende Kandidaten auffrischen
+                channel.phase("Analysieren")
+                with METRICS.phase("analyse", profile=True):
+                    skeets_to_delete = self.store.select_posts_to_delete(
+                        self.did, self.min_likes, self.min_reskeets, self.filter_threads, self.filter_self_liked,
+                        self.user_liked_uris, self.filter_date, self.filter_by_date, client=self.client
+                    )
+                channel.call(self.close_progress_window, window, channel)
+                channel.call(self.show_analysis_result, skeet_count, skeets_to_delete)
+            except Exception as e:
+                channel.call(finish, "Fehler", f"Fehler bei der Analyse oder Löschung der Skeets: {e}", True)
 
-                # Überprüfe, ob das Progressbar-Fenster noch existiert, bevor es gestoppt und freigegeben wird
-                if self.progress_bar.winfo_exists():
-                    self.progress_bar.stop()
+        # Starte den Thread
+        if self.streaming:
+            threading.Thread(target=run_streaming, daemon=True).start()
+        else:
+            threading.Thread(target=run_analysis, daemon=True).start()
+
+    def show_analysis_result(self, skeet_count, skeets_to_delete):
+        """Zeigt das Ergebnis der Analyse an und speichert den Plan oder startet nach Rückfrage das Löschen."""
+        result_message = (
+            f"Analyse abgeschlossen.\n\n"
+            f"Anzahl der überprüften Skeets: {skeet_count}\n\n"
+            f"Skeets, die keine der Bedingungen erfüllen und gelöscht werden: {len(skeets_to_delete)}"
+        )
+
+        if self.plan_only:
+            # Nur planen: gelöscht wird später, ggf. auf einem anderen Rechner
+            path = filedialog.asksaveasfilename(title="Plan speichern", defaultextension=".tsv",
+                                                filetypes=[("Plan-Datei", "*.tsv *.tsv.gz")])
+            if path:
+                reason = plan_reason(self.min_likes, self.min_reskeets, self.filter_threads,
+                                     self.filter_self_liked, self.filter_date, self.filter_by_date)
+                count = write_plan(path, ((uri, reason) for uri in skeets_to_delete))
+                messagebox.showinfo("Plan gespeichert", result_message + f"\n\n{count} Skeets in {path} eingetragen.")
+        elif skeets_to_delete:
+            # Kosten und Dauer nach dem Punktebudget, inklusive bereits verbrauchter Punkte
+            points = delete_cost(len(skeets_to_delete))
+            budget = self.budget.snapshot()
+            result_message += (
+                f"\n\nKosten: {points} Schreibpunkte (verbraucht: {budget['hour_used']}/{budget['hourly']} "
+                f"in der letzten Stunde, {budget['day_used']}/{budget['daily']} in den letzten 24 Stunden)"
+                f"\nVoraussichtliche Dauer: {format_eta(self.budget.estimate(points))}"
+            )
+            confirm = messagebox.askyesno("Bestätigung", result_message + "\n\nMöchten Sie diese Skeets löschen?")
+            if confirm:
+                self.delete_skeets(self.journal.create_job("posts", self.did, skeets_to_delete))
+            else:
+                messagebox.showinfo("Abgebrochen", "Löschvorgang abgebrochen.")
+        else:
+            messagebox.showinfo("Information", result_message + "\n\nKeine Skeets entsprechen den Löschkriterien.")
+
+    def open_progress_window(self, title):
+        """Erstellt ein Fortschrittsfenster, das über einen ProgressChannel aktualisiert wird."""
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        status_label = tk.Label(window, text="", width=60)
+        status_label.pack(pady=10)
+        bar = ttk.Progressbar(window, orient="horizontal", length=300, mode="indeterminate")
+        bar.pack(pady=10)
+        bar.start(10)  # Animation, solange die Gesamtzahl unbekannt ist
+        detail_label = tk.Label(window, text="")
+        detail_label.pack(pady=5)
+
+        # Blockiere das Hauptfenster während des Vorgangs
+        window.grab_set()
+
+        def show(state):
+            status_label['text'] = format_status(state)
+            detail_label['text'] = state['detail']
+            if state['total']:
+                if str(bar['mode']) != "determinate":
+                    bar.stop()
+                    bar.config(mode="determinate")
+                bar['maximum'] = state['total']
+                bar['value'] = state['done']
+            elif str(bar['mode']) != "indeterminate":
+                bar.config(mode="indeterminate")
+                bar.start(10)
+
+        channel = ProgressChannel(self.root, show)
+        channel.start()
+        return window, channel
+
+    def close_progress_window(self, window, channel):
+        channel.stop()
+        if window.winfo_exists():
+            window.grab_release()  # Gib das Hauptfenster frei
+            window.destroy()
+
+    def delete_skeets(self, job_id):
+        """Löscht die offenen Skeets eines Löschauftrags aus dem Journal."""
+        skeet_uris = self.journal.pending(job_id)
+        window, channel = self.open_progress_window("Fortschritt beim Löschen der Skeets")
+        channel.phase("Löschen der Skeets", len(skeet_uris))
 
-                if self.progress_window.winfo_exists():
-                    self.progress_window.grab_release()  # Gib das Hauptfenster frei
-                    self.progress_window.destroy()
+        def update_status_callback(current, total):
+            channel.progress(current, total)
 
-                if self.filter_self_liked:
-                    self.user_liked_uris = get_user_likes(self.auth_token, self.did)
-                
-                skeets_to_delete = analyze_skeets(
-                    self.skeets, self.min_likes, self.min_reskeets, self.filter_threads, self.filter_self_liked, self.user_liked_uris, self.filter_date, self.filter_by_date
-                )
-
-                result_message = (
-                    f"Analyse abgeschlossen.\n\n"
-                    f"Anzahl der überprüften Skeets: {len(self.skeets)}\n\n"
-                    f"Skeets, die keine der Bedingungen erfüllen und gelöscht werden: {len(skeets_to_delete)}"
-                )
-
-                if skeets_to_delete:
-                    confirm = messagebox.askyesno("Bestätigung", result_message + "\n\nMöchten Sie diese Skeets löschen?")
-                    if confirm:
-                        self.delete_skeets(list(skeets_to_delete))
-                    else:
-                        messagebox.showinfo("Abgebrochen", "Löschvorgang abgebrochen.")
-                else:
-                    messagebox.showinfo("Information", result_message + "\n\nKeine Skeets entsprechen den Löschkriterien.")
-            except Exception as e:
-                if self.progress_bar.winfo_exists():
-                    self.progress_bar.stop()
+        def update_state(state):
+            """Zeigt Worker und Zustand des Rate-Limit-Buckets an."""
+            text = f"Worker: {state['active']}/{state['workers']}  Rate: {state['rate']:.1f}/s"
+            if state['remaining'] is not None:
+                text += f"  Verbleibend: {state['remaining']}"
+            if state['paused']:
+                text += f"  Pause: {state['paused']:.0f}s"
+            channel.detail(text)
 
-                if self.progress_window.winfo_exists():
-                    self.progress_window.grab_release()  # Gib das Hauptfenster frei
-                    self.progress_window.destroy()
+        def show_budget_wait(until):
+            channel.detail(f"Punktebudget für Writes erschöpft, weiter um {datetime.fromtimestamp(until):%H:%M}")
 
-                messagebox.showerror("Fehler", f"Fehler bei der Analyse oder Löschung der Skeets: {e}")
+        self.budget.on_wait = show_budget_wait
 
-        # Starte den Thread
-        threading.Thread(target=run_analysis).start()
-
-    def delete_skeets(self, skeet_uris):
-        """Löscht die markierten Skeets."""
-        # Fortschrittsfenster erstellen
-        self.delete_progress_window = tk.Toplevel(self.root)
-        self.delete_progress_window.title("Fortschritt beim Löschen der Skeets")
-        self.delete_progress_label = tk.Label(self.delete_progress_window, text="Löschen der Skeets: 0 von {}".format(len(skeet_uris)))
-        self.delete_progress_label.pack(pady=10)
-        self.delete_progress_bar = ttk.Progressbar(self.delete_progress_window, orient="horizontal", length=300, mode="determinate")
-        self.delete_progress_bar.pack(pady=10)
-        self.delete_progress_bar["maximum"] = len(skeet_uris)
-        self.delete_progress_bar["value"] = 0
-
-        # Blockiere das Hauptfenster während des Löschens
-        self.delete_progress_window.grab_set()
-
-        def update_progress_bar(progress):
-            """Aktualisiert die Fortschrittsanzeige."""
-            self.delete_progress_bar["value"] = progress
-            self.delete_progress_label['text'] = f"Löschen der Skeets: {progress} von {len(skeet_uris)}"
-            self.delete_progress_window.update_idletasks()
+        def record_batch(uris, error):
+            self.journal.mark(job_id, uris, error)
+            if error is not None:
+                channel.add_errors(len(uris))
 
-        def update_status_callback(current, total):
-            """Aktualisiert den Fortschritt nach jedem gelöschten Skeet."""
-            update_progress_bar(current)
+        def finish(title, text, error=False):
+            self.close_progress_window(window, channel)
+            (messagebox.showerror if error else messagebox.showinfo)(title, text)
 
         # Thread zum Löschen der Skeets
         def run_deletion():
+            archive = None
             try:
-                delete_single_skeets(self.auth_token, skeet_uris, update_progress_bar, update_status_callback)
+                # Vor dem Löschen archivieren: Inhalt und Zählwerte aus dem lokalen Index, fehlende
+                # Inhalte (Index aus einer älteren Version) aus einem einzigen Repo-Export
+                if self.store is None:
+                    self.store = RecordStore(default_store_path(self.did))
+                self.store.fill_values(self.client, self.did, skeet_uris)
+                archive = ArchiveWriter(default_archive_path(self.did), self.store.archive_entries)
+                with METRICS.phase("loeschen"):
+                    results = delete_single_skeets(
+                        self.client, skeet_uris, None, update_status_callback, state_callback=update_state,
+                        batch_callback=record_batch, budget=self.budget, archive=archive
+                    )
+                if not self.journal.pending(job_id):
+                    self.journal.finish(job_id)
+                if self.store is not None:
+                    self.store.remove([uri for uri, error in results.items() if error is None])
 
                 # Löschvorgang abgeschlossen
-                messagebox.showinfo("Fertig", "Alle markierten Skeets wurden gelöscht.")
+                failed = sum(1 for error in results.values() if error is not None)
+                if failed:
+                    channel.call(finish, "Fertig", f"{len(results) - failed} Skeets gelöscht, {failed} fehlgeschlagen.")
+                else:
+                    channel.call(finish, "Fertig", "Alle markierten Skeets wurden gelöscht.")
             except Exception as e:
-                messagebox.showerror("Fehler", f"Fehler beim Löschen der Skeets: {e}")
+                channel.call(finish, "Fehler", f"Fehler beim Löschen der Skeets: {e}", True)
             finally:
-                # Fortschrittsfenster freigeben und schließen
-                self.delete_progress_window.grab_release()
-                self.delete_progress_window.destroy()
+                if archive is not None:
+                    archive.close()
 
         # Starte den Thread für das Löschen
-        threading.Thread(target=run_deletion).start()
+        threading.Thread(target=run_deletion, daemon=True).start()
 
 # Hauptprogramm
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+"""Auflösen einer DID zum PDS des Kontos, mit kleinem Cache.
+
+Die Anmeldung läuft über den Einstiegsdienst (bsky.social). Für Konten auf einem anderen PDS leitet
+der jeden Repo-Request nur weiter, das kostet einen zusätzlichen Umweg. Der PDS steht im
+DID-Dokument: bei did:plc im PLC-Verzeichnis, bei did:web unter /.well-known/did.json der Domain.
+createSession liefert das Dokument meist schon mit, dann ist kein eigener Abruf nötig. Aufgelöste
+Endpunkte werden für CACHE_TTL Sekunden gemerkt.
+"""
+import os
+import threading
+import time
+from urllib.parse import unquote
+
+import requests
+
+# Mit BSKY_PLC lässt sich ein anderes PLC-Verzeichnis verwenden, etwa der Mock-Server
+PLC_DIRECTORY = os.environ.get("BSKY_PLC", "https://plc.directory").rstrip("/")
+
+CACHE_TTL = 3600
+
+PDS_SERVICE_ID = "#atproto_pds"
+PDS_SERVICE_TYPE = "AtprotoPersonalDataServer"
+
+# (Verbindungsaufbau, Lesen) in Sekunden
+TIMEOUT = (10, 30)
+
+
+class TtlCache:
+    """Thread-sicheres Dict, dessen Einträge nach ttl Sekunden verfallen."""
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+
+
+# Aufgelöste PDS-Endpunkte pro DID, gemeinsam für alle Clients eines Prozesses
+PDS_CACHE = TtlCache()
+
+
+def did_document_url(did):
+    """URL des DID-Dokuments für did:plc und did:web."""
+    if did.startswith("did:plc:"):
+        return f"{PLC_DIRECTORY}/{did}"
+    if did.startswith("did:web:"):
+        # did:web:example.com:user:alice -> https://example.com/user/alice/did.json, Ports sind als %3A kodiert
+        host, *path = [unquote(part) for part in did[len("did:web:"):].split(":")]
+        if path:
+            return f"https://{host}/{'/'.join(path)}/did.json"
+        return f"https://{host}/.well-known/did.json"
+    raise Exception("Nicht unterstützte DID-Methode: " + did)
+
+
+def pds_endpoint(document):
+    """PDS-Adresse aus einem DID-Dokument oder None."""
+    for service in document.get("service", []):
+        if service.get("type") != PDS_SERVICE_TYPE:
+            continue
+        if service.get("id") in (PDS_SERVICE_ID, document.get("id", "") + PDS_SERVICE_ID):
+            return service["serviceEndpoint"].rstrip("/")
+    return None
+
+
+def resolve_did(did, session=None):
+    """Ruft das DID-Dokument ab."""
+    response = (session or requests).get(did_document_url(did), timeout=TIMEOUT)
+    if response.status_code != 200:
+        raise Exception("DID-Dokument konnte nicht abgerufen werden: " + response.text)
+    return response.json()
+
+
+def resolve_pds(did, session=None, document=None, cache=PDS_CACHE):
+    """PDS-Adresse eines Kontos, aus dem Cache, dem übergebenen oder dem abgerufenen DID-Dokument."""
+    endpoint = cache.get(did)
+    if endpoint is None:
+        endpoint = pds_endpoint(document) if document else None
+        if endpoint is None:
+            endpoint = pds_endpoint(resolve_did(did, session))
+        if endpoint is None:
+            raise Exception(f"Kein PDS im DID-Dokument von {did}")
+        cache.put(did, endpoint)
+    return endpoint
@@ -0,0 +1,214 @@
+"""Journal für Löschaufträge, damit ein abgebrochener Lauf dort weitermacht, wo er aufgehört hat.
+
+Ein Auftrag speichert die geplanten URIs, den Status pro URI, beim Abruf den Cursor der letzten
+verarbeiteten Seite und gegebenenfalls den Stichtag (before_tid), mit dem er geplant wurde. Jeder abgeschlossene Löschbatch wird sofort festgeschrieben. Nach einem Absturz
+oder abgelaufenem Token wird weder neu abgerufen noch neu analysiert, nur die offenen URIs werden
+gelöscht.
+"""
+import sqlite3
+import threading
+
+from bsky_decode import decode_record_page
+from bsky_records import LIST_RECORDS, LIST_RECORDS_LIMIT, split_before
+from bsky_writes import DEFAULT_WORKERS, delete_records_concurrent
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    did TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    cursor TEXT,
+    before_tid TEXT,
+    planned INTEGER NOT NULL DEFAULT 0,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id INTEGER NOT NULL REFERENCES jobs (id),
+    uri TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    PRIMARY KEY (job_id, uri)
+);
+CREATE INDEX IF NOT EXISTS job_items_status ON job_items (job_id, status);
+"""
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+# Nicht mehr ausgewählt, etwa weil ein neuer Lauf anders gefiltert hat
+SKIPPED = "skipped"
+
+
+def default_journal_path(did):
+    """Dateiname des Journals für ein Konto im aktuellen Verzeichnis."""
+    return f"bsky_jobs_{did.replace(':', '_')}.sqlite"
+
+
+class DeleteJournal:
+    """SQLite-Datei mit Löschaufträgen und dem Status jeder geplanten URI."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        # Journale aus älteren Versionen um den Stichtag ergänzen
+        if "before_tid" not in {row[1] for row in self.db.execute("PRAGMA table_info(jobs)")}:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN before_tid TEXT")
+
+    def close(self):
+        self.db.close()
+
+    def open_job(self, kind, did):
+        """ID des letzten unfertigen Auftrags dieser Art oder None."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND did = ? AND finished = 0 ORDER BY id DESC LIMIT 1", (kind, did)
+            ).fetchone()
+        return row[0] if row else None
+
+    def create_job(self, kind, did, uris=None, before=None):
+        """Legt einen Auftrag an. Mit uris gilt die Planung sofort als abgeschlossen.
+
+        before ist der Stichtag (TID), mit dem geplant wird. Ein fortgesetzter Auftrag plant mit demselben
+        weiter (siehe before()), auch wenn der neue Lauf ein anderes Datum vorgibt.
+        """
+        with self.lock, self.db:
+            job_id = self.db.execute("INSERT INTO jobs (kind, did, before_tid) VALUES (?, ?, ?)", (kind, did, before)).lastrowid
+        if uris is not None:
+            self.add_planned(job_id, uris)
+            self.set_planned(job_id)
+        return job_id
+
+    def add_planned(self, job_id, uris, cursor=None):
+        """Nimmt URIs in den Plan auf und merkt sich optional den Cursor der Seite, aus der sie stammen."""
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR IGNORE INTO job_items (job_id, uri) VALUES (?, ?)", [(job_id, uri) for uri in uris])
+            if cursor is not None:
+                self.db.execute("UPDATE jobs SET cursor = ? WHERE id = ?", (cursor, job_id))
+
+    def set_planned(self, job_id):
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET planned = 1 WHERE id = ?", (job_id,))
+
+    def job(self, job_id):
+        """(cursor, Planung fertig, Auftrag fertig)"""
+        with self.lock:
+            cursor, planned, finished = self.db.execute(
+                "SELECT cursor, planned, finished FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return cursor, bool(planned), bool(finished)
+
+    def before(self, job_id):
+        """Stichtag (TID) des Auftrags oder None."""
+        with self.lock:
+            return self.db.execute("SELECT before_tid FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+    def retry_failed(self, job_id):
+        """Stellt fehlgeschlagene URIs wieder als offen ein, etwa beim Fortsetzen. Rückgabe: Anzahl."""
+        with self.lock, self.db:
+            return self.db.execute(
+                "UPDATE job_items SET status = ?, error = NULL WHERE job_id = ? AND status = ?", (PENDING, job_id, FAILED)
+            ).rowcount
+
+    def skip_pending(self, job_id, keep):
+        """Nimmt offene URIs, die nicht in keep stehen, aus dem Auftrag (Status SKIPPED). Rückgabe: Anzahl."""
+        keep = set(keep)
+        skipped = [uri for uri in self.pending(job_id) if uri not in keep]
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE job_items SET status = ? WHERE job_id = ? AND uri = ?", [(SKIPPED, job_id, uri) for uri in skipped]
+            )
+        return len(skipped)
+
+    def pending(self, job_id):
+        with self.lock:
+            return [row[0] for row in self.db.execute(
+                "SELECT uri FROM job_items WHERE job_id = ? AND status = ?", (job_id, PENDING)
+            )]
+
+    def counts(self, job_id):
+        """Anzahl URIs je Status."""
+        with self.lock:
+            return dict(self.db.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+
+    def mark(self, job_id, uris, error=None):
+        """Schreibt das Ergebnis eines Löschbatches fest."""
+        status = DONE if error is None else FAILED
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE job_items SET status = ?, error = ? WHERE job_id = ? AND uri = ?",
+                [(status, error, job_id, uri) for uri in uris]
+            )
+
+    def finish(self, job_id):
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET finished = 1 WHERE id = ?", (job_id,))
+
+
+def plan_from_records(client, journal, job_id, did, collection, select=None, progress_callback=None, before=None,
+                      values=None):
+    """Plant einen Auftrag aus listRecords und setzt nach einem Abbruch beim gespeicherten Cursor fort.
+
+    select(record) entscheidet, ob ein Record gelöscht werden soll, ohne select jeder abgerufene.
+    Mit before (TID) wird vom ältesten Record an abgerufen und an der Grenze aufgehört, siehe
+    bsky_records.iter_record_pages. Nach jeder Seite werden die ausgewählten URIs zusammen mit dem
+    Cursor festgeschrieben. values (bsky_archive.RecordValues) merkt sich die ausgewählten Records
+    fürs Archiv.
+    """
+    cursor, planned, _ = journal.job(job_id)
+    if planned:
+        return
+
+    params = {"repo": did, "collection": collection, "limit": LIST_RECORDS_LIMIT}
+    if before is not None:
+        params["reverse"] = "true"
+    if cursor:
+        params["cursor"] = cursor
+
+    seen = 0
+    while True:
+        response = client.get(LIST_RECORDS, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Fehler beim Abrufen der Records: {response.text}")
+
+        records, next_cursor = decode_record_page(response.content)
+        reached = False
+        if before is not None:
+            records, reached = split_before(records, before)
+        next_cursor = next_cursor if records and not reached else None
+        selected = [record for record in records if select is None or select(record)]
+        if values is not None:
+            values.add(selected)
+        journal.add_planned(job_id, [record["uri"] for record in selected], next_cursor or "")
+
+        seen += len(records)
+        if progress_callback:
+            progress_callback(seen)
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+
+    journal.set_planned(job_id)
+
+
+def run_job(client, journal, job_id, progress_callback=None, state_callback=None, workers=DEFAULT_WORKERS, bucket=None,
+            budget=None, archive=None):
+    """Löscht alle offenen URIs eines Auftrags und schreibt jeden Batch sofort ins Journal.
+
+    Ist nichts mehr offen, wird der Auftrag abgeschlossen. Rückgabe wie delete_records_concurrent,
+    nur für die in diesem Lauf bearbeiteten URIs. Mit bucket teilen sich mehrere Aufträge eines
+    Kontos einen TokenBucket, budget verteilt die Batches über das Punktebudget (bsky_budget),
+    archive sichert jeden Batch vor dem Löschen (bsky_archive).
+    """
+    results = delete_records_concurrent(
+        client, journal.pending(job_id), progress_callback, workers=workers, bucket=bucket, state_callback=state_callback,
+        batch_callback=lambda uris, error: journal.mark(job_id, uris, error), budget=budget,
+        archive=archive
+    )
+    if not journal.pending(job_id):
+        journal.finish(job_id)
+    return results
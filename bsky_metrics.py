@@ -0,0 +1,201 @@
+"""Messwerte pro XRPC-Methode und Phase, damit sich sagen lässt, woran ein langsamer Lauf hängt.
+
+XrpcClient meldet jeden Request: Anzahl nach Status, Latenz als Histogramm, gesendete und empfangene
+Bytes und den Spielraum laut RateLimit-Headern. Die Skripte messen ihre Phasen (Abrufen, Analysieren,
+Löschen) mit METRICS.phase(). Ist die Umgebungsvariable BSKY_METRICS gesetzt, wird am Ende des Laufs
+eine JSON-Zusammenfassung (<BSKY_METRICS>.json) und eine Prometheus-Textdatei (<BSKY_METRICS>.prom,
+für den Textfile-Collector) geschrieben.
+
+Mit BSKY_PROFILE=<verzeichnis> werden Phasen, die mit profile=True gemessen werden, zusätzlich mit
+cProfile (<phase>.prof) und tracemalloc (<phase>.mem.txt) aufgezeichnet. cProfile erfasst nur den
+Thread, der die Phase ausführt, Worker-Threads nicht.
+"""
+import atexit
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Obergrenzen der Latenz-Buckets in Sekunden
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TRACEMALLOC_TOP = 25
+
+
+class EndpointStats:
+    __slots__ = ("statuses", "buckets", "seconds", "count", "bytes_sent", "bytes_received",
+                 "ratelimit_limit", "ratelimit_remaining_min", "ratelimit_remaining_last")
+
+    def __init__(self):
+        self.statuses = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.ratelimit_limit = None
+        self.ratelimit_remaining_min = None
+        self.ratelimit_remaining_last = None
+
+
+class Metrics:
+    """Thread-sichere Sammlung der Messwerte eines Laufs."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.phases = {}
+        self.started = time.time()
+
+    def record_request(self, nsid, status, seconds, bytes_sent, bytes_received, headers=None):
+        with self.lock:
+            stats = self.endpoints.get(nsid)
+            if stats is None:
+                stats = self.endpoints[nsid] = EndpointStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+            else:
+                stats.buckets[-1] += 1
+
+            remaining = headers.get("RateLimit-Remaining") if headers is not None else None
+            if remaining is not None:
+                # Kaputte Header dürfen aus einer erfolgreichen Antwort keinen Fehler machen
+                try:
+                    remaining = int(remaining)
+                    limit = headers.get("RateLimit-Limit")
+                    limit = int(limit) if limit is not None else None
+                except ValueError:
+                    return
+                stats.ratelimit_remaining_last = remaining
+                if stats.ratelimit_remaining_min is None or remaining < stats.ratelimit_remaining_min:
+                    stats.ratelimit_remaining_min = remaining
+                if limit is not None:
+                    stats.ratelimit_limit = limit
+
+    def add_phase_time(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name, profile=False):
+        """Misst die Dauer einer Phase, mit profile=True und BSKY_PROFILE auch CPU und Speicher."""
+        profile_dir = os.environ.get("BSKY_PROFILE") if profile else None
+        profiler = None
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler = cProfile.Profile()
+            tracing = tracemalloc.is_tracing()
+            if not tracing:
+                tracemalloc.start()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase_time(name, time.perf_counter() - start)
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+                write_tracemalloc(os.path.join(profile_dir, f"{name}.mem.txt"))
+                if not tracing:
+                    tracemalloc.stop()
+
+    def summary(self):
+        """Alle Messwerte als JSON-taugliches Dict."""
+        with self.lock:
+            endpoints = {
+                nsid: {
+                    "requests": stats.count,
+                    "statuses": {str(status): count for status, count in sorted(stats.statuses.items())},
+                    "seconds_total": round(stats.seconds, 6),
+                    "seconds_mean": round(stats.seconds / stats.count, 6) if stats.count else None,
+                    "latency_buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], stats.buckets)),
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                    "ratelimit_limit": stats.ratelimit_limit,
+                    "ratelimit_remaining_min": stats.ratelimit_remaining_min,
+                    "ratelimit_remaining_last": stats.ratelimit_remaining_last,
+                }
+                for nsid, stats in sorted(self.endpoints.items())
+            }
+            return {
+                "started": self.started,
+                "duration_seconds": round(time.time() - self.started, 3),
+                "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                "endpoints": endpoints,
+            }
+
+    def prometheus_text(self):
+        """Messwerte im Textformat von Prometheus."""
+        data = self.summary()
+        lines = [
+            "# HELP bsky_xrpc_requests_total XRPC-Requests nach Methode und Status.",
+            "# TYPE bsky_xrpc_requests_total counter",
+        ]
+        for nsid, stats in data["endpoints"].items():
+            for status, count in stats["statuses"].items():
+                lines.append(f'bsky_xrpc_requests_total{{nsid="{nsid}",status="{status}"}} {count}')
+
+        lines += ["# HELP bsky_xrpc_request_seconds Latenz der XRPC-Requests.",
+                  "# TYPE bsky_xrpc_request_seconds histogram"]
+        for nsid, stats in data["endpoints"].items():
+            cumulative = 0
+            for bound, count in stats["latency_buckets"].items():
+                cumulative += count
+                lines.append(f'bsky_xrpc_request_seconds_bucket{{nsid="{nsid}",le="{bound}"}} {cumulative}')
+            lines.append(f'bsky_xrpc_request_seconds_sum{{nsid="{nsid}"}} {stats["seconds_total"]}')
+            lines.append(f'bsky_xrpc_request_seconds_count{{nsid="{nsid}"}} {stats["requests"]}')
+
+        for name, key, help_text in (("bsky_xrpc_request_bytes_total", "bytes_sent", "Gesendete Bytes."),
+                                     ("bsky_xrpc_response_bytes_total", "bytes_received", "Empfangene Bytes.")):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{nsid="{nsid}"}} {stats[key]}' for nsid, stats in data["endpoints"].items()]
+
+        for name, key, help_text in (("bsky_ratelimit_limit", "ratelimit_limit", "RateLimit-Limit laut Server."),
+                                     ("bsky_ratelimit_remaining_min", "ratelimit_remaining_min",
+                                      "Kleinster beobachteter RateLimit-Remaining-Wert.")):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            lines += [f'{name}{{nsid="{nsid}"}} {stats[key]}' for nsid, stats in data["endpoints"].items()
+                      if stats[key] is not None]
+
+        lines += ["# HELP bsky_phase_seconds_total Zeit pro Phase des Laufs.", "# TYPE bsky_phase_seconds_total counter"]
+        lines += [f'bsky_phase_seconds_total{{phase="{name}"}} {seconds}' for name, seconds in data["phases"].items()]
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, prefix):
+        """Schreibt <prefix>.json und <prefix>.prom. Die Textdatei wird atomar ersetzt."""
+        with open(prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(prefix + ".prom.tmp", "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(prefix + ".prom.tmp", prefix + ".prom")
+
+
+def write_tracemalloc(path):
+    # Eigene Allokationen von cProfile und tracemalloc ausblenden
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"aktuell {current / 1024 / 1024:.1f} MB, Spitze {peak / 1024 / 1024:.1f} MB\n\n")
+        for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+            f.write(f"{stat}\n")
+
+
+# Gemeinsame Messwerte aller Clients eines Laufs
+METRICS = Metrics()
+
+if os.environ.get("BSKY_METRICS"):
+    atexit.register(METRICS.write_reports, os.environ["BSKY_METRICS"])
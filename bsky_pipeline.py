@@ -0,0 +1,171 @@
+"""Streaming-Pipeline: Abrufen, Filtern und Löschen laufen gleichzeitig statt nacheinander.
+
+Seiten von getAuthorFeed werden per Generator geliefert, sobald sie ankommen. Die Filterentscheidung
+fällt pro Seite, und zu löschende Skeets gehen über eine begrenzte Queue an den Löschthread, während
+weitere Seiten abgerufen werden. Zurückgehalten werden nur Antworten, deren Elternskeet noch auf einer
+späteren Seite kommen kann (der Feed liefert die neuesten Skeets zuerst).
+"""
+import queue
+import threading
+from bsky_writes import DEFAULT_WORKERS, MAX_BATCH_SIZE, TokenBucket, delete_records_concurrent
+from bsky_records import decode_feed_page
+
+AUTHOR_FEED = "app.bsky.feed.getAuthorFeed"
+
+# Anzahl Seiten bzw. Löschbatches, die zwischen den Stufen höchstens warten
+QUEUE_SIZE = 4
+
+_DONE = object()
+
+
+def iter_author_feed(client, did):
+    """Liefert die Seiten von getAuthorFeed einzeln als Skeets, sobald sie abgerufen sind."""
+    cursor = None
+
+    while True:
+        params = {"actor": did}
+        if cursor:
+            params["cursor"] = cursor
+
+        response = client.get(AUTHOR_FEED, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Fehler beim Abrufen der Skeets: {response.text}")
+
+        skeets, cursor = decode_feed_page(response.content)
+        yield skeets
+
+        if not cursor:
+            break
+
+
+class StreamingThreadFilter:
+    """Entscheidet seitenweise, welche Skeets gelöscht werden.
+
+    keep(skeet) prüft alle Filter außer dem Threadfilter. Ist filter_threads aktiv, bleibt ein Skeet
+    erhalten, wenn sein Elternskeet oder eine Antwort darauf im Feed ist. Antworten ohne bisher
+    gesehenen Elternskeet bleiben offen, bis der Elternskeet kommt oder der Feed zu Ende ist.
+    """
+
+    def __init__(self, keep, filter_threads):
+        self.keep = keep
+        self.filter_threads = filter_threads
+        self.seen_parents = set()  # Elternskeet-URIs, auf die eine bereits gesehene Antwort verweist
+        self.pending = {}          # Elternskeet-URI -> offene Antworten darauf
+
+    def feed(self, page):
+        """Verarbeitet eine Seite und liefert die URIs, die jetzt sicher gelöscht werden können."""
+        for skeet in page:
+            uri = skeet.uri
+            kept = self.keep(skeet)
+
+            if not self.filter_threads:
+                if not kept:
+                    yield uri
+                continue
+
+            # Offene Antworten auf diesen Skeet sind jetzt Teil eines Threads und damit entschieden
+            in_thread = self.pending.pop(uri, None) is not None
+            if uri in self.seen_parents:
+                self.seen_parents.discard(uri)
+                in_thread = True
+
+            parent_uri = skeet.parent_uri
+            if parent_uri:
+                self.seen_parents.add(parent_uri)
+
+            if kept or in_thread:
+                continue
+            if parent_uri:
+                self.pending.setdefault(parent_uri, []).append(uri)
+            else:
+                yield uri
+
+    def finish(self):
+        """Feed zu Ende: Antworten ohne Elternskeet im Feed sind keine Threads."""
+        for uris in self.pending.values():
+            yield from uris
+        self.pending.clear()
+
+
+def run_pipeline(client, did, keep, filter_threads, fetch_callback=None, delete_callback=None,
+                 dry_run=False, workers=DEFAULT_WORKERS, queue_size=QUEUE_SIZE, batch_size=MAX_BATCH_SIZE, pages=None,
+                 budget=None, archive=None):
+    """Ruft den Feed ab, filtert und löscht im Fluss. Rückgabe: Dict URI -> None (gelöscht) oder Fehlertext.
+
+    pages ist ein Iterable von Seiten mit Skeets, standardmäßig iter_author_feed(client, did).
+
+    fetch_callback(abgerufen) nach jeder Seite, delete_callback(erledigt, geplant) nach jedem Löschbatch.
+    Mit dry_run=True wird nichts gelöscht, die Rückgabe enthält dann alle geplanten URIs mit None.
+    budget (bsky_budget.BudgetScheduler) verteilt die Löschbatches über das Punktebudget, archive
+    (bsky_archive.ArchiveWriter) sichert jeden Batch vor dem Löschen.
+    Alle Löschbatches teilen sich einen TokenBucket, Pausen nach 429 und die gelernte Rate bleiben erhalten.
+    """
+    bucket = TokenBucket()
+    page_queue = queue.Queue(maxsize=queue_size)
+    batches = queue.Queue(maxsize=queue_size)
+    errors = []
+    results = {}
+    planned = [0]
+
+    def fetch():
+        try:
+            fetched = 0
+            for page in pages if pages is not None else iter_author_feed(client, did):
+                page_queue.put(page)
+                fetched += len(page)
+                if fetch_callback:
+                    fetch_callback(fetched)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            page_queue.put(_DONE)
+
+    def delete():
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                return
+            if dry_run:
+                results.update((uri, None) for uri in batch)
+            else:
+                try:
+                    results.update(delete_records_concurrent(client, batch, workers=workers, bucket=bucket,
+                                                             budget=budget, archive=archive))
+                except Exception as e:
+                    results.update((uri, str(e)) for uri in batch)
+            if delete_callback:
+                delete_callback(len(results), planned[0])
+
+    fetcher = threading.Thread(target=fetch, daemon=True)
+    deleter = threading.Thread(target=delete, daemon=True)
+    fetcher.start()
+    deleter.start()
+
+    stream_filter = StreamingThreadFilter(keep, filter_threads)
+    batch = []
+
+    def collect(uris):
+        for uri in uris:
+            batch.append(uri)
+            planned[0] += 1
+            if len(batch) >= batch_size:
+                batches.put(batch[:])
+                batch.clear()
+
+    try:
+        while True:
+            page = page_queue.get()
+            if page is _DONE:
+                break
+            collect(stream_filter.feed(page))
+        if not errors:
+            collect(stream_filter.finish())
+        if batch:
+            batches.put(batch[:])
+    finally:
+        batches.put(_DONE)
+        deleter.join()
+
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,181 @@
+"""Plan-Dateien: das Ergebnis einer Analyse, das später oder auf einem anderen Rechner gelöscht wird.
+
+So lassen sich Abruf und Analyse zu einer ruhigen Zeit erledigen und das Rate-Limit-Budget fürs
+Löschen getrennt davon einteilen. Eine Zeile pro Record, tabgetrennt und nach DID, Collection und
+rkey sortiert:
+
+    did<TAB>collection<TAB>rkey<TAB>grund
+
+Pläne lassen sich dadurch mit diff vergleichen, mit merge_plans zusammenführen und zeilenweise
+abarbeiten, ohne sie ganz in den Speicher zu laden. Endet der Dateiname auf .gz, wird gzip verwendet.
+
+Ausführen ohne Oberfläche:
+
+    python bsky_plan.py ausfuehren plan.tsv --user name.bsky.social [--budget bsky_budget_did_plc_xyz.json]
+    python bsky_plan.py zusammenfuehren gesamt.tsv plan1.tsv plan2.tsv
+
+Das Passwort kommt aus der Umgebungsvariable BSKY_PASSWORD oder wird abgefragt. Gelöscht wird im
+Punktebudget für Writes (bsky_budget), der Stand liegt in derselben Datei wie bei den anderen Skripten.
+"""
+import gzip
+import heapq
+import os
+import tempfile
+from itertools import islice
+
+from bsky_writes import DEFAULT_WORKERS, TokenBucket, delete_records_concurrent, split_uri
+
+PLAN_HEADER = "# bsky-plan v1"
+
+# So viele URIs werden beim Ausführen auf einmal aus der Datei gelesen und gelöscht
+EXECUTE_CHUNK_SIZE = 10000
+
+# So viele Zeilen werden beim Schreiben höchstens im Speicher sortiert, größere Pläne in Teilen
+SORT_CHUNK_SIZE = 100000
+
+
+def open_plan(path, mode="r"):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="\n")
+    return open(path, mode, encoding="utf-8", newline="\n")
+
+
+def plan_line(uri, reason):
+    did, collection, rkey = split_uri(uri)
+    return f"{did}\t{collection}\t{rkey}\t{reason}\n"
+
+
+def write_plan(path, entries, chunk_size=SORT_CHUNK_SIZE):
+    """Schreibt (uri, grund)-Paare sortiert in eine Plan-Datei und gibt die Anzahl zurück.
+
+    Sortiert wird in Abschnitten von chunk_size Zeilen. Passen nicht alle in einen, landet jeder
+    sortiert in einer temporären Datei neben dem Plan, und die Teile werden wie bei merge_plans
+    zusammengeführt. entries darf ein Generator sein, der Speicherbedarf hängt nur von chunk_size ab.
+    """
+    lines = (plan_line(uri, reason) for uri, reason in entries)
+    runs = []
+    count = 0
+    try:
+        while True:
+            chunk = sorted(islice(lines, chunk_size))
+            count += len(chunk)
+            if len(chunk) < chunk_size and not runs:
+                # Alles passt in einen Abschnitt, keine Teildateien nötig
+                with open_plan(path, "w") as f:
+                    f.write(PLAN_HEADER + "\n")
+                    f.writelines(chunk)
+                return count
+            if chunk:
+                fd, run = tempfile.mkstemp(prefix=".plan-", suffix=".tsv", dir=os.path.dirname(os.path.abspath(path)))
+                os.close(fd)
+                runs.append(run)
+                with open_plan(run, "w") as f:
+                    f.writelines(chunk)
+            if len(chunk) < chunk_size:
+                break
+        with open_plan(path, "w") as f:
+            f.write(PLAN_HEADER + "\n")
+            f.writelines(heapq.merge(*(iter_plan_lines(run) for run in runs)))
+        return count
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def iter_plan_lines(path):
+    with open_plan(path) as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield line
+
+
+def iter_plan(path):
+    """Liest eine Plan-Datei zeilenweise und liefert (uri, grund)."""
+    for line in iter_plan_lines(path):
+        fields = line.rstrip("\n").split("\t", 3)
+        if len(fields) != 4:
+            raise Exception("Ungültige Zeile in der Plan-Datei: " + line)
+        did, collection, rkey, reason = fields
+        yield f"at://{did}/{collection}/{rkey}", reason
+
+
+def merge_plans(path, *sources):
+    """Führt sortierte Pläne zusammen, doppelte Records werden nur einmal übernommen."""
+    count = 0
+    last_key = None
+    with open_plan(path, "w") as f:
+        f.write(PLAN_HEADER + "\n")
+        for line in heapq.merge(*(iter_plan_lines(source) for source in sources)):
+            key = line.split("\t", 3)[:3]
+            if key != last_key:
+                f.write(line)
+                count += 1
+                last_key = key
+    return count
+
+
+def execute_plan(client, path, progress_callback=None, state_callback=None, workers=DEFAULT_WORKERS,
+                 chunk_size=EXECUTE_CHUNK_SIZE, budget=None):
+    """Löscht alle Records einer Plan-Datei abschnittsweise.
+
+    progress_callback(erledigt) wird nach jedem Batch aufgerufen. Rückgabe ist
+    (Anzahl gelöscht, Dict URI -> Fehlertext der fehlgeschlagenen).
+    Alle Abschnitte teilen sich einen TokenBucket, Pausen nach 429 und die gelernte Rate bleiben erhalten.
+    budget (bsky_budget.BudgetScheduler) verteilt die Batches über das Stunden- und Tagesbudget.
+    """
+    bucket = TokenBucket()
+    plan = (uri for uri, _ in iter_plan(path))
+    deleted = 0
+    failed = {}
+    while True:
+        chunk = list(islice(plan, chunk_size))
+        if not chunk:
+            break
+
+        done_before = deleted + len(failed)
+        batch_progress = (lambda done, total: progress_callback(done_before + done)) if progress_callback else None
+        results = delete_records_concurrent(client, chunk, batch_progress, workers=workers, bucket=bucket,
+                                            state_callback=state_callback, budget=budget)
+        for uri, error in results.items():
+            if error is None:
+                deleted += 1
+            else:
+                failed[uri] = error
+    return deleted, failed
+
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+    import os
+    import time
+    from bsky_budget import BudgetScheduler, default_budget_path, delete_cost, format_eta
+    from bsky_client import XrpcClient
+
+    parser = argparse.ArgumentParser(description="Plan-Dateien ausführen oder zusammenführen.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    execute = commands.add_parser("ausfuehren", help="Löscht alle Records einer Plan-Datei.")
+    execute.add_argument("plan")
+    execute.add_argument("--user", required=True, help="Bluesky-Benutzername, bspw. testuser.bsky.social")
+    execute.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    execute.add_argument("--budget", help="Datei mit dem Punktestand, Standard: bsky_budget_<did>.json")
+    merge = commands.add_parser("zusammenfuehren", help="Führt mehrere Pläne zu einem zusammen.")
+    merge.add_argument("ziel")
+    merge.add_argument("plaene", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "zusammenfuehren":
+        print(f"{merge_plans(args.ziel, *args.plaene)} Records in {args.ziel}.")
+    else:
+        client = XrpcClient()
+        client.login(args.user, os.environ.get("BSKY_PASSWORD") or getpass.getpass("Passwort: "))
+        budget = BudgetScheduler(args.budget or default_budget_path(client.did),
+                                 on_wait=lambda until: print(f"\rPunktebudget erschöpft, weiter um {time.strftime('%H:%M', time.localtime(until))}", end=""))
+        planned = sum(1 for _ in iter_plan_lines(args.plan))
+        print(f"{planned} Records im Plan, Löschdauer nach Punktebudget: {format_eta(budget.estimate(delete_cost(planned)))}")
+        deleted, failed = execute_plan(client, args.plan, lambda done: print(f"\r{done} bearbeitet", end=""),
+                                       workers=args.workers, budget=budget)
+        print()
+        for uri, error in failed.items():
+            print(f"Failed to delete: {uri} - {error}")
+        print(f"{deleted} Records gelöscht, {len(failed)} fehlgeschlagen.")
@@ -0,0 +1,131 @@
+"""Fortschrittsmeldungen von Worker-Threads an eine Tk-Oberfläche.
+
+Tk ist nicht threadsicher: Worker-Threads dürfen weder Widgets ändern noch update_idletasks() oder
+messagebox aufrufen. Sie legen nur Ereignisse in eine Queue, die der Tk-Mainloop per after() in festen
+Abständen leert. Egal wie oft gemeldet wird, die Anzeige wird höchstens einmal pro Intervall neu
+gezeichnet. Für jede Phase (Abrufen, Analysieren, Löschen) werden Durchsatz, Restzeit und Fehler
+mitgeführt.
+"""
+import queue
+import time
+
+POLL_INTERVAL_MS = 200
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def format_status(state):
+    """Statuszeile wie "Löschen: 400 von 1000 · 12.5/s · noch 0:48 · 2 Fehler"."""
+    text = f"{state['phase']}: {state['done']}"
+    if state['total']:
+        text += f" von {state['total']}"
+    if state['rate']:
+        text += f" · {state['rate']:.1f}/s"
+    if state['eta'] is not None:
+        text += f" · noch {format_duration(state['eta'])}"
+    if state['errors']:
+        text += f" · {state['errors']} Fehler"
+    return text
+
+
+class ProgressChannel:
+    """Queue zwischen Worker-Threads und Tk.
+
+    Worker rufen nur phase(), progress(), add_errors(), detail(), call() und ask() auf. Der Tk-Thread startet
+    das Abholen mit start(), danach wird on_update(zustand) in jedem Intervall mit Änderungen
+    aufgerufen. Über call() übergebene Funktionen (Dialoge, Fenster schließen) laufen im Tk-Thread.
+    """
+
+    def __init__(self, root, on_update, interval_ms=POLL_INTERVAL_MS):
+        self.root = root
+        self.on_update = on_update
+        self.interval_ms = interval_ms
+        self.events = queue.Queue()
+        self.after_id = None
+        self.state = {"phase": "", "done": 0, "total": None, "errors": 0, "detail": "", "rate": 0.0, "eta": None}
+        self.phase_started = time.monotonic()
+
+    # Aufrufe aus beliebigen Threads
+
+    def phase(self, name, total=None):
+        self.events.put(("phase", name, (total, time.monotonic())))
+
+    def progress(self, done, total=None):
+        self.events.put(("progress", done, total))
+
+    def add_errors(self, count=1):
+        self.events.put(("errors", count, None))
+
+    def detail(self, text):
+        self.events.put(("detail", text, None))
+
+    def call(self, func, *args):
+        self.events.put(("call", func, args))
+
+    def ask(self, func, *args):
+        """Wie call, wartet aber auf das Ergebnis, etwa einer Rückfrage per messagebox.askyesno."""
+        answer = queue.Queue(maxsize=1)
+
+        def run(*call_args):
+            result = None
+            try:
+                result = func(*call_args)
+            finally:
+                # Auch bei einem Fehler im Dialog darf der Worker nicht ewig warten
+                answer.put(result)
+
+        self.call(run, *args)
+        return answer.get()
+
+    # Tk-Thread
+
+    def start(self):
+        if self.after_id is None:
+            self.after_id = self.root.after(self.interval_ms, self.poll)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def poll(self):
+        self.after_id = None
+        changed = False
+        calls = []
+        state = self.state
+
+        while True:
+            try:
+                kind, value, extra = self.events.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if kind == "phase":
+                total, self.phase_started = extra
+                state.update(phase=value, done=0, total=total, errors=0, detail="")
+            elif kind == "progress":
+                state["done"] = value
+                if extra is not None:
+                    state["total"] = extra
+            elif kind == "errors":
+                state["errors"] += value
+            elif kind == "detail":
+                state["detail"] = value
+            else:
+                calls.append((value, extra))
+
+        if changed:
+            elapsed = time.monotonic() - self.phase_started
+            state["rate"] = state["done"] / elapsed if elapsed > 0 else 0.0
+            remaining = (state["total"] or 0) - state["done"]
+            state["eta"] = remaining / state["rate"] if state["total"] and state["rate"] and remaining > 0 else None
+            self.on_update(dict(state))
+
+        # Neu einplanen, bevor Dialoge aus call() den Mainloop blockieren; stop() darin beendet das Abholen
+        self.start()
+        for func, args in calls:
+            func(*args)
@@ -0,0 +1,226 @@
+"""Aufzählen eigener Records über com.atproto.repo.listRecords statt über getAuthorFeed.
+
+listRecords liefert nur die Records selbst, ohne Profile, Embeds und Viewer-Status, und keine Reposts
+fremder Skeets. Like- und Repost-Zahlen werden bei Bedarf gezielt über app.bsky.feed.getPosts nachgeladen.
+Feed-Einträge und Records werden gleich beim Eintreffen in kompakte Skeet-Objekte umgewandelt, damit
+die Filter für beide Wege gleich funktionieren und das rohe JSON freigegeben werden kann.
+
+rkeys von Posts, Reposts und Likes sind TIDs: 13 Zeichen in sortierbarem Base32, die Mikrosekunden seit
+1970 und eine Clock-ID codieren. Sie sortieren sich nach Erstellungszeit, daraus lässt sich das Datum
+ohne Parsen ablesen und ein Stichtag direkt als rkey-Grenze für listRecords verwenden.
+"""
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from bsky_decode import decode_record_page, loads
+
+LIST_RECORDS = "com.atproto.repo.listRecords"
+GET_POSTS = "app.bsky.feed.getPosts"
+
+POST_COLLECTION = "app.bsky.feed.post"
+LIKE_COLLECTION = "app.bsky.feed.like"
+LIST_RECORDS_LIMIT = 100
+GET_POSTS_LIMIT = 25
+
+
+TID_CHARS = "234567abcdefghijklmnopqrstuvwxyz"
+TID_PATTERN = re.compile(r"[234567abcdefghij][234567abcdefghijklmnopqrstuvwxyz]{12}")
+# Übersetzung in die Ziffern von int(..., 32), damit TIDs in C statt Zeichen für Zeichen dekodiert werden
+TID_TO_BASE32 = str.maketrans(TID_CHARS, "0123456789abcdefghijklmnopqrstuv")
+
+
+def tid_to_timestamp(rkey):
+    """Erstellungszeit eines TID-rkeys in Sekunden seit 1970, None wenn der rkey kein TID ist."""
+    if not TID_PATTERN.fullmatch(rkey):
+        return None
+    return (int(rkey.translate(TID_TO_BASE32), 32) >> 10) // 1000000
+
+
+def timestamp_to_tid(seconds):
+    """Kleinster TID zu einem Zeitpunkt: jeder rkey, der vor diesem Zeitpunkt erzeugt wurde, sortiert davor."""
+    value = int(seconds * 1000000) << 10
+    chars = []
+    for _ in range(13):
+        chars.append(TID_CHARS[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def split_before(records, before):
+    """Teilt eine aufsteigend sortierte Seite: (Records mit rkey < before, Grenze erreicht)."""
+    for i, record in enumerate(records):
+        if record["uri"].rsplit("/", 1)[1] >= before:
+            return records[:i], True
+    return records, False
+
+
+def iter_record_pages(client, repo, collection, limit=LIST_RECORDS_LIMIT, before=None):
+    """Liefert die Seiten von listRecords einzeln (Listen von {uri, cid, value}).
+
+    Mit before (ein TID, siehe timestamp_to_tid) werden nur ältere Records geliefert: die Collection
+    wird per reverse vom ältesten Record an durchlaufen und der Abruf endet an der Grenze, statt die
+    ganze Historie zu holen.
+    """
+    params = {"repo": repo, "collection": collection, "limit": limit}
+    if before is not None:
+        params["reverse"] = "true"
+
+    while True:
+        response = client.get(LIST_RECORDS, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Fehler beim Abrufen der Records: {response.text}")
+
+        records, cursor = decode_record_page(response.content)
+        reached = False
+        if before is not None:
+            records, reached = split_before(records, before)
+        yield records
+
+        if cursor and records and not reached:
+            params["cursor"] = cursor
+        else:
+            break
+
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+def parse_timestamp(text):
+    """ISO-Zeitstempel aus indexedAt/createdAt als ganze Sekunden seit 1970 (UTC), None wenn leer oder ungültig."""
+    if not text:
+        return None
+    try:
+        return (datetime.fromisoformat(text[:19]) - EPOCH) // SECOND
+    except ValueError:
+        return None
+
+
+def record_timestamp(uri, fallback_text):
+    """Zeitstempel aus dem TID-rkey der URI, ohne Parsen. Nur wenn der rkey kein TID ist, aus dem Text."""
+    timestamp = tid_to_timestamp(uri.rsplit("/", 1)[1])
+    return timestamp if timestamp is not None else parse_timestamp(fallback_text)
+
+
+def date_to_timestamp(date):
+    """Stichtag (datetime ohne Zeitzone gilt als UTC) in Sekunden seit 1970."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
+class Skeet:
+    """Kompakter Skeet mit nur den Feldern, die Filter und Löschen brauchen.
+
+    Ersetzt die vollständigen Feed-Einträge mit Profil, Embeds, Labels und Viewer-Status. Die DID
+    wird interniert und von allen Skeets eines Kontos geteilt, der Zeitstempel steht als Sekunden
+    seit 1970 (UTC) oder None darin.
+    """
+    __slots__ = ("uri", "did", "parent_uri", "timestamp", "like_count", "repost_count")
+
+    def __init__(self, uri, parent_uri=None, timestamp=None, like_count=0, repost_count=0):
+        self.uri = uri
+        self.did = sys.intern(uri[5:uri.index("/", 5)])
+        self.parent_uri = parent_uri
+        self.timestamp = timestamp
+        self.like_count = like_count
+        self.repost_count = repost_count
+
+    @property
+    def rkey(self):
+        return self.uri.rsplit("/", 1)[1]
+
+    def __repr__(self):
+        return f"Skeet({self.uri!r})"
+
+
+def feed_item_to_skeet(item):
+    """Wandelt einen Eintrag aus getAuthorFeed um.
+
+    Der Zeitstempel kommt aus dem TID der URI, indexedAt wird nur ohne TID geparst.
+    """
+    post = item["post"]
+    reply = item.get("reply")
+    return Skeet(
+        post["uri"],
+        reply["parent"].get("uri") if reply else None,
+        record_timestamp(post["uri"], post.get("indexedAt")),
+        post.get("likeCount", 0),
+        post.get("repostCount", 0),
+    )
+
+
+def feed_page_to_skeets(page):
+    return [feed_item_to_skeet(item) for item in page]
+
+
+def decode_feed_page(content):
+    """getAuthorFeed-Antwort (Rohinhalt) -> (Skeets, Cursor), das dekodierte JSON wird sofort verworfen."""
+    data = loads(content)
+    return feed_page_to_skeets(data["feed"]), data.get("cursor")
+
+
+def record_to_skeet(record):
+    """Wandelt einen Post-Record um.
+
+    Statt indexedAt gilt hier die Erstellungszeit aus dem TID. Die Zählwerte sind 0, bis sie per
+    hydrate_counts nachgeladen werden.
+    """
+    value = record["value"]
+    reply = value.get("reply")
+    return Skeet(record["uri"], reply["parent"]["uri"] if reply else None, record_timestamp(record["uri"], value.get("createdAt")))
+
+
+class LikedPosts:
+    """Menge der eigenen Skeets, die man selbst geliket hat, gespeichert nur als rkeys.
+
+    Verhält sich bei `uri in liked` und beim Iterieren wie eine Menge von Post-URIs, braucht aber
+    pro Eintrag nur den kurzen rkey statt der vollen URI.
+    """
+    __slots__ = ("prefix", "rkeys")
+
+    def __init__(self, did, rkeys=()):
+        self.prefix = f"at://{did}/{POST_COLLECTION}/"
+        self.rkeys = set(rkeys)
+
+    def add_subject(self, uri):
+        """Nimmt die Subject-URI eines Likes auf, falls sie auf einen eigenen Skeet zeigt."""
+        if uri.startswith(self.prefix):
+            self.rkeys.add(uri[len(self.prefix):])
+
+    def __contains__(self, uri):
+        return uri.startswith(self.prefix) and uri[len(self.prefix):] in self.rkeys
+
+    def __iter__(self):
+        return (self.prefix + rkey for rkey in self.rkeys)
+
+    def __len__(self):
+        return len(self.rkeys)
+
+
+def fetch_counts(client, uris, batch_size=GET_POSTS_LIMIT):
+    """Ruft likeCount und repostCount per getPosts ab (25 pro Request). Rückgabe: URI -> (Likes, Reposts)."""
+    uris = list(uris)
+    counts = {}
+
+    for i in range(0, len(uris), batch_size):
+        response = client.get(GET_POSTS, params={"uris": uris[i:i + batch_size]})
+        if response.status_code != 200:
+            raise Exception(f"Fehler beim Abrufen der Zählwerte: {response.text}")
+
+        for post in response.json()["posts"]:
+            counts[post["uri"]] = (post.get("likeCount", 0), post.get("repostCount", 0))
+
+    return counts
+
+
+def hydrate_counts(client, skeets, batch_size=GET_POSTS_LIMIT):
+    """Lädt likeCount und repostCount für die übergebenen Skeets per getPosts nach."""
+    by_uri = {skeet.uri: skeet for skeet in skeets}
+
+    for uri, (likes, reposts) in fetch_counts(client, by_uri, batch_size).items():
+        skeet = by_uri.get(uri)
+        if skeet is not None:
+            skeet.like_count = likes
+            skeet.repost_count = reposts
@@ -0,0 +1,287 @@
+"""Ein Aufräumlauf über Posts, Reposts und Likes: einmal abrufen, Regeln pro Collection, ein Löschstrom.
+
+Bisher holten v8/combined die Posts und undo reposts die Reposts jeweils mit eigenem Login und eigenem
+Abruf, Likes wurden gar nicht aufgeräumt. Hier werden alle betroffenen Collections in einem Lauf
+geholt, entweder gleichzeitig per listRecords oder mit einem einzigen getRepo-Export. Jede Collection
+hat eigene Regeln (siehe Rule). Heraus kommt eine Liste (URI, Grund), die als Plan-Datei gespeichert
+oder als ein einziger Journal-Auftrag gelöscht wird. applyWrites bündelt dabei Posts, Reposts und
+Likes desselben Repos gemeinsam.
+
+Eine Collection, deren Regel nur vom Datum abhängt, wird vom ältesten Record an nur bis zum Stichtag
+abgerufen. Posts mit Thread-Regel brauchen alle Posts, die Eigene-Likes-Regel alle Likes.
+
+Ohne Oberfläche:
+
+    python bsky_retention.py --user name.bsky.social --tage-posts 30 --tage-reposts 7 --tage-likes 90 --min-likes 5
+"""
+from datetime import datetime, timedelta, timezone
+
+from bsky_async import run_parallel
+from bsky_car import DEFAULT_COLLECTIONS, REPOST_COLLECTION, iter_repo_records
+from bsky_journal import DeleteJournal, default_journal_path, run_job
+from bsky_records import LIKE_COLLECTION, POST_COLLECTION, fetch_counts, record_timestamp, timestamp_to_tid
+from bsky_writes import DEFAULT_WORKERS
+
+JOB_KIND = "retention"
+
+
+class Rule:
+    """Regeln für eine Collection. Gelöscht wird, was älter als keep_days ist und von keiner Behalten-Regel erfasst wird.
+
+    min_likes/min_reskeets, keep_threads und keep_self_liked gelten nur für Posts, wie die Filter in v8.
+    """
+
+    def __init__(self, keep_days=None, min_likes=None, min_reskeets=None, keep_threads=False, keep_self_liked=False):
+        self.keep_days = keep_days
+        self.min_likes = min_likes
+        self.min_reskeets = min_reskeets
+        self.keep_threads = keep_threads
+        self.keep_self_liked = keep_self_liked
+
+    def cutoff(self, now):
+        """Stichtag in Sekunden seit 1970 oder None, wenn das Alter keine Rolle spielt."""
+        if self.keep_days is None:
+            return None
+        return int((now - timedelta(days=self.keep_days)).timestamp())
+
+    def describe(self):
+        parts = []
+        if self.keep_days is not None:
+            parts.append(f"älter als {self.keep_days} Tage")
+        if self.keep_threads:
+            parts.append("kein Thread")
+        if self.keep_self_liked:
+            parts.append("nicht selbst geliket")
+        if self.min_likes is not None:
+            parts.append(f"unter {self.min_likes} Likes")
+        if self.min_reskeets is not None:
+            parts.append(f"unter {self.min_reskeets} Reskeets")
+        return ", ".join(parts) or "alle"
+
+
+def fetch_limits(rules, now):
+    """before-TID pro Collection: nur bis zum Stichtag abrufen, wenn keine andere Regel neuere Records braucht."""
+    post_rule = rules.get(POST_COLLECTION)
+    limits = {}
+    for collection, rule in rules.items():
+        cutoff = rule.cutoff(now)
+        needs_all = (
+            cutoff is None
+            or (collection == POST_COLLECTION and rule.keep_threads)
+            or (collection == LIKE_COLLECTION and post_rule is not None and post_rule.keep_self_liked)
+        )
+        limits[collection] = None if needs_all else timestamp_to_tid(cutoff)
+    if post_rule is not None and post_rule.keep_self_liked and LIKE_COLLECTION not in rules:
+        limits[LIKE_COLLECTION] = None
+    return limits
+
+
+def compact(collection, record):
+    """(URI, Zeitstempel, Parent- bzw. Subject-URI) statt des ganzen Records."""
+    value = record["value"]
+    if collection == POST_COLLECTION:
+        reply = value.get("reply")
+        extra = reply["parent"]["uri"] if reply else None
+    else:
+        subject = value.get("subject")
+        extra = subject.get("uri") if isinstance(subject, dict) else None
+    return record["uri"], record_timestamp(record["uri"], value.get("createdAt")), extra
+
+
+def crawl_records(client, did, limits, progress_callback=None, values=None):
+    """Alle Collections gleichzeitig per listRecords. Rückgabe: Collection -> Liste kompakter Records.
+
+    values (bsky_archive.RecordValues) merkt sich die Records fürs Archiv.
+    """
+    found = {collection: [] for collection in limits}
+
+    def job(collection, before):
+        def on_page(records):
+            found[collection].extend(compact(collection, record) for record in records)
+            if values is not None:
+                values.add(records)
+            if progress_callback:
+                progress_callback(sum(len(items) for items in found.values()))
+        return lambda engine: engine.list_records(did, collection, on_page, before=before)
+
+    run_parallel(client, *(job(collection, before) for collection, before in limits.items()))
+    return found
+
+
+def crawl_export(client, did, limits, progress_callback=None, values=None):
+    """Alle Collections aus einem einzigen getRepo-Export, values wie bei crawl_records."""
+    found = {collection: [] for collection in limits}
+    collections = tuple(collection for collection in DEFAULT_COLLECTIONS if collection in limits)
+    for count, record in enumerate(iter_repo_records(client, did, collections), 1):
+        collection = record["uri"].split("/")[3]
+        found[collection].append(compact(collection, record))
+        if values is not None:
+            values.add([record])
+        if progress_callback and count % 1000 == 0:
+            progress_callback(count)
+    return found
+
+
+def evaluate(client, did, rules, found, now):
+    """Wendet die Regeln an und gibt eine nach URI sortierte Liste (URI, Grund) zurück.
+
+    client wird nur für die Zählwerte gebraucht, wenn eine Post-Regel Mindestwerte hat.
+    """
+    entries = []
+    post_prefix = f"at://{did}/{POST_COLLECTION}/"
+    post_rule = rules.get(POST_COLLECTION)
+
+    liked = set()
+    if post_rule is not None and post_rule.keep_self_liked:
+        liked = {subject for _, _, subject in found.get(LIKE_COLLECTION, ()) if subject and subject.startswith(post_prefix)}
+
+    for collection, rule in rules.items():
+        cutoff = rule.cutoff(now)
+        reason = f"{collection.rsplit('.', 1)[1]}: {rule.describe()}"
+        items = found.get(collection, ())
+
+        if collection != POST_COLLECTION:
+            for uri, timestamp, subject in items:
+                if cutoff is not None and (timestamp is None or timestamp >= cutoff):
+                    continue
+                # Likes auf eigene Posts halten diese bei der Eigene-Likes-Regel, sie bleiben daher stehen
+                if collection == LIKE_COLLECTION and subject in liked:
+                    continue
+                entries.append((uri, reason))
+            continue
+
+        in_thread = set()
+        if rule.keep_threads:
+            own = {uri for uri, _, _ in items}
+            for uri, _, parent in items:
+                if parent in own:
+                    in_thread.add(uri)
+                    in_thread.add(parent)
+
+        candidates = [
+            uri for uri, timestamp, _ in items
+            if not (cutoff is not None and (timestamp is None or timestamp >= cutoff))
+            and uri not in in_thread and uri not in liked
+        ]
+        if rule.min_likes is not None or rule.min_reskeets is not None:
+            counts = fetch_counts(client, candidates)
+            candidates = [
+                uri for uri in candidates
+                if not (rule.min_likes is not None and counts.get(uri, (0, 0))[0] >= rule.min_likes)
+                and not (rule.min_reskeets is not None and counts.get(uri, (0, 0))[1] >= rule.min_reskeets)
+            ]
+        entries.extend((uri, reason) for uri in candidates)
+
+    entries.sort()
+    return entries
+
+
+def plan_retention(client, did, rules, use_export=False, progress_callback=None, now=None, values=None):
+    """Ein Abruf aller nötigen Collections, danach die Regeln. Rückgabe: sortierte Liste (URI, Grund).
+
+    values (bsky_archive.RecordValues) behält danach nur die Inhalte der zu löschenden Records.
+    """
+    now = now or datetime.now(timezone.utc)
+    limits = fetch_limits(rules, now)
+    crawl = crawl_export if use_export else crawl_records
+    found = crawl(client, did, limits, progress_callback, values)
+    entries = evaluate(client, did, rules, found, now)
+    if values is not None:
+        values.retain(uri for uri, _ in entries)
+    return entries
+
+
+def sweep(client, rules, use_export=False, progress_callback=None, workers=DEFAULT_WORKERS, journal=None, budget=None,
+          archive=None, values=None):
+    """Plant und löscht in einem Lauf über einen einzigen Journal-Auftrag.
+
+    Ein unterbrochener Auftrag wird erst zu Ende gebracht, danach wird mit den aktuellen Regeln neu
+    geplant und gelöscht. budget verteilt die Löschungen über das Punktebudget für Writes. archive
+    (bsky_archive.ArchiveWriter) sichert jeden Batch vor dem Löschen, seine Quelle values
+    (bsky_archive.RecordValues) wird beim Abruf gefüllt, für den unterbrochenen Auftrag aus einem
+    Repo-Export. Rückgabe wie run_job, für beide Aufträge zusammen.
+    """
+    own_journal = journal is None
+    journal = journal or DeleteJournal(default_journal_path(client.did))
+    try:
+        results = {}
+        job_id = journal.open_job(JOB_KIND, client.did)
+        if job_id is not None:
+            if values is not None:
+                values.fill(client, client.did, journal.pending(job_id))
+            results.update(run_job(client, journal, job_id, progress_callback, workers=workers, budget=budget,
+                                   archive=archive))
+        entries = plan_retention(client, client.did, rules, use_export, values=values)
+        job_id = journal.create_job(JOB_KIND, client.did, [uri for uri, _ in entries])
+        results.update(run_job(client, journal, job_id, progress_callback, workers=workers, budget=budget,
+                               archive=archive))
+        return results
+    finally:
+        if own_journal:
+            journal.close()
+
+
+def rules_from_args(args):
+    rules = {}
+    if args.tage_posts is not None or args.min_likes is not None or args.min_reskeets is not None:
+        rules[POST_COLLECTION] = Rule(args.tage_posts, args.min_likes, args.min_reskeets,
+                                      args.threads_behalten, args.eigene_likes_behalten)
+    if args.tage_reposts is not None:
+        rules[REPOST_COLLECTION] = Rule(args.tage_reposts)
+    if args.tage_likes is not None:
+        rules[LIKE_COLLECTION] = Rule(args.tage_likes)
+    return rules
+
+
+if __name__ == "__main__":
+    import argparse
+    import getpass
+    import os
+    import time
+    from bsky_archive import ArchiveWriter, RecordValues, default_archive_path
+    from bsky_budget import BudgetScheduler, default_budget_path, delete_cost, format_eta
+    from bsky_client import XrpcClient
+    from bsky_plan import write_plan
+
+    parser = argparse.ArgumentParser(description="Räumt Posts, Reposts und Likes in einem Lauf auf.")
+    parser.add_argument("--user", required=True, help="Bluesky-Benutzername, bspw. testuser.bsky.social")
+    parser.add_argument("--tage-posts", type=int, help="Posts älter als so viele Tage löschen")
+    parser.add_argument("--tage-reposts", type=int, help="Reposts älter als so viele Tage löschen")
+    parser.add_argument("--tage-likes", type=int, help="Likes älter als so viele Tage löschen")
+    parser.add_argument("--min-likes", type=int, help="Posts mit so vielen Likes behalten")
+    parser.add_argument("--min-reskeets", type=int, help="Posts mit so vielen Reskeets behalten")
+    parser.add_argument("--threads-behalten", action="store_true")
+    parser.add_argument("--eigene-likes-behalten", action="store_true")
+    parser.add_argument("--export", action="store_true", help="Ganzes Repo einmal per getRepo holen")
+    parser.add_argument("--plan", help="Nur planen und die Plan-Datei hierhin schreiben")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    rules = rules_from_args(args)
+    if not rules:
+        parser.error("Keine Regel angegeben (--tage-posts, --tage-reposts, --tage-likes, --min-likes, --min-reskeets)")
+
+    client = XrpcClient()
+    client.login(args.user, os.environ.get("BSKY_PASSWORD") or getpass.getpass("Passwort: "))
+    if args.plan:
+        entries = plan_retention(client, client.did, rules, args.export, lambda count: print(f"\r{count} abgerufen", end=""))
+        print()
+        print(f"{write_plan(args.plan, entries)} Records in {args.plan}.")
+        print(f"Löschdauer nach Punktebudget: {format_eta(BudgetScheduler(default_budget_path(client.did)).estimate(delete_cost(len(entries))))}")
+    else:
+        budget = BudgetScheduler(default_budget_path(client.did),
+                                 on_wait=lambda until: print(f"\rPunktebudget erschöpft, weiter um {time.strftime('%H:%M', time.localtime(until))}", end=""))
+        # Vor dem Löschen archivieren, die Inhalte kommen aus dem Abruf des Laufs
+        values = RecordValues()
+        archive = ArchiveWriter(default_archive_path(client.did), values)
+        try:
+            results = sweep(client, rules, args.export, lambda done, total: print(f"\r{done} von {total} bearbeitet", end=""),
+                            args.workers, budget=budget, archive=archive, values=values)
+        finally:
+            archive.close()
+        print()
+        for uri, error in results.items():
+            if error is not None:
+                print(f"Failed to delete: {uri} - {error}")
+        failed = sum(1 for error in results.values() if error is not None)
+        print(f"{len(results) - failed} Records gelöscht, {failed} fehlgeschlagen.")
@@ -0,0 +1,309 @@
+"""Lokaler SQLite-Index der abgerufenen Records mit inkrementellem Abgleich.
+
+Beim ersten Lauf werden alle Post- und Repost-Records per listRecords geholt, bei späteren nur die
+neueren: listRecords liefert die neuesten zuerst, und rkeys sind TIDs, die sich nach Erstellungszeit
+sortieren. Sobald ein bereits bekannter rkey erreicht ist, endet der Abgleich. Der erste Durchlauf
+speichert nach jeder Seite seinen Cursor in sync_state. Wird er abgebrochen, holt der nächste Lauf
+erst die neuen Records und setzt dann den Rest der Historie an diesem Cursor fort. Erst danach gilt
+die Collection als vollständig. Spätestens nach FULL_SYNC_INTERVAL wird eine Collection einmal ganz
+abgerufen, dabei fallen Records aus dem Index, die es auf dem Server nicht mehr gibt (etwa außerhalb
+des Tools gelöscht). Sie würden sonst Antworten als Thread schützen und als Löschung fehlschlagen.
+
+Like- und Repost-Zahlen werden nur für Skeets aufgefrischt, die nach den übrigen Filtern noch
+Löschkandidaten sind. Die Filter selbst laufen als Abfragen über die Indizes. Werden auch
+Like-Records abgeglichen, liefert liked_subjects() den Eigene-Likes-Filter ohne erneuten Abruf
+aller Likes.
+
+Der Record-Inhalt wird als JSON-Text mitgespeichert, damit Records vor dem Löschen ohne weiteren
+Abruf archiviert werden können (bsky_archive). Für Records aus Läufen davor ergänzt fill_values()
+den Inhalt mit einem einzigen Repo-Export.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+
+from bsky_archive import record_json
+from bsky_async import run_parallel
+from bsky_car import iter_repo_records
+from bsky_records import LIKE_COLLECTION, POST_COLLECTION, fetch_counts
+
+REPOST_COLLECTION = "app.bsky.feed.repost"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    uri TEXT PRIMARY KEY,
+    did TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    rkey TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT '',
+    parent_uri TEXT,
+    subject_uri TEXT,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    repost_count INTEGER NOT NULL DEFAULT 0,
+    counts_updated_at TEXT,
+    cid TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS records_created_at ON records (did, collection, created_at);
+CREATE INDEX IF NOT EXISTS records_parent_uri ON records (parent_uri);
+CREATE INDEX IF NOT EXISTS records_rkey ON records (did, collection, rkey);
+CREATE TABLE IF NOT EXISTS sync_state (
+    did TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    backfill_cursor TEXT,
+    complete INTEGER NOT NULL DEFAULT 0,
+    full_synced_at REAL,
+    PRIMARY KEY (did, collection)
+);
+"""
+
+# Abstand zwischen vollständigen Abrufen einer Collection, die gelöschte Records aus dem Index entfernen
+FULL_SYNC_INTERVAL = 7 * 86400
+
+
+def default_store_path(did):
+    """Dateiname des Index für ein Konto im aktuellen Verzeichnis."""
+    return f"bsky_index_{did.replace(':', '_')}.sqlite"
+
+
+class RecordStore:
+    """SQLite-Datei mit den Post- und Repost-Records eines oder mehrerer Konten."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        # Indizes aus älteren Versionen um die Spalten für das Archiv ergänzen
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(records)")}
+        for column in ("cid", "value"):
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE records ADD COLUMN {column} TEXT")
+
+    def close(self):
+        self.db.close()
+
+    def latest_rkey(self, did, collection):
+        """Neuester gespeicherter rkey (TID) einer Collection oder None."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT MAX(rkey) FROM records WHERE did = ? AND collection = ?", (did, collection)
+            ).fetchone()
+        return row[0]
+
+    def count(self, did, collection=POST_COLLECTION):
+        with self.lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM records WHERE did = ? AND collection = ?", (did, collection)
+            ).fetchone()[0]
+
+    def sync_state(self, did, collection):
+        """(Cursor des unterbrochenen Erstabrufs, vollständig, Zeitpunkt des letzten vollständigen Abrufs)."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT backfill_cursor, complete, full_synced_at FROM sync_state WHERE did = ? AND collection = ?",
+                (did, collection)
+            ).fetchone()
+        return (row[0], bool(row[1]), row[2]) if row else (None, False, None)
+
+    def _mark_complete(self, did, collection):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR IGNORE INTO sync_state (did, collection) VALUES (?, ?)", (did, collection))
+            self.db.execute(
+                "UPDATE sync_state SET backfill_cursor = NULL, complete = 1, full_synced_at = ? WHERE did = ? AND collection = ?",
+                (time.time(), did, collection)
+            )
+
+    def prune(self, did, collection, seen_rkeys):
+        """Entfernt Records einer Collection, die ein vollständiger Abruf nicht mehr gesehen hat. Rückgabe: Anzahl."""
+        with self.lock, self.db:
+            stored = [row[0] for row in self.db.execute(
+                "SELECT rkey FROM records WHERE did = ? AND collection = ?", (did, collection))]
+            gone = [(did, collection, rkey) for rkey in stored if rkey not in seen_rkeys]
+            self.db.executemany("DELETE FROM records WHERE did = ? AND collection = ? AND rkey = ?", gone)
+        return len(gone)
+
+    def sync(self, client, did, collections=(POST_COLLECTION, REPOST_COLLECTION), progress_callback=None, full=False):
+        """Holt neue Records und setzt einen unterbrochenen Erstabruf fort. Rückgabe: Anzahl neuer Records.
+
+        Mit full=True (oder spätestens nach FULL_SYNC_INTERVAL) wird jede Collection ganz abgerufen und
+        der Index um Records bereinigt, die es auf dem Server nicht mehr gibt.
+        """
+        return run_parallel(client, lambda engine: self.sync_async(engine, did, collections, progress_callback, full))[0]
+
+    async def sync_async(self, engine, did, collections=(POST_COLLECTION, REPOST_COLLECTION), progress_callback=None,
+                         full=False):
+        """Wie sync, aber alle Collections gleichzeitig auf einer bsky_async.AsyncEngine."""
+        added = [0]
+
+        def ingest(collection, latest, records, backfill=False):
+            """Speichert eine Seite. Mit backfill wird in derselben Transaktion der Cursor des Erstabrufs gesichert."""
+            rows = []
+            reached_known = False
+            for record in records:
+                rkey = record["uri"].rsplit("/", 1)[-1]
+                if latest is not None and rkey <= latest:
+                    reached_known = True
+                    break
+                value = record["value"]
+                parent_uri = value["reply"]["parent"]["uri"] if "reply" in value else None
+                subject_uri = value["subject"].get("uri") if isinstance(value.get("subject"), dict) else None
+                rows.append((record["uri"], did, collection, rkey, value.get("createdAt", ""), parent_uri, subject_uri,
+                             record.get("cid"), record_json(value)))
+
+            with self.lock, self.db:
+                inserted = self.db.executemany(
+                    "INSERT OR IGNORE INTO records (uri, did, collection, rkey, created_at, parent_uri, subject_uri, cid, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                ).rowcount
+                if backfill and records:
+                    self.db.execute("INSERT OR IGNORE INTO sync_state (did, collection) VALUES (?, ?)", (did, collection))
+                    self.db.execute("UPDATE sync_state SET backfill_cursor = ? WHERE did = ? AND collection = ?",
+                                    (records[-1]["uri"].rsplit("/", 1)[-1], did, collection))
+            added[0] += max(inserted, 0)
+            if progress_callback:
+                progress_callback(added[0])
+            return not reached_known
+
+        async def sync_collection(collection):
+            cursor, complete, full_synced_at = self.sync_state(did, collection)
+            stale = full_synced_at is None or time.time() - full_synced_at > FULL_SYNC_INTERVAL
+
+            if full or (complete and stale) or (not complete and cursor is None):
+                # Vollständiger Abruf vom neuesten Record an. Beim Erstabruf wird der Cursor nach jeder
+                # Seite gespeichert, damit ein Abbruch nicht von vorn beginnt.
+                seen = set()
+
+                def on_full_page(records):
+                    seen.update(record["uri"].rsplit("/", 1)[-1] for record in records)
+                    ingest(collection, None, records, backfill=not complete)
+
+                await engine.list_records(did, collection, on_full_page)
+                self.prune(did, collection, seen)
+                self._mark_complete(did, collection)
+                return
+
+            # Neue Records bis zum neuesten bekannten
+            latest = self.latest_rkey(did, collection)
+            await engine.list_records(did, collection, lambda records: ingest(collection, latest, records))
+
+            if not complete:
+                # Unterbrochenen Erstabruf am gespeicherten Cursor fortsetzen
+                await engine.list_records(did, collection, lambda records: ingest(collection, None, records, True), cursor=cursor)
+                self._mark_complete(did, collection)
+
+        await asyncio.gather(*(sync_collection(collection) for collection in collections))
+        return added[0]
+
+    def refresh_counts(self, client, uris):
+        """Frischt Like- und Repost-Zahlen für die übergebenen Post-URIs per getPosts auf."""
+        counts = fetch_counts(client, uris)
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE records SET like_count = ?, repost_count = ?, counts_updated_at = datetime('now') WHERE uri = ?",
+                [(likes, reposts, uri) for uri, (likes, reposts) in counts.items()]
+            )
+
+    def remove(self, uris):
+        """Entfernt gelöschte Records aus dem Index."""
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM records WHERE uri = ?", [(uri,) for uri in uris])
+
+    def _select_uris(self, query, uris):
+        """Führt query mit "IN (...)" für alle URIs aus, in Stücken unter dem Parameterlimit von SQLite."""
+        uris = list(uris)
+        rows = []
+        with self.lock:
+            for start in range(0, len(uris), 500):
+                chunk = uris[start:start + 500]
+                rows.extend(self.db.execute(query.format(", ".join("?" * len(chunk))), chunk))
+        return rows
+
+    def archive_entries(self, uris):
+        """(URI, CID, Record als JSON-Text, Likes, Reposts) für ArchiveWriter, nur für gespeicherte URIs."""
+        return self._select_uris(
+            "SELECT uri, cid, value, like_count, repost_count FROM records WHERE uri IN ({})", uris
+        )
+
+    def fill_values(self, client, did, uris):
+        """Ergänzt fehlende Record-Inhalte der URIs aus einem einzigen Repo-Export. Rückgabe: Anzahl ergänzt."""
+        missing = {row[0] for row in self._select_uris("SELECT uri FROM records WHERE value IS NULL AND uri IN ({})", uris)}
+        if not missing:
+            return 0
+        collections = tuple({uri.split("/")[3] for uri in missing})
+        rows = [(record_json(record["value"]), record["uri"])
+                for record in iter_repo_records(client, did, collections) if record["uri"] in missing]
+        with self.lock, self.db:
+            self.db.executemany("UPDATE records SET value = ? WHERE uri = ?", rows)
+        return len(rows)
+
+    def liked_subjects(self, did):
+        """Eigene Posts, die das Konto selbst geliket hat, aus den gespeicherten Like-Records."""
+        prefix = f"at://{did}/{POST_COLLECTION}/"
+        with self.lock:
+            return {row[0] for row in self.db.execute(
+                "SELECT subject_uri FROM records WHERE did = ? AND collection = ? AND substr(subject_uri, 1, ?) = ?",
+                (did, LIKE_COLLECTION, len(prefix), prefix)
+            )}
+
+    def select_records_before(self, did, collection, date):
+        """URIs einer Collection, die vor date erstellt wurden, etwa Reposts für den Datumsfilter."""
+        with self.lock:
+            return {row[0] for row in self.db.execute(
+                "SELECT uri FROM records WHERE did = ? AND collection = ? AND created_at != '' AND created_at < ?",
+                (did, collection, date.strftime("%Y-%m-%d"))
+            )}
+
+    def _candidate_query(self, did, filter_threads, filter_self_liked, filter_date, filter_by_date):
+        """Abfrage der Posts, die weder per Thread-, Datums- noch Like-Filter behalten werden."""
+        conditions = ["r.did = ?", "r.collection = ?"]
+        params = [did, POST_COLLECTION]
+
+        if filter_by_date:
+            # ISO-Zeitstempel sortieren als Text richtig, fehlendes Datum heißt behalten
+            conditions.append("r.created_at != '' AND r.created_at < ?")
+            params.append(filter_date.strftime("%Y-%m-%d"))
+
+        if filter_threads:
+            conditions.append("NOT EXISTS (SELECT 1 FROM records p WHERE p.uri = r.parent_uri)")
+            conditions.append("NOT EXISTS (SELECT 1 FROM records c WHERE c.parent_uri = r.uri)")
+
+        if filter_self_liked:
+            conditions.append("r.uri NOT IN (SELECT uri FROM temp.liked)")
+
+        return " AND ".join(conditions), params
+
+    def select_posts_to_delete(self, did, min_likes, min_reskeets, filter_threads, filter_self_liked, user_liked_uris,
+                               filter_date, filter_by_date, client=None):
+        """Wertet die v8-Filter als Abfrage aus und gibt die zu löschenden Post-URIs zurück.
+
+        Mit client werden vorher die Zählwerte der Kandidaten aufgefrischt, falls ein
+        Likes- oder Reskeets-Filter aktiv ist.
+        """
+        with self.lock, self.db:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS liked (uri TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM temp.liked")
+            if filter_self_liked:
+                self.db.executemany("INSERT OR IGNORE INTO temp.liked VALUES (?)", [(uri,) for uri in user_liked_uris])
+
+        where, params = self._candidate_query(did, filter_threads, filter_self_liked, filter_date, filter_by_date)
+
+        if min_likes is None and min_reskeets is None:
+            with self.lock:
+                return {row[0] for row in self.db.execute(f"SELECT r.uri FROM records r WHERE {where}", params)}
+
+        if client is not None:
+            with self.lock:
+                candidates = [row[0] for row in self.db.execute(f"SELECT r.uri FROM records r WHERE {where}", params)]
+            self.refresh_counts(client, candidates)
+
+        if min_likes is not None:
+            where += " AND r.like_count < ?"
+            params.append(min_likes)
+        if min_reskeets is not None:
+            where += " AND r.repost_count < ?"
+            params.append(min_reskeets)
+
+        with self.lock:
+            return {row[0] for row in self.db.execute(f"SELECT r.uri FROM records r WHERE {where}", params)}
@@ -0,0 +1,289 @@
+"""Gebündeltes Löschen von Records über com.atproto.repo.applyWrites.
+
+Wird von den Skripten gemeinsam genutzt, statt pro Skeet einen eigenen deleteRecord-Aufruf zu schicken.
+Mehrere Worker teilen sich einen Token-Bucket, der aus den RateLimit-Headern des Servers gespeist wird.
+"""
+import queue
+import threading
+import time
+import requests
+from urllib.parse import urlparse
+
+from bsky_budget import DELETE_POINTS
+
+APPLY_WRITES = "com.atproto.repo.applyWrites"
+
+# Der PDS nimmt höchstens 200 Writes pro applyWrites-Aufruf an
+MAX_BATCH_SIZE = 200
+
+# Statuscodes, bei denen der Server den Batch als Ganzes ablehnt (ungültig oder zu groß)
+REJECTED_STATUS = (400, 413)
+
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 5
+
+
+def split_uri(uri):
+    """Zerlegt eine at://-URI in Repo (DID), Collection und rkey."""
+    uri_parts = urlparse(uri)
+    collection, rkey = uri_parts.path.strip('/').split('/')[-2:]
+    return uri_parts.netloc, collection, rkey
+
+
+class TokenBucket:
+    """Thread-sicherer Token-Bucket für Requests, nachgeführt über die RateLimit-Header des Servers.
+
+    Ohne Header-Informationen gilt die Startrate. Nach einem 429 wird bis Retry-After
+    pausiert und die Rate halbiert, erfolgreiche Antworten mit Headern setzen sie wieder
+    auf das, was bis zum nächsten Reset noch erlaubt ist.
+    """
+
+    def __init__(self, rate=5.0, capacity=10):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.paused_until = 0.0
+        self.remaining = None
+        self.reset_at = None
+        self.lock = threading.Lock()
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blockiert, bis ein Token verfügbar ist, und verbraucht es."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+            time.sleep(min(max(wait, 0.01), 5.0))
+
+    def update_from_headers(self, headers):
+        """Übernimmt RateLimit-Remaining/-Reset (Reset als Unix-Zeitstempel) aus einer Antwort."""
+        remaining = headers.get("RateLimit-Remaining")
+        reset = headers.get("RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            # Kaputte Header ändern nichts, die Antwort selbst bleibt gültig
+            return
+        with self.lock:
+            self.remaining = remaining
+            self.reset_at = reset
+            seconds_left = max(1.0, self.reset_at - time.time())
+            self.rate = max(0.01, self.remaining / seconds_left)
+            self.tokens = min(self.tokens, self.remaining)
+
+    def penalize(self, retry_after=None):
+        """Reagiert auf 429 oder 5xx: pausieren und die Rate halbieren."""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + (retry_after if retry_after is not None else 1.0))
+            self.rate = max(0.01, self.rate / 2)
+            self.tokens = 0.0
+            self.updated = now
+
+    def snapshot(self):
+        """Momentaufnahme des Zustands für die Fortschrittsanzeige."""
+        with self.lock:
+            return {
+                "tokens": self.tokens,
+                "rate": self.rate,
+                "remaining": self.remaining,
+                "paused": max(0.0, self.paused_until - time.monotonic()),
+            }
+
+
+class FairTokenBucket(TokenBucket):
+    """TokenBucket, der Wartende strikt in Ankunftsreihenfolge bedient.
+
+    Gedacht als gemeinsames Limit aller Konten auf einem Host (siehe XrpcClient(limiter_for=...)): Kein
+    Konto kann sich mit schnellerem Nachfragen vordrängeln, jedes bekommt Anteile entsprechend seiner
+    gleichzeitigen Requests. Die Rate ist fest vorgegeben, RateLimit-Header einzelner Konten ändern sie nicht.
+    """
+
+    def __init__(self, rate=5.0, capacity=10):
+        super().__init__(rate, capacity)
+        self.condition = threading.Condition(self.lock)
+        self.next_ticket = 0
+        self.serving = 0
+
+    def acquire(self):
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if ticket == self.serving:
+                    if now >= self.paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        self.serving += 1
+                        self.condition.notify_all()
+                        return
+                    wait = max(self.paused_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+                    self.condition.wait(min(max(wait, 0.01), 5.0))
+                else:
+                    # Nicht an der Reihe: warten, bis der Vordermann sein Token hat
+                    self.condition.wait(5.0)
+
+    def update_from_headers(self, headers):
+        pass
+
+
+def retry_after_seconds(response, attempt):
+    """Wartezeit nach 429/5xx: Retry-After des Servers, sonst exponentiell steigend."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    reset = response.headers.get("RateLimit-Reset")
+    if response.status_code == 429 and reset is not None:
+        try:
+            return max(1.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return min(60.0, 2.0 ** attempt)
+
+
+def delete_records_concurrent(client, uris, progress_callback=None, workers=DEFAULT_WORKERS, bucket=None,
+                              batch_size=MAX_BATCH_SIZE, state_callback=None, max_retries=MAX_RETRIES, batch_callback=None,
+                              budget=None, archive=None):
+    """Löscht Records gebündelt per applyWrites mit mehreren Workern und gibt das Ergebnis pro URI zurück.
+
+    Alle Worker teilen sich einen TokenBucket. Die Batchgröße wird automatisch angepasst:
+    lehnt der Server einen Batch ab, wird er halbiert und erneut geschickt, und die
+    kleinere Größe gilt für alle folgenden Batches. Bei 429 und 5xx wird der Batch nach
+    der Wartezeit bis zu max_retries-mal wiederholt. Rückgabe ist ein Dict
+    URI -> None (gelöscht) oder Fehlertext.
+    progress_callback(erledigt, gesamt) wird nach jedem Batch aufgerufen,
+    state_callback(zustand) mit Worker-Anzahl und Bucket-Zustand,
+    batch_callback(uris, fehler) mit dem endgültigen Ergebnis jedes Batches (etwa für ein Journal).
+    Mit budget (bsky_budget.BudgetScheduler) wartet jeder Batch, bis seine Punkte ins Stunden- und
+    Tagesbudget passen; abgelehnte Batches bekommen ihre Punkte zurück.
+    archive(uris) wird vor dem Senden jedes Batches aufgerufen (bsky_archive.ArchiveWriter); schlägt
+    es fehl, wird der Batch nicht gelöscht.
+    """
+    bucket = bucket or TokenBucket()
+    size = {"batch": max(1, min(batch_size, MAX_BATCH_SIZE))}
+    lock = threading.Lock()
+    results = {}
+    active = [0]
+
+    # applyWrites arbeitet immer auf genau einem Repo
+    by_repo = {}
+    for uri in uris:
+        by_repo.setdefault(split_uri(uri)[0], []).append(uri)
+    total = sum(len(repo_uris) for repo_uris in by_repo.values())
+
+    # Offene Arbeit: neue Batches werden erst beim Abholen mit der aktuellen Größe geschnitten
+    todo = queue.Queue()
+    for repo, repo_uris in by_repo.items():
+        todo.put((repo, repo_uris, 0))
+
+    def report():
+        if progress_callback:
+            progress_callback(len(results), total)
+        if state_callback:
+            state = bucket.snapshot()
+            state.update(workers=workers, active=active[0], budget=budget.snapshot() if budget else None)
+            state_callback(state)
+
+    def finish(batch, error):
+        with lock:
+            for uri in batch:
+                results[uri] = error
+            if batch_callback:
+                batch_callback(batch, error)
+            report()
+
+    def send(repo, batch, attempt):
+        writes = []
+        for uri in batch:
+            _, collection, rkey = split_uri(uri)
+            writes.append({
+                "$type": "com.atproto.repo.applyWrites#delete",
+                "collection": collection,
+                "rkey": rkey,
+            })
+
+        if archive is not None:
+            archive(batch)
+        if budget is not None:
+            booked = budget.acquire(len(batch) * DELETE_POINTS)
+        bucket.acquire()
+        try:
+            response = client.post(APPLY_WRITES, json={"repo": repo, "writes": writes})
+        except requests.RequestException as e:
+            # Nicht angekommen: die Punkte zurückgeben, eine Wiederholung verbucht sie neu
+            if budget is not None:
+                budget.refund(len(batch) * DELETE_POINTS, booked)
+            if attempt < max_retries:
+                bucket.penalize(min(60.0, 2.0 ** attempt))
+                todo.put((repo, batch, attempt + 1))
+            else:
+                finish(batch, str(e))
+            return
+        bucket.update_from_headers(response.headers)
+        if budget is not None:
+            if response.status_code != 200:
+                budget.refund(len(batch) * DELETE_POINTS, booked)
+            budget.update_from_headers(response.headers)
+
+        if response.status_code == 200:
+            finish(batch, None)
+        elif response.status_code in REJECTED_STATUS and len(batch) > 1:
+            # Batch halbieren, die kleinere Größe für den Rest beibehalten
+            half = len(batch) // 2
+            with lock:
+                size["batch"] = min(size["batch"], half)
+            todo.put((repo, batch[:half], attempt))
+            todo.put((repo, batch[half:], attempt))
+        elif (response.status_code == 429 or response.status_code >= 500) and attempt < max_retries:
+            bucket.penalize(retry_after_seconds(response, attempt))
+            todo.put((repo, batch, attempt + 1))
+        else:
+            finish(batch, response.text)
+
+    def worker():
+        while True:
+            item = todo.get()
+            if item is None:
+                todo.task_done()
+                return
+            repo, pending, attempt = item
+            with lock:
+                batch_size_now = size["batch"]
+                active[0] += 1
+            batch, rest = pending[:batch_size_now], pending[batch_size_now:]
+            if rest:
+                todo.put((repo, rest, attempt))
+            try:
+                send(repo, batch, attempt)
+            except Exception as e:
+                finish(batch, str(e))
+            finally:
+                with lock:
+                    active[0] -= 1
+                todo.task_done()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    todo.join()
+    for _ in threads:
+        todo.put(None)
+    for thread in threads:
+        thread.join()
+
+    return results
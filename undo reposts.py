@@ -1,80 +1,95 @@
-from atproto import Client, AtUri
 from datetime import datetime
 import tkinter as tk
 from tkinter import messagebox, ttk
 import threading  # Hier wird threading importiert
-
-# Funktion zur Paginierung und zum Abrufen aller Reposts
-def paginated_list_records(cli, repo, collection):
-    """Ruft alle Einträge einer Sammlung (Posts/Reposts) ab, paginiert, um alle Daten zu erfassen."""
-    params = {
-        "repo": repo,
-        "collection": collection,
-        "limit": 100,
-    }
-
-    records = []
-    while True:
-        resp = cli.com.atproto.repo.list_records(params)
-        records.extend(resp.records)
-
-        if resp.cursor:
-            params["cursor"] = resp.cursor
-        else:
-            break
-
-    return records
+from bsky_archive import ArchiveWriter, RecordValues, default_archive_path
+from bsky_car import REPOST_COLLECTION, iter_repo_records
+from bsky_client import XrpcClient
+from bsky_journal import FAILED, DeleteJournal, default_journal_path, plan_from_records, run_job
+from bsky_records import date_to_timestamp, tid_to_timestamp, timestamp_to_tid
+from bsky_metrics import METRICS
+from bsky_progress import ProgressChannel, format_status
 
 # Funktion zur Löschung von Reposts vor einem bestimmten Datum
-def delete_reposts(username, password, date_str, progress_callback):
+# Läuft in einem Worker-Thread, Fortschritt und Meldungen gehen nur über den ProgressChannel an Tk
+def delete_reposts(username, password, date_str, channel, use_export=False):
     try:
         # Datum validieren
         keep_date = datetime.strptime(date_str, "%Y-%m-%d")
     except ValueError:
-        messagebox.showerror("Fehler", "Ungültiges Datum. Bitte im Format YYYY-MM-DD eingeben.")
+        channel.call(messagebox.showerror, "Fehler", "Ungültiges Datum. Bitte im Format YYYY-MM-DD eingeben.")
         return
 
-    # ATProto-Client initialisieren und anmelden
-    cli = Client()
+    # Gemeinsamen XRPC-Client initialisieren und anmelden
+    client = XrpcClient()
     try:
-        cli.login(username, password)
+        client.login(username, password)
     except Exception as e:
-        messagebox.showerror("Fehler", f"Fehler beim Einloggen: {e}")
+        channel.call(messagebox.showerror, "Fehler", f"Fehler beim Einloggen: {e}")
         return
 
-    # Alle Reposts abholen
-    records = paginated_list_records(cli, username, "app.bsky.feed.repost")
-    if len(records) == 0:
-        messagebox.showinfo("Ergebnis", "Keine Reposts gefunden.")
-        return
-
-    deletes = []
-
-    # Durchlaufe alle Reposts und überprüfe das Erstellungsdatum
-    for repost in reversed(records):
-        repost_date = datetime.fromisoformat(repost.value.created_at[:-1])
-        if repost_date < keep_date:
-            # URI des Eintrags abrufen und zum Löschen markieren
-            uri = AtUri.from_str(repost.uri)
-            deletes.append({
-                "$type": "com.atproto.repo.applyWrites#delete",
-                "rkey": uri.rkey,
-                "collection": "app.bsky.feed.repost",
-            })
+    try:
+        delete_reposts_before(client, keep_date, channel, use_export)
+    except Exception as e:
+        channel.call(messagebox.showerror, "Fehler", f"Fehler beim Rückgängigmachen der Reposts: {e}")
+
+
+def delete_reposts_before(client, keep_date, channel, use_export):
+    channel.phase("Abrufen der Reposts")
+
+    # Ein unterbrochener Auftrag wird nach Rückfrage fortgesetzt: Abruf ab dem gespeicherten Cursor mit dem
+    # gespeicherten Stichtag, gelöscht werden die offenen und die fehlgeschlagenen URIs
+    journal = DeleteJournal(default_journal_path(client.did))
+    # Inhalte fürs Archiv kommen aus dem Abruf, bei einem fortgesetzten Auftrag aus einem Repo-Export
+    values = RecordValues()
+    before = timestamp_to_tid(date_to_timestamp(keep_date))
+    job_id = journal.open_job("reposts", client.did)
+    if job_id is not None:
+        _, planned, _ = journal.job(job_id)
+        open_count = len(journal.pending(job_id)) + journal.counts(job_id).get(FAILED, 0)
+        job_before = journal.before(job_id) or before
+        job_date = datetime.utcfromtimestamp(tid_to_timestamp(job_before)).strftime("%Y-%m-%d")
+        if (open_count or not planned) and channel.ask(messagebox.askyesno, "Fortsetzen", f"Ein unterbrochener Löschvorgang für Reposts vor dem {job_date} mit {open_count} offenen Reposts wurde gefunden.\n\nUnterbrochenen Löschvorgang fortsetzen?"):
+            journal.retry_failed(job_id)
+            before = job_before
         else:
-            # Wenn neuere Reposts gefunden werden, abbrechen
-            break
-
-    # Lösche markierte Reposts und zeige Fortschritt an
-    total_deletes = len(deletes)
-    if total_deletes > 0:
-        for i in range(0, total_deletes, 200):
-            cli.com.atproto.repo.apply_writes({"repo": username, "writes": deletes[i:i + 200]})
-            progress_callback(int((i + 200) / total_deletes * 100))
-
-        messagebox.showinfo("Ergebnis", f"{total_deletes} Reposts wurden erfolgreich rückgängig gemacht.")
+            journal.finish(job_id)
+            job_id = None
+
+    with METRICS.phase("abruf", profile=True):
+        if job_id is None and use_export:
+            # Ganzes Repo einmal herunterladen, statt die Reposts seitenweise abzufragen
+            deletes = []
+            for record in iter_repo_records(client, client.did, (REPOST_COLLECTION,)):
+                created_at = record["value"].get("createdAt")
+                if created_at and datetime.fromisoformat(created_at[:19]) < keep_date:
+                    deletes.append(record["uri"])
+                    values.add([record])
+            job_id = journal.create_job("reposts", client.did, deletes, before)
+        elif job_id is None:
+            job_id = journal.create_job("reposts", client.did, before=before)
+
+        # Reposts vom ältesten an seitenweise abholen, bis der rkey (ein TID) den Stichtag erreicht. Neuere
+        # Reposts werden gar nicht erst abgerufen, der Cursor wird pro Seite gespeichert
+        plan_from_records(client, journal, job_id, client.did, REPOST_COLLECTION, progress_callback=channel.progress,
+                          before=before, values=values)
+        values.fill(client, client.did, journal.pending(job_id))
+
+    # Lösche markierte Reposts und zeige Fortschritt an, vorher wird jeder Batch archiviert
+    channel.phase("Löschen der Reposts")
+    archive = ArchiveWriter(default_archive_path(client.did), values)
+    try:
+        with METRICS.phase("loeschen"):
+            results = run_job(client, journal, job_id, channel.progress, archive=archive)
+    finally:
+        archive.close()
+        journal.close()
+    if results:
+        failed = sum(1 for error in results.values() if error is not None)
+        channel.add_errors(failed)
+        channel.call(messagebox.showinfo, "Ergebnis", f"{len(results) - failed} Reposts wurden erfolgreich rückgängig gemacht.")
     else:
-        messagebox.showinfo("Ergebnis", "Keine Reposts zum Löschen gefunden.")
+        channel.call(messagebox.showinfo, "Ergebnis", "Keine Reposts zum Löschen gefunden.")
 
 # GUI-Klasse mit Tkinter und Fortschrittsbalken
 class App:
@@ -95,17 +110,27 @@ class App:
         self.date_entry = tk.Entry(self.root)
         self.date_entry.pack(pady=5)
 
+        self.use_export_var = tk.BooleanVar()
+        tk.Checkbutton(self.root, text="Repo-Export verwenden (ein Download statt seitenweiser Abfrage)", variable=self.use_export_var).pack(pady=5)
+
         # Fortschrittsbalken
         self.progress_bar = ttk.Progressbar(self.root, orient="horizontal", length=300, mode="determinate")
         self.progress_bar.pack(pady=10)
+        self.status_label = tk.Label(self.root, text="", width=60)
+        self.status_label.pack(pady=5)
+
+        # Worker-Threads melden über den Kanal, der Mainloop zeichnet in festen Abständen neu
+        self.channel = ProgressChannel(self.root, self.update_progress)
+        self.channel.start()
 
         # Button zum Starten des Prozesses
         tk.Button(self.root, text="Reposts rückgängig machen", command=self.run_delete_reposts).pack(pady=10)
 
-    def update_progress(self, value):
-        """Aktualisiert den Fortschrittsbalken."""
-        self.progress_bar['value'] = value
-        self.root.update_idletasks()
+    def update_progress(self, state):
+        """Aktualisiert Fortschrittsbalken und Statuszeile, läuft im Tk-Thread."""
+        self.progress_bar['maximum'] = state['total'] or 1
+        self.progress_bar['value'] = state['done'] if state['total'] else 0
+        self.status_label['text'] = format_status(state)
 
     def run_delete_reposts(self):
         """Führt die Löschung der Reposts aus, indem Benutzereingaben verwendet werden."""
@@ -119,10 +144,9 @@ class App:
 
         # Setze den Fortschrittsbalken auf 0
         self.progress_bar['value'] = 0
-        self.update_progress(0)
 
         # Starte den Repost-Löschprozess mit Fortschrittsanzeige
-        threading.Thread(target=delete_reposts, args=(username, password, date_str, self.update_progress)).start()
+        threading.Thread(target=delete_reposts, args=(username, password, date_str, self.channel, self.use_export_var.get()), daemon=True).start()
 
 # Hauptprogramm
 if __name__ == "__main__":